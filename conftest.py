@@ -0,0 +1,11 @@
+import pytest
+import ecfeed_mock
+
+@pytest.fixture(scope='session')
+def mock_credentials(tmp_path_factory):
+    return ecfeed_mock.create_credentials(str(tmp_path_factory.mktemp('credentials')))
+
+@pytest.fixture
+def mock_server(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials) as server:
+        yield server
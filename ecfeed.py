@@ -1,25 +1,60 @@
-from os import path, remove
+from os import path, stat, chmod, remove, replace, urandom
 
-import requests
-from OpenSSL import crypto
-import tempfile
+# Modules that take long to import (requests, urllib3, OpenSSL, orjson, 
+# zstandard, concurrent.futures, hashlib, tempfile) are imported when they 
+# are first needed, so importing this module and starting the command line 
+# tool stays fast. See IMPORT_BUDGET_SECONDS in ecfeed_bench.
+import time
+import threading
+import weakref
 
 import json
+import zlib
 from enum import Enum
 import sys
 
-import importlib
+import itertools
+import collections
+import copy
 
-def __default_keystore_path():
-    keystore_paths = [path.expanduser('~/.ecfeed/security.p12'), path.expanduser('~/ecfeed/security.p12')]
-    for keystore_path in keystore_paths:
-        if path.exists(keystore_path):
-            return keystore_path
-    return keystore_path
+from ecfeed_cache import ResultCache, CacheMode
+from ecfeed_flight import SingleFlight
+from ecfeed_routing import EndpointRouter
+
+KEYSTORE_PATHS = ['~/.ecfeed/security.p12', '~/ecfeed/security.p12']
+
+def find_keystore(keystore_path):
+    """Returns the path of the keystore file
+
+    If keystore_path is the default path and there is no file at it, the 
+    first existing file of KEYSTORE_PATHS is returned. Called when the 
+    keystore is first needed, not when the provider is created.
+    """
+
+    keystore_path = path.expanduser(keystore_path)
+    if keystore_path != path.expanduser(DEFAULT_KEYSTORE_PATH) or path.exists(keystore_path):
+        return keystore_path
+    for candidate in KEYSTORE_PATHS:
+        if path.exists(path.expanduser(candidate)):
+            return path.expanduser(candidate)
+    return path.expanduser(KEYSTORE_PATHS[-1])
 
 DEFAULT_GENSERVER = 'gen.ecfeed.com'
-DEFAULT_KEYSTORE_PATH = __default_keystore_path()
+DEFAULT_KEYSTORE_PATH = KEYSTORE_PATHS[0]
 DEFAULT_KEYSTORE_PASSWORD = 'changeit'
+DEFAULT_POOL_SIZE = 10
+DEFAULT_CONNECT_TIMEOUT = 30
+DEFAULT_READ_TIMEOUT = None
+DEFAULT_EXPORT_CHUNK_SIZE = 1024 * 1024
+# POST bodies are opt-in until the generator service documents accepting them
+DEFAULT_POST_THRESHOLD = None
+REQUEST_CACHE_SIZE = 128
+RAW_CHUNK_SIZE = 65536
+DEFAULT_RETRIES = 0
+DEFAULT_RETRY_BACKOFF = 0.5
+MAX_RETRY_DELAY = 30
+# Longest wait for the response of a hedged request if read_timeout is None
+HEDGE_READ_TIMEOUT = 60
 
 class EcFeedError(Exception):
     pass
@@ -68,6 +103,874 @@ class DataSource(Enum):
         if self == DataSource.RANDOM:
             return 'genRandom'
 
+LOCAL_DATA_SOURCES = [DataSource.NWISE, DataSource.PAIRWISE, DataSource.CARTESIAN, DataSource.RANDOM]
+RESTARTED_DATA_SOURCES = [repr(DataSource.STATIC_DATA), repr(DataSource.CARTESIAN)]
+
+__retried_errors = None
+
+def retried_errors():
+    """Returns the tuple of exceptions caused by network failures, after which a response is requested again"""
+
+    global __retried_errors
+    if __retried_errors == None:
+        import requests
+        import urllib3
+        __retried_errors = (requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError,
+                            urllib3.exceptions.HTTPError, ConnectionError, TimeoutError)
+    return __retried_errors
+
+def serialize_user_data(user_data):
+    """Encodes generation arguments as the 'userData' parameter of a request"""
+
+    return json.dumps(user_data).replace(' ', '').replace('"', '\'')
+
+class GenerationRequest:
+    '''Request to the generator service prepared by TestProvider
+
+    ...
+    Attributes
+    ----------
+    genserver : str
+        Address of the generator service
+
+    request_type : str
+        'requestData' for generated data or 'requestExport' for data exported 
+        with a template
+
+    params : dict
+        Parameters of the request: method, model, serialized user data and 
+        optionally the template
+
+    user_data : dict
+        Generation arguments: data source, properties, choices, constraints and
+        test suites
+    '''
+
+    def __init__(self, genserver, request_type, params, user_data):
+        self.genserver = genserver
+        self.request_type = request_type
+        self.params = params
+        self.user_data = user_data
+        self.__encoded = None
+        self.__body = None
+        self.__url = None
+
+    def __str__(self):
+        return self.url()
+
+    def encoded(self):
+        """Returns the parameters of the request encoded as they are sent to the generator service"""
+
+        if self.__encoded == None:
+            self.__encoded = json.dumps(self.params).replace(' ', '')
+        return self.__encoded
+
+    def endpoint(self, genserver=None):
+        """Returns the url of the request without the parameters, to which they are posted"""
+
+        if genserver == None:
+            genserver = self.genserver
+        return 'https://' + genserver + '/testCaseService?requestType=' + self.request_type + '&client=python'
+
+    def url(self, genserver=None):
+        """Returns the url of the request, optionally addressed to another generator service"""
+
+        if genserver != None and genserver != self.genserver:
+            return self.endpoint(genserver) + '&request=' + self.encoded()
+        if self.__url == None:
+            self.__url = self.endpoint() + '&request=' + self.encoded()
+        return self.__url
+
+    def with_properties(self, **properties):
+        """Returns a copy of the request with changed properties of the generator"""
+
+        user_data = dict(self.user_data)
+        user_data['properties'] = dict(user_data.get('properties', {}), **properties)
+        params = dict(self.params)
+        params['userData'] = serialize_user_data(user_data)
+        return GenerationRequest(self.genserver, self.request_type, params, user_data)
+
+    def body(self):
+        """Returns the gzip compressed parameters of the request, sent as the body of a POST request"""
+
+        if self.__body == None:
+            import gzip
+            self.__body = gzip.compress(self.encoded().encode('utf-8'), compresslevel=6)
+        return self.__body
+
+    def key(self):
+        """Returns a digest identifying the request
+
+        Requests that differ only in the order of dictionary entries or in 
+        the types of property values (e.g. 10 and '10') have equal keys.
+        """
+
+        user_data = dict(self.user_data)
+        if 'properties' in user_data:
+            user_data['properties'] = {str(name) : str(value) for name, value in user_data['properties'].items()}
+        normalized = {name : value for name, value in self.params.items() if name != 'userData'}
+        normalized['userData'] = user_data
+        normalized['requestType'] = self.request_type
+        normalized['genserver'] = self.genserver
+        normalized = json.dumps(normalized, sort_keys=True, separators=(',', ':'), default=str)
+        import hashlib
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+def parse_method_definition(method_info_line):
+    """Parses the signature of a method, as sent by the generator service
+
+    Parameters
+    ----------
+    method_info_line : str
+        Signature of the method, e.g. 'com.example.TestClass.method(int arg1, String arg2)'
+
+    Returns
+    -------
+    A dictionary with method information, see TestProvider.method_info
+    """
+
+    result={}
+    full_method_name = method_info_line[0:method_info_line.find('(')]
+    method_args = method_info_line[method_info_line.find('(')+1:-1]
+    full_class_name = full_method_name[0:full_method_name.rfind('.')]
+    result['package_name'] = full_class_name[0:full_class_name.rfind('.')]
+    result['class_name'] = full_class_name[full_class_name.rfind('.')+1:-1]
+    result['method_name'] = full_method_name[full_method_name.rfind('.')+1:-1]
+    args=[]
+    for arg in method_args.split(','):
+        args.append(arg.strip().split(' '))
+    result['args'] = args
+    return result
+
+__json_loads = None
+__zstandard = False
+
+def json_decoder():
+    """Returns the function decoding JSON lines: orjson.loads if orjson is installed, json.loads otherwise"""
+
+    global __json_loads
+    if __json_loads == None:
+        try:
+            from orjson import loads
+        except ImportError:
+            loads = json.loads
+        __json_loads = loads
+    return __json_loads
+
+def zstandard_module():
+    """Returns the zstandard module, or None if it is not installed"""
+
+    global __zstandard
+    if __zstandard is False:
+        try:
+            import zstandard
+        except ImportError:
+            zstandard = None
+        __zstandard = zstandard
+    return __zstandard
+
+INT_TYPES = ['byte', 'short', 'int', 'long']
+FLOAT_TYPES = ['float', 'double']
+STRING_TYPES = ['String', 'char']
+BOOLEAN_TYPES = ['boolean']
+
+def __parse_boolean(value):
+    return value.lower() in ['true', '1']
+
+def __unknown_type(value):
+    return None
+
+def __enum_converter(typename):
+    i = typename.rfind('.')
+    module_name = typename[:i]
+    type_name = typename[i+1:]
+    enum_type = None
+
+    def convert(value):
+        nonlocal enum_type
+        if enum_type == None:
+            import importlib
+            enum_type = getattr(importlib.import_module(module_name), type_name)
+        return enum_type[value]
+
+    return convert
+
+__converters = {}
+
+def value_converter(typename):
+    """Returns a function converting text values to the given argument type
+
+    Converters are created once for each type name. Enum types, given by 
+    their full name, are imported on the first conversion.
+    """
+
+    converter = __converters.get(typename)
+    if converter != None:
+        return converter
+
+    if typename in INT_TYPES:
+        converter = int
+    elif typename in FLOAT_TYPES:
+        converter = float
+    elif typename in STRING_TYPES:
+        converter = str
+    elif typename in BOOLEAN_TYPES:
+        converter = __parse_boolean
+    elif typename.rfind('.') > 0:
+        converter = __enum_converter(typename)
+    else:
+        converter = __unknown_type
+    __converters[typename] = converter
+    return converter
+
+class ResponseParser:
+    '''Converts lines of a response from the generator service to generated items
+
+    The signature of the method from the 'info' line of the response is 
+    compiled once into a tuple of value converters (see value_converter), 
+    which are then applied to every test case. If the orjson package is 
+    installed, it is used to decode the lines.
+    ...
+    Attributes
+    ----------
+    template : TemplateType
+        Template of the exported data. If not None, lines are not parsed
+
+    raw_output : bool
+        If set to True, lines are not parsed
+
+    args_info : dict
+        Information about the method, taken from the 'info' line of the response
+
+    parse_seconds : float
+        Time spent decoding the JSON lines
+
+    cast_seconds : float
+        Time spent converting values to argument types
+    '''
+
+    def __init__(self, template=None, raw_output=False):
+        self.template = template
+        self.raw_output = raw_output
+        self.args_info = {}
+        self.converters = None
+        self.parse_seconds = 0
+        self.cast_seconds = 0
+        self.__loads = json_decoder()
+
+    def parse(self, line):
+        """Converts a line of the response
+
+        Returns
+        -------
+        The line itself if a template or raw output was requested, a list of 
+        values casted to argument types for a test case line and None for 
+        lines that do not contain test cases
+        """
+
+        if self.template != None:
+            return line
+        elif self.raw_output:
+            return line
+
+        start = time.perf_counter()
+        try:
+            parsed_line = self.__loads(line)
+        except ValueError as e:
+            print('Unexpected error while parsing line: "' + line + '": ' + str(e))
+            return None
+
+        test_case = parsed_line.get('testCase')
+        if test_case != None:
+            if self.converters == None:
+                raise EcFeedError('Test case received before method information: "' + line + '"')
+            parsed = time.perf_counter()
+            self.parse_seconds += parsed - start
+            result = [convert(arg['value']) for convert, arg in zip(self.converters, test_case)]
+            self.cast_seconds += time.perf_counter() - parsed
+            return result
+        if 'info' in parsed_line:
+            self.__parse_info_value(parsed_line['info'])
+        return None
+
+    def parse_info(self, line):
+        """Returns method information from the 'info' line of a raw response, or None for other lines"""
+
+        line = line.replace('"{', '{').replace('}"', '}').replace('\'', '"')#fix wrong formatting in some versions of the gen-server
+        try:                
+            parsed = json.loads(line)
+        except ValueError as e:
+            print('Unexpected problem when getting method info: ' + str(e))
+            return None
+        if 'info' in parsed :
+            return parse_method_definition(parsed['info']['method'])
+        return None
+
+    def compile(self, args_info):
+        """Prepares converters of values for the method described by args_info"""
+
+        self.args_info = args_info
+        self.converters = tuple(value_converter(arg[0]) for arg in args_info['args'])
+
+    def __parse_info_value(self, info):
+        info = info.replace('\'', '"')
+        try:
+            self.compile(parse_method_definition(json.loads(info)['method']))
+        except (ValueError, KeyError) as e:
+            pass
+
+def accepted_encodings():
+    """Returns the value of the Accept-Encoding header for compressed responses
+
+    zstd is accepted only if the zstandard package is installed.
+    """
+
+    return 'zstd, gzip' if zstandard_module() != None else 'gzip'
+
+class BodyDecoder:
+    '''Incremental decompression of a response body
+
+    Decompresses parts of the body as they are received, so the whole body 
+    is never held in memory, and counts received and decompressed bytes.
+    ...
+    Attributes
+    ----------
+    encoding : str
+        Content-Encoding of the body: 'gzip', 'deflate', 'zstd' or 'identity'
+
+    wire_bytes : int
+        Number of received (compressed) bytes
+
+    body_bytes : int
+        Number of decompressed bytes
+
+    seconds : float
+        Time spent decompressing
+    '''
+
+    def __init__(self, encoding=None):
+        self.encoding = (encoding or 'identity').strip().lower()
+        if self.encoding == 'x-gzip':
+            self.encoding = 'gzip'
+        if self.encoding not in ['gzip', 'deflate', 'zstd', 'identity']:
+            raise EcFeedError('Unsupported content encoding: ' + self.encoding)
+        if self.encoding == 'zstd' and zstandard_module() == None:
+            raise EcFeedError('zstd compressed response requires the zstandard package')
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self.seconds = 0
+        self.__decoder = self.__new_decoder()
+
+    def decode(self, data, max_length=0):
+        """Returns decompressed data of the next part of the body
+
+        If max_length is given, zlib decompression stops at that many bytes 
+        and the rest of the part is decompressed by further calls with 
+        empty data.
+        """
+
+        self.wire_bytes += len(data)
+        if self.__decoder == None:
+            self.body_bytes += len(data)
+            return data
+
+        start = time.perf_counter()
+        if self.encoding == 'zstd':
+            result = self.__decoder.decompress(data)
+        else:
+            result = self.__decoder.decompress(self.__decoder.unconsumed_tail + data, max_length)
+            while self.__decoder.eof and self.__decoder.unused_data and (max_length == 0 or len(result) < max_length):
+                unused_data = self.__decoder.unused_data
+                self.__decoder = self.__new_decoder()
+                result += self.__decoder.decompress(unused_data, max_length - len(result) if max_length else 0)
+        self.seconds += time.perf_counter() - start
+        self.body_bytes += len(result)
+        return result
+
+    def pending(self):
+        """Returns True if the decoder holds input that was not decompressed because of max_length"""
+
+        if self.__decoder == None or self.encoding == 'zstd':
+            return False
+        return len(self.__decoder.unconsumed_tail) > 0 or (self.__decoder.eof and len(self.__decoder.unused_data) > 0)
+
+    def flush(self):
+        """Returns the remaining decompressed data"""
+
+        if self.__decoder == None or self.encoding == 'zstd':
+            return b''
+        result = self.__decoder.flush()
+        self.body_bytes += len(result)
+        return result
+
+    def __new_decoder(self):
+        if self.encoding == 'gzip':
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif self.encoding == 'deflate':
+            return zlib.decompressobj()
+        elif self.encoding == 'zstd':
+            return zstandard_module().ZstdDecompressor().decompressobj()
+        return None
+
+def split_lines(chunks):
+    """Yields lines of text, without line terminators, from chunks of bytes"""
+
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(b'\r').decode('utf-8')
+    if pending:
+        yield pending.rstrip(b'\r').decode('utf-8')
+
+class AtomicFile:
+    '''Binary file that replaces its destination when it is complete
+
+    The data is written to a temporary file in the directory of the 
+    destination, created with the mode of a new file (0666 masked by the 
+    umask), so the destination gets the same permissions as when it is 
+    written directly. commit() renames the file to the destination and 
+    discard() removes it. Used as a context manager, the file is committed 
+    when the block succeeds and discarded when it raises.
+    ...
+    Attributes
+    ----------
+    destination : str
+        Path of the replaced file
+
+    name : str
+        Path of the temporary file
+    '''
+
+    def __init__(self, destination):
+        self.destination = path.expanduser(destination)
+        directory, name = path.split(path.abspath(self.destination))
+        self.name = path.join(directory, '.' + name + '.' + urandom(6).hex() + '.tmp')
+        self.__file = open(self.name, 'xb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type == None:
+            self.commit()
+        else:
+            self.discard()
+
+    def write(self, data):
+        return self.__file.write(data)
+
+    def close(self):
+        """Closes the file, without replacing the destination yet"""
+
+        self.__file.close()
+
+    def commit(self):
+        """Closes the file and renames it to the destination"""
+
+        try:
+            self.__file.close()
+            replace(self.name, self.destination)
+        except BaseException:
+            self.discard()
+            raise
+
+    def discard(self):
+        """Closes and removes the file, leaving the destination unchanged"""
+
+        try:
+            self.__file.close()
+        except OSError:
+            pass
+        if path.exists(self.name):
+            remove(self.name)
+
+def prefetched(iterable, depth, abort=None):
+    """Yields the items of an iterable read by a background thread
+
+    The thread reads up to 'depth' items ahead of the caller, so receiving 
+    and parsing the data overlaps with its consumption. An exception raised 
+    by the iterable is raised to the caller after the items read before it. 
+    When the generator is closed before the end, 'abort' is called to 
+    interrupt a read the thread may be blocked in (e.g. by closing the 
+    connection of a stalled response), then the thread stops and closes the 
+    iterable. Without 'abort', closing waits until the thread gets its 
+    current item.
+    """
+
+    import queue
+
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def read():
+        try:
+            for item in iterable:
+                if stop.is_set():
+                    return
+                items.put((True, item))
+            if not stop.is_set():
+                items.put((False, None))
+        except BaseException as e:
+            if not stop.is_set():
+                items.put((False, e))
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    reader = threading.Thread(target=read, name='ecfeed-prefetch', daemon=True)
+    reader.start()
+    try:
+        while True:
+            found, item = items.get()
+            if found:
+                yield item
+            elif item != None:
+                raise item
+            else:
+                return
+    finally:
+        stop.set()
+        if abort != None:
+            abort()
+        # The thread puts at most one more item after seeing a free slot
+        try:
+            while True:
+                items.get_nowait()
+        except queue.Empty:
+            pass
+        reader.join()
+
+class GenerationResult:
+    '''Result of a single job generated by TestProvider.generate_many
+
+    ...
+    Attributes
+    ----------
+    index : int
+        Position of the job in the list passed to generate_many
+
+    job : dict
+        The job, i.e. arguments passed to TestProvider.generate
+
+    data : list
+        All items yielded by TestProvider.generate for the job. Empty if 
+        the generation failed
+
+    error : Exception
+        The exception raised by the generation, or None if it succeeded
+    '''
+
+    def __init__(self, index, job, data=None, error=None):
+        self.index = index
+        self.job = job
+        self.data = data if data != None else []
+        self.error = error
+
+    def __repr__(self):
+        if self.error != None:
+            return f'GenerationResult(index={self.index}, error={self.error!r})'
+        return f'GenerationResult(index={self.index}, data=<{len(self.data)} items>)'
+
+PHASES = ['credentials', 'request', 'connect', 'ttfb', 'stream', 'decompression', 'parse', 'cast', 'total']
+
+class GenerationEvent:
+    '''Timing of a single call of TestProvider.generate
+
+    Passed to the hooks of the provider when the generator is exhausted, 
+    fails or is closed. Phases spent in the thread consuming the generator 
+    are measured separately, so the time spent by the consumer between the 
+    generated items shows only in 'total'.
+    ...
+    Attributes
+    ----------
+    method : str
+        Method passed to the generator
+
+    data_source : str
+        Data source of the request, e.g. 'genNWise'
+
+    template : TemplateType
+        Template of exported data, or None
+
+    seconds : dict
+        Duration of each of PHASES in seconds:
+            credentials: loading the credentials from the keystore
+            request: encoding the request
+            connect: opening connections to the generator service
+            ttfb: waiting for response headers after sending the request
+            stream: receiving the response body
+            decompression: decompressing the response body
+            parse: decoding the JSON lines
+            cast: converting values to argument types
+            total: the whole call, from the first to the last item
+
+    responses : int
+        Number of received responses, more than one if the call was retried
+
+    rows : int
+        Number of yielded test cases, or lines of exported data
+
+    wire_bytes : int
+        Number of received bytes
+
+    body_bytes : int
+        Number of bytes after decompression
+
+    cached : bool
+        True if the data was taken from the cache of the provider
+
+    shared : bool
+        True if the data was received by an identical call that was in flight 
+        at the same time, see the 'single_flight' argument of TestProvider. 
+        The transfer is then reported only by the event of that call
+
+    error : Exception
+        The exception that ended the generation, or None
+    '''
+
+    def __init__(self, method, data_source, template=None):
+        self.method = method
+        self.data_source = data_source
+        self.template = template
+        self.seconds = dict.fromkeys(PHASES, 0)
+        self.responses = 0
+        self.rows = 0
+        self.wire_bytes = 0
+        self.body_bytes = 0
+        self.cached = False
+        self.shared = False
+        self.error = None
+
+    def as_dict(self):
+        """Returns the event as a dictionary that may be serialized to JSON"""
+
+        result = {name : getattr(self, name) for name in ['method', 'data_source', 'responses', 'rows', 'wire_bytes', 'body_bytes', 'cached', 'shared']}
+        result['template'] = str(self.template) if self.template != None else None
+        result['error'] = repr(self.error) if self.error != None else None
+        result.update({phase + '_seconds' : seconds for phase, seconds in self.seconds.items()})
+        return result
+
+    def __repr__(self):
+        return f'GenerationEvent(method={self.method!r}, data_source={self.data_source!r}, rows={self.rows}, total={self.seconds["total"]:.6f})'
+
+_connect_timing = threading.local()
+_open_responses = threading.local()
+
+class _ResponseAborter:
+    """Responses opened by the thread reading one prefetched generation
+
+    'abort' is called by the consumer of the data when it stops early. It 
+    shuts down the sockets of the open responses, so a read blocked in the 
+    reading thread fails at once, and responses opened afterwards are aborted 
+    when they are registered.
+    """
+
+    def __init__(self):
+        self.aborted = False
+        self.__responses = set()
+        self.__lock = threading.Lock()
+
+    def track(self, iterable):
+        _open_responses.aborter = self
+        try:
+            yield from iterable
+        finally:
+            _open_responses.aborter = None
+
+    def add(self, response):
+        with self.__lock:
+            if not self.aborted:
+                self.__responses.add(response)
+                return
+        _abort_response(response)
+
+    def discard(self, response):
+        with self.__lock:
+            self.__responses.discard(response)
+
+    def abort(self):
+        with self.__lock:
+            self.aborted = True
+            responses, self.__responses = self.__responses, set()
+        for response in responses:
+            _abort_response(response)
+
+def _response_aborter():
+    """Returns the aborter of the responses opened by the calling thread, if any"""
+
+    return getattr(_open_responses, 'aborter', None)
+
+def _abort_response(response):
+    import socket
+
+    connection = getattr(response.raw, 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock != None:
+        try:
+            # socket.socket.shutdown bypasses the TLS layer of an SSLSocket
+            socket.socket.shutdown(sock, socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() == None:
+        future.result()[0].close()
+
+def _set_read_timeout(response, read_timeout):
+    """Sets the timeout of the following reads of a streamed response"""
+
+    connection = getattr(response.raw, 'connection', None)
+    sock = getattr(connection, 'sock', None)
+    if sock != None:
+        sock.settimeout(read_timeout)
+
+def _connect_seconds():
+    """Returns and resets the time spent opening connections by the calling thread"""
+
+    seconds = getattr(_connect_timing, 'seconds', 0)
+    _connect_timing.seconds = 0
+    return seconds
+
+__timed_adapter_class = None
+
+def _timed_adapter_class():
+    """Returns a requests adapter measuring the time of opening connections, see _connect_seconds
+
+    The classes are defined on first use, as they derive from classes of 
+    requests and urllib3.
+    """
+
+    global __timed_adapter_class
+    if __timed_adapter_class != None:
+        return __timed_adapter_class
+
+    import requests
+    import urllib3
+
+    class TimedHTTPSConnection(urllib3.connection.HTTPSConnection):
+        def connect(self):
+            start = time.perf_counter()
+            try:
+                super().connect()
+            finally:
+                _connect_timing.seconds = getattr(_connect_timing, 'seconds', 0) + time.perf_counter() - start
+
+    class TimedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    class TimedHTTPAdapter(requests.adapters.HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = dict(self.poolmanager.pool_classes_by_scheme, https=TimedHTTPSConnectionPool)
+
+    __timed_adapter_class = TimedHTTPAdapter
+    return __timed_adapter_class
+
+class KeystoreCredentials:
+    '''Certificates and private key decoded from a PKCS#12 keystore
+
+    The keystore is decoded on first use and the PEM encoded material is kept 
+    in a private temporary directory until the object is closed. If the 
+    modification time of the keystore file changes, it is decoded again.
+    ...
+    Attributes
+    ----------
+    keystore_path : str
+        Path to the keystore file. The default path is replaced with the 
+        file found by find_keystore when the keystore is first needed
+
+    load_count : int
+        Number of times the keystore was actually decoded
+    '''
+
+    def __init__(self, keystore_path, password):
+        '''
+        Parameters
+        ----------
+        keystore_path : str
+            path to keystore file with user and server certificates
+
+        password : str
+            password to keystore
+        '''
+
+        self.keystore_path = keystore_path
+        self.password = password
+        self.load_count = 0
+        self.__lock = threading.Lock()
+        self.__found = False
+        self.__mtime = None
+        self.__files = None
+        self.__cleanup = None
+
+    def files(self):
+        """Returns paths to the PEM files with decoded credentials
+
+        The keystore is decoded only if it was not decoded before or if 
+        it was modified since the last decoding.
+
+        Returns
+        -------
+        A tuple (cert, key, ca) with paths to the client certificate, client 
+        private key and the certificate of the generator service
+        """
+
+        with self.__lock:
+            if not self.__found:
+                self.keystore_path = find_keystore(self.keystore_path)
+                self.__found = True
+            mtime = stat(self.keystore_path).st_mtime_ns
+            if self.__files == None or mtime != self.__mtime:
+                self.__load(mtime)
+            return self.__files
+
+    def close(self):
+        """Removes the decoded credentials from the disk
+
+        The object can still be used after closing, the keystore will 
+        be decoded again when needed.
+        """
+
+        with self.__lock:
+            self.__release()
+
+    def __load(self, mtime):
+        import tempfile
+        import shutil
+        from OpenSSL import crypto
+
+        with open(self.keystore_path, 'rb') as keystore_file:
+            keystore = crypto.load_pkcs12(keystore_file.read(), self.password.encode('utf8'))
+
+        key = crypto.dump_privatekey(crypto.FILETYPE_PEM, keystore.get_privatekey())      
+        cert = crypto.dump_certificate(crypto.FILETYPE_PEM, keystore.get_certificate())
+        ca = crypto.dump_certificate(crypto.FILETYPE_PEM, keystore.get_ca_certificates()[0])
+
+        directory = tempfile.mkdtemp(prefix='ecfeed-')
+        cleanup = weakref.finalize(self, shutil.rmtree, directory, True)
+        files = []
+        for name, content in [('cert.pem', cert), ('key.pem', key), ('ca.pem', ca)]:
+            file_path = path.join(directory, name)
+            with open(file_path, 'wb') as pem_file:
+                pem_file.write(content)
+            chmod(file_path, 0o600)
+            files.append(file_path)
+
+        self.__release()
+        self.__files = tuple(files)
+        self.__cleanup = cleanup
+        self.__mtime = mtime
+        self.load_count += 1
+
+    def __release(self):
+        if self.__cleanup != None:
+            self.__cleanup()
+        self.__files = None
+        self.__cleanup = None
+        self.__mtime = None
+
 class TestProvider:
     '''Access provider to ecFeed remote generator services
 
@@ -77,6 +980,14 @@ class TestProvider:
     model : str
         Id of the accessed model. Must be accessible for user 
         owning the keystore file.        
+
+    credentials : KeystoreCredentials
+        Credentials decoded from the keystore, shared by all calls 
+        to the generator service
+
+    local : bool
+        If True, generators with a local implementation do not contact 
+        the generator service
     '''
 
     model = ''
@@ -84,17 +995,33 @@ class TestProvider:
     def __init__(self, genserver = DEFAULT_GENSERVER, 
                  keystore_path=DEFAULT_KEYSTORE_PATH, 
                  password=DEFAULT_KEYSTORE_PASSWORD,
-                 model=None):
+                 model=None,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT,
+                 cache=None,
+                 local=False,
+                 post_threshold=DEFAULT_POST_THRESHOLD,
+                 compression=True,
+                 retries=DEFAULT_RETRIES,
+                 retry_backoff=DEFAULT_RETRY_BACKOFF,
+                 hooks=None,
+                 single_flight=False,
+                 hedge=None,
+                 prefetch=0):
         '''
         Parameters
         ----------
-        genserver : str
-            url to ecFeed generator service (default is 'gen.ecfeed.com')
+        genserver : str or list
+            url to ecFeed generator service (default is 'gen.ecfeed.com'), or 
+            a list of urls of equivalent services. Each request is then sent 
+            to the service with the shortest observed latency, see 
+            ecfeed_routing.EndpointRouter
 
         keystore_path : str
             path to keystore file with user and server certificates 
-            (default is '~/.ecfeed.security.p12' on windows and 
-            '~/.ecfeed.security.p12' otherwise)
+            (default is '~/.ecfeed/security.p12', or '~/ecfeed/security.p12' 
+            if only that file exists, see find_keystore)
 
         password : str
             password to keystore (default is 'changeit')
@@ -102,12 +1029,147 @@ class TestProvider:
         model : str
             id of the default model used by generators
 
+        pool_size : int
+            maximum number of kept-alive connections to the generator service
+            (default is 10)
+
+        connect_timeout : float
+            number of seconds to wait for a connection to the generator 
+            service (default is 30)
+
+        read_timeout : float
+            number of seconds to wait for data from the generator service 
+            (default is None, which means waiting forever)
+
+        cache : ResultCache or str
+            cache of responses from the generator service, or path to the 
+            directory of the cache. Identical requests are served from the 
+            cache without contacting the generator service (default is None, 
+            which means that the responses are not cached)
+
+        local : bool
+            if set to True, the generators listed in LOCAL_DATA_SOURCES run 
+            locally, without contacting the generator service. Values of the 
+            method arguments are then taken from the 'choices' argument of 
+            the generators (see ecfeed_local). Requires numpy (default is False)
+
+        post_threshold : int
+            requests whose encoded parameters are longer than this number of 
+            characters are sent in a gzip compressed body of a POST request 
+            instead of the url of a GET request, which may be truncated or 
+            rejected by proxies. Check that the generator service accepts 
+            such requests before setting it, e.g. to 2000 (default is None, 
+            which means always GET)
+
+        compression : bool
+            if set to True, the generator service is asked to compress the 
+            responses with zstd (if the zstandard package is installed) or 
+            gzip. The responses are decompressed while they are streamed 
+            (default is True)
+
+        retries : int
+            number of times a broken response is requested again. The data 
+            already yielded by the generator is not repeated: responses of 
+            static suites and the cartesian generator are skipped up to the 
+            point where they broke, and the random generator is asked only 
+            for the missing test cases, skipping test cases already yielded 
+            if duplicates are not allowed. Other generators, including the 
+            adaptive random generator, are requested again only if they broke 
+            before yielding any data (default is 0)
+
+        retry_backoff : float
+            number of seconds to wait before the first retry. The delay is 
+            doubled with each consecutive failure (default is 0.5)
+
+        hooks : list
+            functions called with a GenerationEvent after each call of a 
+            generator of the provider, see add_hook (default is None)
+
+        single_flight : SingleFlight or bool
+            if set to True or to a SingleFlight, identical calls of generators 
+            made by several threads at the same time share one request to 
+            the generator service, and its data is passed to each of them 
+            through a bounded buffer (see ecfeed_flight). A call that falls 
+            behind the others is detached and continues with its own request 
+            like a retried call (see 'retries'). The number of saved requests 
+            is counted by the SingleFlight (default is False)
+
+        hedge : float
+            if 'genserver' is a list, a request that did not receive the 
+            response headers within this percentile (e.g. 95) of the latencies 
+            of its service is sent also to another service. The response that 
+            arrives first is used and the other one is closed. Services are 
+            hedged after 10 responses. Hedged requests wait for the response 
+            at most 'read_timeout', or HEDGE_READ_TIMEOUT seconds if it is 
+            None, and requests are not hedged while all 2 * 'pool_size' 
+            hedging threads are waiting (default is None, which means no 
+            hedging)
+
+        prefetch : int
+            default number of test cases read ahead by a background thread 
+            while the caller consumes the generated data, see the 'prefetch' 
+            argument of generate (default is 0, which means that the data is 
+            received only when the caller asks for it)
+
         '''
         
-        self.genserver = genserver
+        genservers = [genserver] if isinstance(genserver, str) else list(genserver)
+        self.genserver = genservers[0]
+        self.router = EndpointRouter(genservers, hedge)
         self.model = model
-        self.keystore_path = path.expanduser(keystore_path)
         self.password = password
+        self.credentials = KeystoreCredentials(path.expanduser(keystore_path), self.password)
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.cache = ResultCache(cache) if isinstance(cache, str) else cache
+        self.local = local
+        self.post_threshold = post_threshold
+        self.compression = compression
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.single_flight = SingleFlight() if single_flight is True else single_flight or None
+        self.prefetch = prefetch
+        self.__stats = {'requests' : 0, 'wire_bytes' : 0, 'body_bytes' : 0, 'generations' : 0, 'errors' : 0, 'cache_hits' : 0, 'shared' : 0, 'rows' : 0, 'hedged' : 0, 'hedge_wins' : 0}
+        self.__stats.update({phase + '_seconds' : 0 for phase in PHASES})
+        self.__stats_lock = threading.Lock()
+        self.__hooks = list(hooks) if hooks != None else []
+        self.__session = None
+        self.__session_lock = threading.Lock()
+        self.__hedge_executor = None
+        self.__hedge_workers = 0
+        self.__method_infos = {}
+        self.__method_infos_lock = threading.Lock()
+        self.__requests = collections.OrderedDict()
+        self.__requests_lock = threading.Lock()
+
+    @property
+    def keystore_path(self):
+        return self.credentials.keystore_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Releases resources held by the provider
+
+        Closes the connections to the generator service and removes the 
+        credentials decoded from the keystore. The provider may still be used 
+        afterwards, in which case the keystore is decoded again and new 
+        connections are opened.
+        """
+
+        with self.__session_lock:
+            if self.__session != None:
+                self.__session.close()
+                self.__session = None
+            if self.__hedge_executor != None:
+                self.__hedge_executor.shutdown(wait=False)
+                self.__hedge_executor = None
+        self.credentials.close()
 
     def generate(self, **kwargs):
         """Generic call to ecfeed generator service
@@ -146,6 +1208,9 @@ class TestProvider:
             If an argument is skipped in the dictionary, all defined choices will be used
             For example: choices={'arg1' : [choice1, choice2], 'arg2' : [choice3]}
 
+            For local generators, the values are lists of values of the parameters
+            and all parameters must be present, e.g. choices={'arg1' : [1, 2, 3]}
+
         constraints : list
             List of constraints used for the generation. If not provided, all constraints 
             will be used, to ignore all constraints set the value to 'NONE'
@@ -156,6 +1221,34 @@ class TestProvider:
 
         raw_output : if set to True works the same as template = None
 
+        chunk_size : int
+            If provided, the function yields the raw (decompressed) body of the 
+            response in chunks of bytes, without splitting it to lines and 
+            parsing them. Useful for writing exported data to files
+
+        seed : int
+            Seed of local generators. Local generators called with the same 
+            seed and arguments generate the same data (default is 0)
+
+        shard : tuple
+            A pair (i, n). If provided, a local cartesian generator yields only 
+            part i of n disjoint parts of its test cases
+
+        cache_mode : CacheMode
+            How the cache of the provider is used. CacheMode.USE (default) serves 
+            the data from the cache if available, CacheMode.REFRESH fetches the 
+            data from the generator service and stores it in the cache and 
+            CacheMode.BYPASS ignores the cache. Has no effect if the provider 
+            was created without a cache
+
+        prefetch : int
+            If provided, the response is received, parsed and casted by a 
+            background thread, which keeps up to this number of test cases 
+            (or chunks) ready for the caller, see prefetched. Closing the 
+            generator early closes the connection of the response, unless the 
+            response is shared by single flight with other generators. 
+            Default is the 'prefetch' argument of the provider
+
         Yields
         -------
             If a template was not provided, the function yields tuples of values casted
@@ -169,69 +1262,55 @@ class TestProvider:
             If the generator service resposes with error
         """
 
-        try:
-            method = kwargs.pop('method')
-            data_source = kwargs.pop('data_source')
-        except KeyError as e:
-            raise EcFeedError(f"missing required argument: {e}.")
-
-        model = kwargs.pop('model', self.model)
-        template = kwargs.pop('template', None)
-        raw_output = False
-        if 'raw_output' in kwargs or template == TemplateType.RAW:
-            raw_output = True
-        if template == TemplateType.RAW: 
-            template = None
-
+        cache_mode = kwargs.pop('cache_mode', CacheMode.USE)
+        chunk_size = kwargs.pop('chunk_size', None)
+        prefetch = kwargs.pop('prefetch', self.prefetch)
+        if self.local and kwargs.get('data_source') in LOCAL_DATA_SOURCES and not kwargs.get('url'):
+            yield from self.__generate_local(kwargs, chunk_size)
+            return
 
-        request = self.__prepare_request(genserver=self.genserver, 
-                            model=model, method=method, 
-                            data_source=data_source, template=template, 
-                            **kwargs)
+        start = time.perf_counter()
+        event = GenerationEvent(kwargs.get('method'), repr(kwargs.get('data_source')), kwargs.get('template'))
+        request, parser = self._prepare_generation(kwargs)
+        event.seconds['request'] = time.perf_counter() - start
 
         # print(f'request:{request}')
         if(kwargs.pop('url', None)):
-            yield request
+            yield request.url()
             return
 
-        with open(self.keystore_path, 'rb') as keystore_file:
-            keystore = crypto.load_pkcs12(keystore_file.read(), self.password.encode('utf8'))
-
-        key = crypto.dump_privatekey(crypto.FILETYPE_PEM, keystore.get_privatekey())      
-        cert = crypto.dump_certificate(crypto.FILETYPE_PEM, keystore.get_certificate())
-        ca = crypto.dump_certificate(crypto.FILETYPE_PEM, keystore.get_ca_certificates()[0])
-
-        with tempfile.NamedTemporaryFile(delete=False) as temp_cert_file: 
-            temp_cert_file.write(cert)
-        with tempfile.NamedTemporaryFile(delete=False) as temp_pkey_file: 
-            temp_pkey_file.write(key)
-        with tempfile.NamedTemporaryFile(delete=False) as temp_ca_file:
-            temp_ca_file.write(ca)
-
+        items = self.__items(request, parser, cache_mode, event, chunk_size)
+        if prefetch and self.single_flight == None:
+            aborter = _ResponseAborter()
+            items = prefetched(aborter.track(items), prefetch, aborter.abort)
+        elif prefetch:
+            items = prefetched(items, prefetch)
         try:
-            response = requests.get(request, verify=temp_ca_file.name, cert=(temp_cert_file.name, temp_pkey_file.name), stream=True)
-            if(response.status_code != 200):
-                print('Error: ' + str(response.status_code))
-                raise EcFeedError(json.loads(response.content.decode('utf-8'))['error'])
-            else:
-                args_info = {}
-                for line in response.iter_lines(decode_unicode=True):
-                    line = line.decode('utf-8')
-                    if template != None:
-                        yield line
-                    elif raw_output:
-                        yield line
-                    else:
-                        test_data = self.__parse_test_line(line=line)
-                        if 'method' in test_data:
-                            args_info = test_data['method']
-                        if 'values' in test_data:
-                            yield  [self.__cast(value) for value in list(zip(test_data['values'], [arg[0] for arg in args_info['args']]))]
-
+            for item in items:
+                event.rows += 1 if chunk_size == None else item.count(b'\n')
+                yield item
+        except Exception as e:
+            event.error = e
+            raise
         finally:
-            remove(temp_cert_file.name)
-            remove(temp_pkey_file.name)
-            remove(temp_ca_file.name)
+            items.close()
+            event.seconds['parse'] = parser.parse_seconds
+            event.seconds['cast'] = parser.cast_seconds
+            event.seconds['total'] = time.perf_counter() - start
+            self.__emit(event)
+
+    def __items(self, request, parser, cache_mode, event, chunk_size):
+        stream = self.__stream if self.single_flight == None else self.__shared_stream
+        if chunk_size != None:
+            yield from stream(request, cache_mode, event, chunk_size)
+            return
+
+        for line in stream(request, cache_mode, event):
+            item = parser.parse(line)
+            if item != None:
+                yield item
+            elif parser.args_info:
+                self.__remember_method_info(request.genserver, request.params['model'], request.params['method'], parser.args_info)
 
     def generate_nwise(self, **kwargs): 
         return self.nwise(template=None, **kwargs)
@@ -292,6 +1371,10 @@ class TestProvider:
         method : str
             See 'generate'
 
+        coverage : int
+            The percent of the cartesian product that will be generated. 
+            Local generators sample the product without replacement
+
         template : str
             See 'generate'            
 
@@ -308,6 +1391,7 @@ class TestProvider:
 
         properties={}
         properties['coverage'] = str(kwargs.pop('coverage', 100))
+        kwargs['properties'] = properties
 
         yield from self.generate(data_source=DataSource.CARTESIAN, **kwargs)
 
@@ -330,6 +1414,9 @@ class TestProvider:
             If set to True, the generator will try to maximize the Hamming distance
             of each generate test case from already generated tests
 
+        duplicates : boolean
+            If set to False, each generated test case is different
+
         template : str
             See 'generate'            
 
@@ -375,6 +1462,58 @@ class TestProvider:
 
         yield from self.generate(data_source=DataSource.STATIC_DATA, **kwargs)
 
+    def generate_many(self, jobs, max_workers=None, ordered=True):
+        """Runs many generations concurrently
+
+        The jobs are executed by a pool of worker threads that share the 
+        credentials and the connections of the provider. A failure of one 
+        job does not affect the others.
+
+        Parameters
+        ----------
+        jobs : list
+            List of dictionaries with arguments of 'generate', e.g. 
+            {'method' : 'TestClass.method', 'data_source' : DataSource.RANDOM, 
+            'properties' : {'length' : '10'}, 'choices' : {...}, 'constraints' : [...],
+            'template' : TemplateType.CSV}
+
+        max_workers : int
+            Number of worker threads. Default is the pool size of the provider
+
+        ordered : bool
+            If set to True (default), the results are yielded in the order of 
+            the jobs. Otherwise they are yielded as soon as they are finished
+
+        Yields
+        -------
+            GenerationResult for each job
+        """
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        jobs = list(jobs)
+        executor = ThreadPoolExecutor(max_workers=max_workers if max_workers != None else self.pool_size)
+        futures = {}
+        try:
+            for index, job in enumerate(jobs):
+                futures[executor.submit(self.__run_job, index, job)] = index
+            if ordered:
+                for future in list(futures):
+                    yield future.result()
+            else:
+                for future in as_completed(futures):
+                    yield future.result()
+        finally:
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def __run_job(self, index, job):
+        try:
+            return GenerationResult(index, job, data=list(self.generate(**dict(job))))
+        except Exception as e:
+            return GenerationResult(index, job, error=e)
+
     def method_info(self, method, model=None):
         """Queries generator service for information about the method
 
@@ -393,19 +1532,68 @@ class TestProvider:
             class_name: full name of the class, where the method is defined, e.g com.example.TestClass
             method_name: full name of the method. Repeated from the argument
             args: list of tuples containing type and name of arguments, eg. [[int, arg1], [String, arg2]]                           
+
+        The information is queried only once for each method and model. It is
+        also remembered from the responses of all 'generate_' functions. Each
+        call returns a new copy, which the caller may modify.
         """
 
+        if model == None:
+            model = self.model
+        with self.__method_infos_lock:
+            info = self.__method_infos.get((self.genserver, model, method))
+        if info != None:
+            return copy.deepcopy(info)
+
         info={}
+        parser = ResponseParser()
         for line in self.generate_random(method=method, length=0, raw_output=True, model=model):
-            line = line.replace('"{', '{').replace('}"', '}').replace('\'', '"')#fix wrong formatting in some versions of the gen-server
-            try:                
-                parsed = json.loads(line)
-            except ValueError as e:
-                print('Unexpected problem when getting method info: ' + str(e))
-            if 'info' in parsed :
-                method_name = parsed['info']['method']
-                info = self.__parse_method_definition(method_name)
+            parsed = parser.parse_info(line)
+            if parsed != None:
+                info = parsed
+        if info:
+            self.__remember_method_info(self.genserver, model, method, info)
         return info
+
+    def method_data(self, generator, **kwargs):
+        """Calls a generator and returns the generated data together with the method signature
+
+        Both are taken from a single response of the generator service, so
+        this function is a cheaper replacement of calling method_arg_names
+        and a generator separately, e.g. in pytest:
+
+            names, types, data = ecfeed.method_data(ecfeed.generate_random, method='TestClass.method', length=5)
+            @pytest.mark.parametrize(names, data)
+
+        Parameters
+        ----------
+        generator : function
+            One of the 'generate_' functions of this provider, e.g. generate_nwise
+
+        kwargs
+            Arguments of the generator. Argument 'method' is required
+
+        Returns
+        -------
+        A tuple (arg_names, arg_types, data), where data is a generator of test cases
+        """
+
+        method = kwargs['method']
+        model = kwargs.get('model', None)
+        if model == None:
+            model = self.model
+
+        data = generator(**kwargs)
+        try:
+            first = [next(data)]
+        except StopIteration:
+            first = []
+
+        with self.__method_infos_lock:
+            info = self.__method_infos.get((self.genserver, model, method))
+        if info == None:
+            info = self.method_info(method=method, model=model)
+        return self.method_arg_names(method_info=info), self.method_arg_types(method_info=info), itertools.chain(first, data)
  
     def method_arg_names(self, method_info=None, method_name=None):
         """Returns list of argument names of the method
@@ -451,52 +1639,649 @@ class TestProvider:
         elif method_name != None:
             return self.method_arg_types(self.method_info(method=method_name))
 
+    def export_to(self, destination, generator, atomic=False, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE, **kwargs):
+        """Calls a generator and writes the response directly to a file
+
+        The response is copied in large chunks, without splitting it to 
+        lines and decoding them, which makes it the fastest way to save 
+        large exports.
+
+        Parameters
+        ----------
+        destination : str or file
+            Path of the written file or a file object opened in binary mode
+
+        generator : function
+            One of the 'export_' functions of this provider, e.g. export_nwise
+
+        atomic : bool
+            If set to True and destination is a path, the data is written to 
+            a temporary file in the same directory, which is renamed to 
+            destination when the export is complete, so the file at 
+            destination never contains incomplete data (default is False)
+
+        chunk_size : int
+            Size of the copied chunks in bytes (default is 1MB)
+
+        kwargs
+            Arguments of the generator. Argument 'method' is required
+
+        Returns
+        -------
+        A dictionary with the number of written bytes ('bytes'), duration of 
+        the export in seconds ('seconds') and its speed ('bytes_per_second')
+        """
+
+        start = time.perf_counter()
+        written = 0
+        if not isinstance(destination, str):
+            for chunk in generator(chunk_size=chunk_size, **kwargs):
+                destination.write(chunk)
+                written += len(chunk)
+        else:
+            with AtomicFile(destination) if atomic else open(path.expanduser(destination), 'wb') as output:
+                for chunk in generator(chunk_size=chunk_size, **kwargs):
+                    output.write(chunk)
+                    written += len(chunk)
+
+        seconds = time.perf_counter() - start
+        return {'bytes' : written, 'seconds' : seconds, 'bytes_per_second' : written / seconds if seconds > 0 else 0}
+
+    def generate_columnar(self, generator, chunk_size=None, **kwargs):
+        """Calls a generator and stores the generated test cases by columns
+
+        Values of numeric arguments are stored in arrays of 64 bit integers 
+        or floats, and values of other arguments are dictionary encoded: each 
+        distinct value is converted to the argument type once and the test 
+        cases hold 32 bit codes. Suites of millions of test cases take a 
+        fraction of the memory of a list of rows. The columns may be viewed 
+        as numpy arrays without copying.
+
+        Parameters
+        ----------
+        generator : function
+            One of the 'generate_' functions of this provider, e.g. generate_random
+
+        chunk_size : int
+            Number of values of a column buffered before they are moved to 
+            the array (default is 65536)
+
+        kwargs
+            Arguments of the generator. Argument 'method' is required
+
+        Returns
+        -------
+        ecfeed_columnar.ColumnarSuite
+        """
+
+        from ecfeed_columnar import build_columnar, DEFAULT_CHUNK_SIZE
+
+        kwargs['raw_output'] = True
+        suite = build_columnar(generator(**kwargs), chunk_size=chunk_size if chunk_size != None else DEFAULT_CHUNK_SIZE)
+        model = kwargs.get('model', None)
+        self.__remember_method_info(self.genserver, model if model != None else self.model, kwargs['method'], suite.args_info)
+        return suite
+
+    def save_suite(self, destination, generator, **kwargs):
+        """Calls a generator and writes the generated test cases to a binary suite file
+
+        The file holds the signature of the method, the choices of each 
+        argument and the test cases as fixed width indices of the choices. 
+        It is loaded by ecfeed_binary.load_suite, which maps it into memory 
+        instead of parsing it, and may be converted to the export templates 
+        by ecfeed_binary.convert_suite.
+
+        Parameters
+        ----------
+        destination : str
+            Path of the suite file. It is replaced only when the whole 
+            response is received
+
+        generator : function
+            One of the 'generate_' or 'export_' functions of this provider, 
+            e.g. generate_random. Exported data is requested without a template
+
+        kwargs
+            Arguments of the generator. Argument 'method' is required
+
+        Returns
+        -------
+        The number of written test cases
+        """
+
+        from ecfeed_binary import SuiteWriter
+
+        kwargs['raw_output'] = True
+        if 'template' in kwargs:
+            kwargs['template'] = TemplateType.RAW
+        with SuiteWriter(destination) as writer:
+            for line in generator(**kwargs):
+                writer.write(line)
+        model = kwargs.get('model', None)
+        self.__remember_method_info(self.genserver, model if model != None else self.model, kwargs['method'], parse_method_definition(writer.signature))
+        return writer.rows
+
+    def export_many(self, destinations, generator, atomic=False, **kwargs):
+        """Calls a generator once and writes the test cases to several files with different templates
+
+        The raw response is rendered with the built-in templates by the 
+        client (see ecfeed_render), so all the files hold the same test 
+        cases, also for random generators, and the generator service is 
+        asked only once instead of once for each template.
+
+        Parameters
+        ----------
+        destinations : dict or list
+            Destinations by templates, e.g. {TemplateType.CSV : 'suite.csv', 
+            TemplateType.Gherkin : 'suite.feature'}, or a list of pairs 
+            (template, destination). A destination is a path or a file object 
+            opened in binary mode. Templates CSV, XML, Gherkin and JSON are 
+            supported
+
+        generator : function
+            One of the 'generate_' or 'export_' functions of this provider, 
+            e.g. generate_random. Exported data is requested without a template
+
+        atomic : bool
+            If set to True, paths are replaced only when the whole response 
+            is received (default is False)
+
+        kwargs
+            Arguments of the generator. Argument 'method' is required
+
+        Returns
+        -------
+        A dictionary with the number of written test cases ('rows'), the 
+        number of bytes written to each destination ('written'), their sum 
+        ('bytes'), the duration in seconds ('seconds') and the speed 
+        ('bytes_per_second')
+        """
+
+        from ecfeed_render import MultiplexWriter
+
+        start = time.perf_counter()
+        kwargs['raw_output'] = True
+        if 'template' in kwargs:
+            kwargs['template'] = TemplateType.RAW
+        with MultiplexWriter(destinations, atomic=atomic) as writer:
+            for line in generator(**kwargs):
+                writer.write(line)
+        model = kwargs.get('model', None)
+        self.__remember_method_info(self.genserver, model if model != None else self.model, kwargs['method'], parse_method_definition(writer.signature))
+
+        seconds = time.perf_counter() - start
+        written = sum(writer.written)
+        return {'rows' : writer.rows, 'written' : writer.written, 'bytes' : written, 'seconds' : seconds,
+                'bytes_per_second' : written / seconds if seconds > 0 else 0}
+
+    def analyze_coverage(self, generator, values=None, tuple_size=None, **kwargs):
+        """Calls a generator and analyzes the n-wise coverage of the generated test cases
+
+        Requires numpy. See ecfeed_coverage for the analysis of exports and 
+        suite files.
+
+        Parameters
+        ----------
+        generator : function
+            One of the 'generate_' or 'export_' functions of this provider, 
+            e.g. generate_random. Exported data is requested without a template
+
+        values : dict
+            Lists of choice values by argument names. The choices of the other 
+            arguments are the distinct values of the generated test cases 
+            (default is None)
+
+        tuple_size : int
+            Size of the counted tuples (default is 'n' of an n-wise generator, 
+            or 2)
+
+        kwargs
+            Arguments of the generator. Argument 'method' is required
+
+        Returns
+        -------
+        ecfeed_coverage.CoverageAnalyzer, to which test cases of other calls 
+        may be added
+        """
+
+        from ecfeed_coverage import CoverageAnalyzer, read_raw
+
+        kwargs['raw_output'] = True
+        if 'template' in kwargs:
+            kwargs['template'] = TemplateType.RAW
+        names, rows = read_raw(generator(**kwargs))
+        analyzer = CoverageAnalyzer(names, values, int(tuple_size if tuple_size != None else kwargs.get('n', 2)))
+        return analyzer.add_rows(rows)
+
+    def __generate_local(self, kwargs, chunk_size):
+        from ecfeed_local import LocalGeneration
+
+        try:
+            method = kwargs['method']
+            kwargs['data_source']
+        except KeyError as e:
+            raise EcFeedError(f"missing required argument: {e}.")
+
+        template = kwargs.get('template', None)
+        if (template != None and template != TemplateType.RAW) or chunk_size != None:
+            raise EcFeedError('Templates are not supported by local generators')
+
+        generation = LocalGeneration(**kwargs)
+        model = kwargs.get('model', None)
+        with self.__method_infos_lock:
+            self.__method_infos[(self.genserver, model if model != None else self.model, method)] = generation.args_info
+
+        if 'raw_output' in kwargs or template == TemplateType.RAW:
+            yield from generation.lines()
+        else:
+            yield from generation.rows()
+
+    def __remember_method_info(self, genserver, model, method, info):
+        with self.__method_infos_lock:
+            self.__method_infos.setdefault((genserver, model, method), copy.deepcopy(info))
+
+    def __stream(self, request, cache_mode, event, chunk_size=None):
+        if self.cache == None or cache_mode == CacheMode.BYPASS:
+            yield from self.__fetch_resumable(request, event, chunk_size)
+            return
+
+        key = request.key()
+        if cache_mode != CacheMode.REFRESH:
+            cached = self.cache.get(key, chunk_size=chunk_size)
+            if cached != None:
+                event.cached = True
+                yield from cached
+                return
+
+        with self.cache.writer(key) as writer:
+            for data in self.__fetch_resumable(request, event, chunk_size):
+                writer.write(data)
+                yield data
+
+    def __shared_stream(self, request, cache_mode, event, chunk_size=None):
+        flight_event = GenerationEvent(event.method, event.data_source, event.template)
+        subscription = self.single_flight.subscribe((request.key(), cache_mode, chunk_size),
+                                                    lambda: self.__stream(request, cache_mode, flight_event, chunk_size))
+        event.shared = not subscription.leader
+        delivered = 0
+        try:
+            for data in subscription:
+                delivered += 1 if chunk_size == None else len(data)
+                yield data
+        finally:
+            subscription.close()
+            if subscription.leader:
+                event.responses += flight_event.responses
+                event.wire_bytes += flight_event.wire_bytes
+                event.body_bytes += flight_event.body_bytes
+                event.cached = flight_event.cached
+                for phase in ['credentials', 'connect', 'ttfb', 'stream', 'decompression']:
+                    event.seconds[phase] += flight_event.seconds[phase]
+        if subscription.detached:
+            yield from self.__fetch_resumable(request, event, chunk_size, delivered)
+
+    def __fetch_resumable(self, request, event, chunk_size, delivered=0):
+        resumed, skip = request, 0
+        if delivered > 0:
+            resumption = self.__resumption(request, delivered, chunk_size)
+            if resumption == None:
+                raise EcFeedError('the data of ' + str(request.user_data.get('dataSource')) + ' generator cannot be resumed after ' + 
+                                  str(delivered) + (' lines' if chunk_size == None else ' bytes'))
+            resumed, skip = resumption
+        if self.retries == 0 and skip == 0:
+            yield from self.__fetch(request, event, chunk_size)
+            return
+
+        # Resumed random streams without duplicates may repeat delivered test cases
+        seen = set() if self.__deduplicated(request, chunk_size) else None
+        failures = 0
+        while True:
+            delivered_before = delivered
+            try:
+                for data in self.__fetch(resumed, event, chunk_size):
+                    if skip > 0:
+                        if chunk_size == None:
+                            skip -= 1
+                            continue
+                        cut = min(skip, len(data))
+                        data, skip = data[cut:], skip - cut
+                        if not data:
+                            continue
+                    if seen != None and delivered > 0:
+                        if data in seen:
+                            continue
+                        seen.add(data)
+                    delivered += 1 if chunk_size == None else len(data)
+                    yield data
+                if seen == None or resumed is request or delivered == delivered_before or \
+                   delivered - 1 >= int(request.user_data['properties']['length']):
+                    return
+                resumed, skip = self.__resumption(request, delivered, chunk_size, seen)
+            except retried_errors() as e:
+                failures = 1 if delivered > delivered_before else failures + 1
+                resumption = self.__resumption(request, delivered, chunk_size, seen)
+                aborter = _response_aborter()
+                if failures > self.retries or resumption == None or (aborter != None and aborter.aborted):
+                    raise
+                resumed, skip = resumption
+                time.sleep(min(self.retry_backoff * 2 ** (failures - 1), MAX_RETRY_DELAY))
+
+    def __deduplicated(self, request, chunk_size):
+        return request.user_data.get('dataSource') == repr(DataSource.RANDOM) and chunk_size == None and \
+               request.request_type == 'requestData' and request.user_data.get('properties', {}).get('duplicates') == 'false'
+
+    def __resumption(self, request, delivered, chunk_size, seen=None):
+        if delivered == 0:
+            return request, 0
+        data_source = request.user_data.get('dataSource')
+        if data_source in RESTARTED_DATA_SOURCES:
+            return request, delivered
+        if data_source == repr(DataSource.RANDOM) and chunk_size == None and request.request_type == 'requestData':
+            # An adaptive generator does not know the test cases delivered before 
+            # the break, and without duplicates the resumed test cases are only 
+            # deduplicated against the delivered ones that were seen
+            properties = request.user_data.get('properties', {})
+            if properties.get('adaptive') == 'true' or (self.__deduplicated(request, chunk_size) and seen == None):
+                return None
+            length = int(properties.get('length', 1))
+            return request.with_properties(length=str(max(0, length - (delivered - 1)))), 1
+        return None
+
+    def __fetch(self, request, event, chunk_size=None):
+        start = time.perf_counter()
+        cert, key, ca = self.credentials.files()
+        event.seconds['credentials'] += time.perf_counter() - start
+
+        headers = {'Accept-Encoding' : accepted_encodings() if self.compression else 'identity'}
+        if self.uses_post(request):
+            headers.update({'Content-Type' : 'application/json', 'Content-Encoding' : 'gzip'})
+        start = time.perf_counter()
+        endpoint = self.router.choose()
+        delay = self.router.hedge_delay(endpoint)
+        if delay == None:
+            response, connect = self.__send(request, endpoint, headers, cert, key, ca, self.read_timeout)
+        else:
+            response, connect = self.__send_hedged(request, endpoint, delay, headers, cert, key, ca)
+        event.seconds['connect'] += connect
+        event.seconds['ttfb'] += time.perf_counter() - start - connect
+        event.responses += 1
+        aborter = _response_aborter()
+        if aborter != None:
+            aborter.add(response)
+        try:
+            if(response.status_code != 200):
+                print('Error: ' + str(response.status_code))
+                raise EcFeedError(json.loads(response.content.decode('utf-8'))['error'])
+            elif chunk_size != None:
+                yield from self.__body(response, event, chunk_size)
+            else:
+                yield from split_lines(self.__body(response, event, DEFAULT_EXPORT_CHUNK_SIZE))
+        finally:
+            if aborter != None:
+                aborter.discard(response)
+            response.close()
+
+    def __send(self, request, endpoint, headers, cert, key, ca, read_timeout):
+        _connect_seconds()
+        start = time.perf_counter()
+        timeout = (self.connect_timeout, read_timeout)
+        try:
+            if self.uses_post(request):
+                response = self.__get_session().post(request.endpoint(endpoint.address), data=request.body(), verify=ca, cert=(cert, key), 
+                                                     stream=True, timeout=timeout, headers=headers)
+            else:
+                response = self.__get_session().get(request.url(endpoint.address), verify=ca, cert=(cert, key), stream=True,
+                                                    timeout=timeout, headers=headers)
+        except BaseException:
+            self.router.fail(endpoint, time.perf_counter() - start)
+            raise
+        self.router.record(endpoint, time.perf_counter() - start)
+        return response, _connect_seconds()
+
+    def __send_hedged(self, request, endpoint, delay, headers, cert, key, ca):
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        # A request that lost cannot be cancelled, so its thread is bounded by a 
+        # finite read timeout, and no request waits for a thread held by one
+        if not self.__reserve_hedge_worker():
+            return self.__send(request, endpoint, headers, cert, key, ca, self.read_timeout)
+        read_timeout = HEDGE_READ_TIMEOUT if self.read_timeout == None else self.read_timeout
+        executor = self.__get_hedge_executor()
+        futures = [self.__submit_hedged(executor, request, endpoint, headers, cert, key, ca, read_timeout)]
+        if not wait(futures, timeout=delay).done and self.__reserve_hedge_worker():
+            futures.append(self.__submit_hedged(executor, request, self.router.choose(exclude=endpoint), headers, cert, key, ca, read_timeout))
+            with self.__stats_lock:
+                self.__stats['hedged'] += 1
+
+        pending = set(futures)
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            succeeded = [future for future in futures if future in done and future.exception() == None]
+            if succeeded:
+                break
+            if not pending:
+                return futures[0].result()
+        winner = succeeded[0]
+        for future in futures:
+            if future is not winner:
+                future.add_done_callback(_close_response)
+        if winner is not futures[0]:
+            with self.__stats_lock:
+                self.__stats['hedge_wins'] += 1
+        if read_timeout != self.read_timeout:
+            _set_read_timeout(winner.result()[0], self.read_timeout)
+        return winner.result()
+
+    def __reserve_hedge_worker(self):
+        with self.__stats_lock:
+            if self.__hedge_workers >= 2 * self.pool_size:
+                return False
+            self.__hedge_workers += 1
+            return True
+
+    def __submit_hedged(self, executor, *arguments):
+        def release(future):
+            with self.__stats_lock:
+                self.__hedge_workers -= 1
+
+        try:
+            future = executor.submit(self.__send, *arguments)
+        except BaseException:
+            release(None)
+            raise
+        future.add_done_callback(release)
+        return future
+
+    def __get_hedge_executor(self):
+        with self.__session_lock:
+            if self.__hedge_executor == None:
+                from concurrent.futures import ThreadPoolExecutor
+                self.__hedge_executor = ThreadPoolExecutor(max_workers=2 * self.pool_size, thread_name_prefix='ecfeed-hedge')
+            return self.__hedge_executor
+
+    def latencies(self):
+        """Returns the latency histograms of the generator services
+
+        Returns
+        -------
+        A dictionary with the summary of the latencies of each address in 
+        'genserver', from sending a request to receiving the response 
+        headers: the number of responses ('count'), the mean, the longest 
+        ('max') and the percentiles ('p50', 'p90', 'p99') of the latencies 
+        in seconds, the number of requests that failed ('failures') and the 
+        non-empty buckets of the histogram as [upper bound, count] pairs 
+        ('buckets'), see ecfeed_routing.LatencyHistogram
+        """
+
+        return self.router.latencies()
+
+    def __body(self, response, event, chunk_size):
+        decoder = BodyDecoder(response.headers.get('Content-Encoding'))
+        received = response.raw.stream(RAW_CHUNK_SIZE, decode_content=False)
+        try:
+            while True:
+                start = time.perf_counter()
+                data = next(received, None)
+                event.seconds['stream'] += time.perf_counter() - start
+                if data == None:
+                    break
+                chunk = decoder.decode(data, chunk_size)
+                while chunk:
+                    yield chunk
+                    chunk = decoder.decode(b'', chunk_size) if decoder.pending() else b''
+            chunk = decoder.flush()
+            if chunk:
+                yield chunk
+        finally:
+            event.wire_bytes += decoder.wire_bytes
+            event.body_bytes += decoder.body_bytes
+            event.seconds['decompression'] += decoder.seconds
+            self._record_transfer(decoder)
+
+    def _record_transfer(self, decoder):
+        with self.__stats_lock:
+            self.__stats['requests'] += 1
+            self.__stats['wire_bytes'] += decoder.wire_bytes
+            self.__stats['body_bytes'] += decoder.body_bytes
+            self.__stats['decompression_seconds'] += decoder.seconds
+
+    def __emit(self, event):
+        with self.__stats_lock:
+            self.__stats['generations'] += 1
+            self.__stats['errors'] += 1 if event.error != None else 0
+            self.__stats['cache_hits'] += 1 if event.cached else 0
+            self.__stats['shared'] += 1 if event.shared else 0
+            self.__stats['rows'] += event.rows
+            for phase, seconds in event.seconds.items():
+                if phase != 'decompression':
+                    self.__stats[phase + '_seconds'] += seconds
+            hooks = list(self.__hooks)
+        for hook in hooks:
+            hook(event)
+
+    def add_hook(self, hook):
+        """Registers a function called with a GenerationEvent after each call of a generator
+
+        The function is called in the thread that consumed the generator, 
+        when the generator is exhausted, raises an exception or is closed. 
+        Calls of local generators and requests for urls are not reported.
+        """
+
+        with self.__stats_lock:
+            self.__hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """Unregisters a function registered by add_hook"""
+
+        with self.__stats_lock:
+            self.__hooks.remove(hook)
+
+    def stats(self):
+        """Returns statistics of the calls to the generator service
+
+        Returns
+        -------
+        A dictionary with the number of received responses ('requests'), 
+        received bytes ('wire_bytes') and bytes after decompression 
+        ('body_bytes'), the number of calls of generators ('generations'), 
+        the calls that failed ('errors'), were served from the cache 
+        ('cache_hits') or shared the request of an identical call in flight 
+        ('shared'), the number of yielded test cases or lines ('rows'), 
+        the number of hedged requests ('hedged') and of hedged requests 
+        answered before the original ones ('hedge_wins'), and the total 
+        duration of each of PHASES in seconds, e.g. 'ttfb_seconds' (see 
+        GenerationEvent)
+        """
+
+        with self.__stats_lock:
+            return dict(self.__stats)
+
+    def uses_post(self, request):
+        """Returns True if the request is sent as a POST request, see post_threshold"""
+
+        return self.post_threshold != None and len(request.encoded()) > self.post_threshold
+
+    def __get_session(self):
+        with self.__session_lock:
+            if self.__session == None:
+                import requests
+                adapter = _timed_adapter_class()(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                self.__session = session
+            return self.__session
+
+    def _prepare_generation(self, kwargs):
+        """Translates arguments of 'generate' to a request and a parser of its response
+
+        Consumed arguments are removed from kwargs.
+        """
+
+        try:
+            method = kwargs.pop('method')
+            data_source = kwargs.pop('data_source')
+        except KeyError as e:
+            raise EcFeedError(f"missing required argument: {e}.")
+
+        model = kwargs.pop('model', self.model)
+        template = kwargs.pop('template', None)
+        raw_output = False
+        if 'raw_output' in kwargs or template == TemplateType.RAW:
+            raw_output = True
+        if template == TemplateType.RAW: 
+            template = None
+
+        request = self.__prepare_request(genserver=self.genserver, 
+                            model=model, method=method, 
+                            data_source=data_source, template=template, 
+                            **kwargs)
+
+        return request, ResponseParser(template=template, raw_output=raw_output)
+
     def __prepare_request(self, method, data_source, 
                           genserver=None, 
                           model=None,
-                          template=None, **user_data) -> str:
+                          template=None, **user_data) -> GenerationRequest:
                           
         if genserver == None:
             genserver = self.genserver
         if model == None:
             model = self.model
 
+        shape = json.dumps([genserver, model, method, data_source, template] + 
+                           [user_data.get(name) for name in ['test_suites', 'properties', 'constraints', 'choices']], 
+                           separators=(',', ':'), default=repr)
+        with self.__requests_lock:
+            request = self.__requests.get(shape)
+            if request != None:
+                self.__requests.move_to_end(shape)
+                return request
+
+        request = self.__create_request(genserver, model, method, data_source, template, user_data)
+        with self.__requests_lock:
+            self.__requests[shape] = request
+            if len(self.__requests) > REQUEST_CACHE_SIZE:
+                self.__requests.popitem(last=False)
+        return request
+
+    def __create_request(self, genserver, model, method, data_source, template, user_data):
+        # Cached requests must not change with the dictionaries of the caller
+        user_data = self.__user_data(data_source=data_source, **copy.deepcopy(user_data))
+
         generate_params={}
         generate_params['method'] = ''
         generate_params['method'] += method
         generate_params['model'] = model
-        generate_params['userData'] = self.__serialize_user_data(data_source=data_source, **user_data)
+        generate_params['userData'] = serialize_user_data(user_data)
         
         request_type='requestData'
         if template != None:
             generate_params['template'] = str(template)
             request_type='requestExport'
 
-        request = 'https://' + genserver + '/testCaseService?requestType=' + request_type + '&client=python' + '&request='
-        request += json.dumps(generate_params).replace(' ', '')
-        return request
-
-    def __parse_test_line(self, line):
-        result = {}
-        try:
-            parsed_line = json.loads(line)
-        except ValueError as e:
-            print('Unexpected error while parsing line: "' + line + '": ' + str(e))
-        if 'info'  in parsed_line:
-            info = parsed_line['info'].replace('\'', '"')
-            try:
-                result['method'] = self.__parse_method_definition(json.loads(info)['method'])
-            except (ValueError, KeyError) as e:
-                pass
-        elif 'testCase' in parsed_line:
-            try:
-                result['values'] = [arg['value'] for arg in parsed_line['testCase']]
-            except ValueError as e:
-                print('Unexpected error when parsing test case line: "' + line + '": ' + str(e))
-
-        return result
+        return GenerationRequest(genserver, request_type, generate_params, user_data)
 
-    def __serialize_user_data(self, data_source, **kwargs):
+    def __user_data(self, data_source, **kwargs):
         user_data={}
         user_data['dataSource']=repr(data_source)
         test_suites=kwargs.pop('test_suites', None)
@@ -511,44 +2296,4 @@ class TestProvider:
             user_data['constraints']=constraints
         if choices != None:
             user_data['choices']=choices
-        return json.dumps(user_data).replace(' ', '').replace('"', '\'')
-
-    def __parse_method_definition(self, method_info_line):
-        result={}
-        full_method_name = method_info_line[0:method_info_line.find('(')]
-        method_args = method_info_line[method_info_line.find('(')+1:-1]
-        full_class_name = full_method_name[0:full_method_name.rfind('.')]
-        result['package_name'] = full_class_name[0:full_class_name.rfind('.')]
-        result['class_name'] = full_class_name[full_class_name.rfind('.')+1:-1]
-        result['method_name'] = full_method_name[full_method_name.rfind('.')+1:-1]
-        args=[]
-        for arg in method_args.split(','):
-            args.append(arg.strip().split(' '))
-        result['args'] = args
-        return result
-
-    def __cast(self, arg_info):
-        value = arg_info[0]
-        typename = arg_info[1]
-
-        if typename in ['byte, short', 'int', 'long']:
-            return int(value)
-        elif typename in ['float', 'double']:
-            return float(value)
-        elif typename in ['String', 'char']:
-            return value
-        elif typename in ['booolean']:
-            return value.lower in ['true', '1']
-        else:
-            i = typename.rfind('.')
-            module_name = typename[:i]
-            type_name = typename[i+1:]
-            if i != -1 and module_name != '':
-                module = importlib.import_module(module_name)
-                enum_type = getattr(module, type_name)
-                return enum_type[value]
-            
-
-
-
-
+        return user_data
@@ -0,0 +1,293 @@
+'''Asyncio interface to ecFeed remote generator services
+
+The module provides AsyncTestProvider, a counterpart of ecfeed.TestProvider
+for code running in an asyncio event loop.
+
+Requires httpx.
+'''
+
+import asyncio
+import json
+import ssl
+
+import httpx
+
+from ecfeed import TestProvider, DataSource, EcFeedError, ResponseParser, BodyDecoder, accepted_encodings, \
+    DEFAULT_GENSERVER, DEFAULT_KEYSTORE_PATH, DEFAULT_KEYSTORE_PASSWORD, DEFAULT_TEMPLATE, \
+    DEFAULT_POOL_SIZE, DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_POST_THRESHOLD
+
+DEFAULT_MAX_CONCURRENCY = 10
+
+class AsyncTestProvider:
+    '''Asyncio access provider to ecFeed remote generator services
+
+    The interface mirrors TestProvider, but generators are asynchronous
+    generators and queries are coroutines. The data is streamed by an
+    httpx.AsyncClient, so many generations can run concurrently on one 
+    event loop. Cancelling a task that consumes a generator, or closing
+    the generator, closes the underlying connection immediately. Decoding 
+    the keystore and loading the certificates run in the default executor 
+    of the loop, so they do not block other tasks.
+
+    Connections go through the proxy given by the https_proxy (or 
+    HTTPS_PROXY) environment variable, unless the address of the generator 
+    service matches no_proxy, as with TestProvider.
+    ...
+    Attributes
+    ----------
+    model : str
+        Id of the accessed model. Must be accessible for user
+        owning the keystore file.
+
+    credentials : KeystoreCredentials
+        Credentials decoded from the keystore, shared by all calls
+        to the generator service
+
+    max_concurrency : int
+        Maximum number of responses streamed at the same time
+    '''
+
+    def __init__(self, genserver = DEFAULT_GENSERVER,
+                 keystore_path=DEFAULT_KEYSTORE_PATH,
+                 password=DEFAULT_KEYSTORE_PASSWORD,
+                 model=None,
+                 pool_size=DEFAULT_POOL_SIZE,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT,
+                 max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 post_threshold=DEFAULT_POST_THRESHOLD,
+                 compression=True):
+        '''
+        Parameters
+        ----------
+        genserver, keystore_path, password, model, pool_size, connect_timeout, read_timeout, post_threshold, compression
+            See TestProvider
+
+        max_concurrency : int
+            maximum number of responses streamed at the same time. Generators
+            started above this limit wait until one of the streams is finished
+            (default is 10)
+        '''
+
+        self.__provider = TestProvider(genserver=genserver, keystore_path=keystore_path, password=password, model=model,
+                                       pool_size=pool_size, connect_timeout=connect_timeout, read_timeout=read_timeout,
+                                       post_threshold=post_threshold, compression=compression)
+        self.genserver = self.__provider.genserver
+        self.credentials = self.__provider.credentials
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_concurrency = max_concurrency
+        self.__semaphore = asyncio.Semaphore(max_concurrency)
+        self.__client = None
+        self.__client_lock = asyncio.Lock()
+        self.__active = set()
+        self.__ssl_files = None
+
+    @property
+    def model(self):
+        return self.__provider.model
+
+    @model.setter
+    def model(self, model):
+        self.__provider.model = model
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Closes connections and removes the credentials decoded from the keystore
+
+        Connections of responses that are still being streamed are aborted 
+        too, so the generators reading them raise ConnectionError.
+        """
+
+        for response in list(self.__active):
+            await response.aclose()
+        self.__active = set()
+        if self.__client != None:
+            await self.__client.aclose()
+        self.__client = None
+        self.__ssl_files = None
+        self.__provider.close()
+
+    def stats(self):
+        """Returns statistics of the transfers from the generator service, see TestProvider.stats"""
+
+        return self.__provider.stats()
+
+    async def generate(self, **kwargs):
+        """Generic call to ecfeed generator service
+
+        Accepts the same arguments and yields the same items as TestProvider.generate
+
+        Raises
+        ------
+        EcFeedError
+            If the generator service resposes with error
+
+        ConnectionError
+            If the connection fails or is aborted by close()
+        """
+
+        request, parser = self.__provider._prepare_generation(kwargs)
+
+        if(kwargs.pop('url', None)):
+            yield request.url()
+            return
+
+        client = await self.__get_client()
+        async with self.__semaphore:
+            try:
+                async with self.__stream(client, request) as response:
+                    self.__active.add(response)
+                    try:
+                        decoder = BodyDecoder(response.headers.get('content-encoding'))
+                        if(response.status_code != 200):
+                            body = b''
+                            async for chunk in response.aiter_raw():
+                                body += decoder.decode(chunk)
+                            body += decoder.flush()
+                            raise EcFeedError(json.loads(body.decode('utf-8'))['error'])
+                        try:
+                            async for line in _split_lines(response.aiter_raw(), decoder):
+                                item = parser.parse(line)
+                                if item != None:
+                                    yield item
+                        finally:
+                            self.__provider._record_transfer(decoder)
+                    finally:
+                        self.__active.discard(response)
+            except httpx.NetworkError as error:
+                raise ConnectionError('connection to the generator service failed: ' + str(error)) from error
+
+    def generate_nwise(self, **kwargs):
+        return self.nwise(template=None, **kwargs)
+
+    def export_nwise(self, **kwargs):
+        return self.nwise(template=kwargs.pop('template', DEFAULT_TEMPLATE), **kwargs)
+
+    def generate_pairwise(self, **kwargs):
+        return self.nwise(n=kwargs.pop('n', 2), template=None, **kwargs)
+
+    def export_pairwise(self, **kwargs):
+        return self.nwise(n=kwargs.pop('n', 2), template=kwargs.pop('template', DEFAULT_TEMPLATE), **kwargs)
+
+    async def nwise(self, **kwargs):
+        """Calls nwise generator, see TestProvider.nwise"""
+
+        properties={}
+        properties['n'] = str(kwargs.pop('n', 2))
+        properties['coverage'] = str(kwargs.pop('coverage', 100))
+        kwargs['properties'] = properties
+
+        async for item in self.generate(data_source=DataSource.NWISE, **kwargs):
+            yield item
+
+    def generate_cartesian(self, **kwargs): return self.cartesian(template=None, **kwargs)
+
+    def export_cartesian(self, **kwargs): return self.cartesian(template=kwargs.pop('template', DEFAULT_TEMPLATE), **kwargs)
+
+    async def cartesian(self, **kwargs):
+        """Calls cartesian generator, see TestProvider.cartesian"""
+
+        properties={}
+        properties['coverage'] = str(kwargs.pop('coverage', 100))
+        kwargs['properties'] = properties
+
+        async for item in self.generate(data_source=DataSource.CARTESIAN, **kwargs):
+            yield item
+
+    def generate_random(self, **kwargs): return self.random(template=None, **kwargs)
+
+    def export_random(self, **kwargs): return self.random(template=kwargs.pop('template', DEFAULT_TEMPLATE), **kwargs)
+
+    async def random(self, **kwargs):
+        """Calls random generator, see TestProvider.random"""
+
+        properties={}
+        properties['adaptive'] = str(kwargs.pop('adaptive', True)).lower()
+        properties['duplicates'] = str(kwargs.pop('duplicates', False)).lower()
+        properties['length'] = str(kwargs.pop('length', 1))
+
+        async for item in self.generate(data_source=DataSource.RANDOM, properties=properties, **kwargs):
+            yield item
+
+    def generate_static_suite(self, **kwargs): return self.static_suite(template=None, **kwargs)
+
+    def export_static_suite(self, **kwargs): return self.static_suite(template=kwargs.pop('template', DEFAULT_TEMPLATE), **kwargs)
+
+    async def static_suite(self, **kwargs):
+        """Fetches pre-generated data from test suites, see TestProvider.static_suite"""
+
+        async for item in self.generate(data_source=DataSource.STATIC_DATA, **kwargs):
+            yield item
+
+    async def method_info(self, method, model=None):
+        """Queries generator service for information about the method, see TestProvider.method_info"""
+
+        info={}
+        parser = ResponseParser()
+        async for line in self.generate_random(method=method, length=0, raw_output=True, model=model):
+            parsed = parser.parse_info(line)
+            if parsed != None:
+                info = parsed
+        return info
+
+    async def method_arg_names(self, method_info=None, method_name=None):
+        """Returns list of argument names of the method, see TestProvider.method_arg_names"""
+
+        if method_info == None and method_name != None:
+            method_info = await self.method_info(method=method_name)
+        return self.__provider.method_arg_names(method_info=method_info)
+
+    async def method_arg_types(self, method_info=None, method_name=None):
+        """Returns list of argument types of the method, see TestProvider.method_arg_types"""
+
+        if method_info == None and method_name != None:
+            method_info = await self.method_info(method=method_name)
+        return self.__provider.method_arg_types(method_info=method_info)
+
+    def __stream(self, client, request):
+        headers = {'User-Agent' : 'ecfeed-python', 'Accept' : '*/*',
+                   'Accept-Encoding' : accepted_encodings() if self.__provider.compression else 'identity'}
+        if self.__provider.uses_post(request):
+            headers.update({'Content-Type' : 'application/json', 'Content-Encoding' : 'gzip'})
+            return client.stream('POST', request.endpoint(), headers=headers, content=request.body())
+        return client.stream('GET', request.url(), headers=headers)
+
+    async def __get_client(self):
+        loop = asyncio.get_running_loop()
+        async with self.__client_lock:
+            files = await loop.run_in_executor(None, self.credentials.files)
+            if files != self.__ssl_files:
+                context = await loop.run_in_executor(None, _ssl_context, files)
+                if self.__client != None:
+                    await self.__client.aclose()
+                self.__client = httpx.AsyncClient(verify=context, trust_env=True,
+                                                  limits=httpx.Limits(max_connections=None, max_keepalive_connections=self.pool_size),
+                                                  timeout=httpx.Timeout(None, connect=self.connect_timeout, read=self.read_timeout))
+                self.__ssl_files = files
+            return self.__client
+
+def _ssl_context(files):
+    cert, key, ca = files
+    context = ssl.create_default_context(cafile=ca)
+    context.load_cert_chain(cert, key)
+    return context
+
+async def _split_lines(chunks, decoder):
+    """Yields lines of text, without line terminators, from chunks of a body decoded with a BodyDecoder"""
+
+    pending = b''
+    async for chunk in chunks:
+        lines = (pending + decoder.decode(chunk)).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip(b'\r').decode('utf-8')
+    pending += decoder.flush()
+    if pending:
+        yield pending.rstrip(b'\r').decode('utf-8')
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+import pytest
+import ecfeed_mock
+from ecfeed import TestProvider, EcFeedError
+from ecfeed_async import AsyncTestProvider
+
+MODEL = '0000-0000-0000-0000-0000'
+
+async def collect(generator):
+    return [item async for item in generator]
+
+def test_async_generation_matches_sync(mock_server, mock_credentials):
+    async def generate():
+        async with AsyncTestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as provider:
+            names = await provider.method_arg_names(method_name='TestClass.method')
+            rows = await collect(provider.generate_random(method='TestClass.method', length=50))
+            lines = await collect(provider.export_nwise(method='TestClass.method'))
+            url = await collect(provider.generate_nwise(method='TestClass.method', url=True))
+            return names, rows, lines, url
+    names, rows, lines, url = asyncio.run(generate())
+
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as provider:
+        assert names == provider.method_arg_names(method_name='TestClass.method')
+        assert rows == list(provider.generate_random(method='TestClass.method', length=50))
+        assert lines == list(provider.export_nwise(method='TestClass.method'))
+        assert url == list(provider.generate_nwise(method='TestClass.method', url=True))
+    assert mock_server.connections == 2
+
+def test_concurrent_generations_are_bounded(mock_server, mock_credentials):
+    mock_server.latency = 0.5
+    async def generate():
+        async with AsyncTestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL,
+                                     max_concurrency=5) as provider:
+            return await asyncio.gather(*[collect(provider.generate_random(method='TestClass.method', length=i)) for i in range(15)])
+    results = asyncio.run(generate())
+    assert [len(rows) for rows in results] == list(range(15))
+    assert mock_server.max_active == 5
+    assert mock_server.connections <= 5
+
+def test_cancellation_closes_stream(mock_server, mock_credentials):
+    mock_server.latency = 2
+    async def generate():
+        async with AsyncTestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as provider:
+            task = asyncio.ensure_future(collect(provider.generate_random(method='TestClass.method', length=5)))
+            await asyncio.sleep(0.5)
+            start = time.time()
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return time.time() - start
+    assert asyncio.run(generate()) < 1
+
+def test_error_response(mock_server, mock_credentials):
+    async def generate():
+        async with AsyncTestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model='error') as provider:
+            with pytest.raises(EcFeedError):
+                await collect(provider.generate_random(method='TestClass.method'))
+            return await collect(provider.generate_random(method='TestClass.method', model=MODEL))
+    assert len(asyncio.run(generate())) == 1
+
+def test_close_aborts_streams_and_credentials_load_off_loop(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=100, stalls=[5]) as server:
+        async def generate():
+            async with AsyncTestProvider(genserver=server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as provider:
+                threads = []
+                files = provider.credentials.files
+                def recorded_files():
+                    threads.append(threading.current_thread())
+                    return files()
+                provider.credentials.files = recorded_files
+                generator = provider.generate_cartesian(method='TestClass.method')
+                rows = [await generator.__anext__() for _ in range(3)]
+                task = asyncio.ensure_future(collect(generator))
+                await asyncio.sleep(0.2)
+                await provider.close()
+                with pytest.raises(ConnectionError):
+                    await asyncio.wait_for(task, 5)
+                return rows, threads
+        rows, threads = asyncio.run(generate())
+    assert len(rows) == 3
+    assert threads and threading.main_thread() not in threads
+
+def test_connections_use_https_proxy(mock_server, mock_credentials, monkeypatch):
+    for name in ['https_proxy', 'HTTPS_PROXY', 'no_proxy', 'NO_PROXY']:
+        monkeypatch.delenv(name, raising=False)
+    async def generate():
+        async with AsyncTestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as provider:
+            return await collect(provider.generate_random(method='TestClass.method', length=5))
+    with ecfeed_mock.MockProxy() as proxy:
+        monkeypatch.setenv('https_proxy', proxy.url)
+        assert len(asyncio.run(generate())) == 5
+        assert proxy.tunnels == [mock_server.genserver]
+        monkeypatch.setenv('no_proxy', '127.0.0.1')
+        assert len(asyncio.run(generate())) == 5
+        assert proxy.tunnels == [mock_server.genserver]
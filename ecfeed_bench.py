@@ -0,0 +1,364 @@
+'''Benchmarks of the ecfeed module
+
+The benchmarks run against ecfeed_mock.MockGenServer, a local stand-in for
+the generator service started in a separate process, so they need no account
+and no network. They measure:
+
+    generate: test cases per second of each output mode of TestProvider,
+        including the export of the same test cases in several formats
+        (FORMATS), rendered by the server with a request for each format
+        (export_formats) or by the client from one request (render_formats)
+    setup: duration of a call generating a single test case, with a kept
+        provider and with a new provider for each call
+    method_info: duration of the first and of a repeated query
+    cli: end-to-end throughput of an export by the command line tool
+    memory: peak of memory allocated while each output mode is consumed
+    startup: duration of 'import ecfeed' and the time 'ecfeed --help' takes
+        above the start of a bare interpreter, compared with budgets
+
+The results are written as JSON, one record per measurement, and may be
+compared with the results of an earlier run:
+
+    python ecfeed_bench.py --rows 100000 --output new.json --compare old.json
+'''
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import ecfeed
+import ecfeed_mock
+from ecfeed import TestProvider, TemplateType
+
+MODEL = '0000-0000-0000-0000-0000'
+METHOD = 'TestClass.method'
+
+SHAPES = {
+    'narrow' : (ecfeed_mock.DEFAULT_METHOD, 0),
+    'wide' : ('com.example.TestClass.method(' + ', '.join(typename + ' arg' + str(i) for i, typename in
+              enumerate(['int', 'String', 'double', 'boolean', 'long'] * 6)) + ')', 0),
+    'long_values' : ('com.example.TestClass.method(String arg1, String arg2, String arg3)', 200),
+}
+
+MODES = ['rows', 'raw', 'export', 'export_to', 'columnar', 'render', 'export_formats', 'render_formats']
+
+FORMATS = [TemplateType.CSV, TemplateType.Gherkin, TemplateType.JSON]
+
+DEFAULT_OUTPUT = 'bench_results.json'
+
+IMPORT_BUDGET_SECONDS = 0.05
+HELP_BUDGET_SECONDS = 0.1
+LAZY_MODULES = ['requests', 'urllib3', 'OpenSSL', 'cryptography', 'orjson', 'zstandard', 'numpy', 'concurrent.futures', 'hashlib', 'tempfile']
+
+def consume(ecfeed, mode, rows):
+    """Generates test cases in one of MODES and returns their number"""
+
+    if mode == 'rows':
+        return sum(1 for _ in ecfeed.generate_random(method=METHOD, length=rows))
+    elif mode == 'raw':
+        return sum(1 for _ in ecfeed.generate_random(method=METHOD, length=rows, raw_output=True)) - 1
+    elif mode == 'export':
+        return sum(1 for _ in ecfeed.export_random(method=METHOD, length=rows)) - 1
+    elif mode == 'export_to':
+        with open(os.devnull, 'wb') as destination:
+            ecfeed.export_to(destination, ecfeed.export_random, method=METHOD, length=rows)
+        return rows
+    elif mode == 'columnar':
+        return len(ecfeed.generate_columnar(ecfeed.generate_random, method=METHOD, length=rows))
+    elif mode == 'render':
+        with open(os.devnull, 'wb') as destination:
+            return ecfeed.export_many({TemplateType.CSV : destination}, ecfeed.generate_random, method=METHOD, length=rows)['rows']
+    elif mode == 'export_formats':
+        with open(os.devnull, 'wb') as destination:
+            for template in FORMATS:
+                ecfeed.export_to(destination, ecfeed.export_random, method=METHOD, length=rows, template=template)
+        return rows
+    elif mode == 'render_formats':
+        with contextlib.ExitStack() as stack:
+            destinations = [(template, stack.enter_context(open(os.devnull, 'wb'))) for template in FORMATS]
+            return ecfeed.export_many(destinations, ecfeed.generate_random, method=METHOD, length=rows)['rows']
+    raise ValueError('Unknown output mode: ' + str(mode))
+
+def best_time(function, repeat):
+    """Calls the function repeat times and returns the shortest duration and the last result"""
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start
+        best = seconds if best == None else min(best, seconds)
+    return best, result
+
+def provider(server, credentials):
+    return TestProvider(genserver=server.genserver, keystore_path=credentials['keystore'], model=MODEL)
+
+def serve(credentials, options, addresses, stop):
+    with ecfeed_mock.MockGenServer(credentials, **options) as server:
+        addresses.put(server.genserver)
+        stop.wait()
+
+@contextlib.contextmanager
+def mock_process(credentials, **options):
+    """Runs a MockGenServer in a separate process
+
+    The server does not share the interpreter lock and the allocator with the
+    measured client. Yields an object with the 'genserver' attribute.
+    """
+
+    addresses = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    process = multiprocessing.Process(target=serve, args=(credentials, options, addresses, stop), daemon=True)
+    process.start()
+    try:
+        yield argparse.Namespace(genserver=addresses.get(timeout=60))
+    finally:
+        stop.set()
+        process.join()
+
+def bench_generate(server, credentials, shape, rows, repeat):
+    records = []
+    with provider(server, credentials) as ecfeed:
+        for mode in MODES:
+            seconds, count = best_time(lambda: consume(ecfeed, mode, rows), repeat)
+            records.append({'benchmark' : 'generate', 'shape' : shape, 'mode' : mode, 'rows' : count,
+                            'seconds' : seconds, 'rows_per_second' : count / seconds})
+    return records
+
+def bench_setup(server, credentials, shape, calls):
+    records = []
+    with provider(server, credentials) as ecfeed:
+        consume(ecfeed, 'rows', 1)
+        seconds, _ = best_time(lambda: [consume(ecfeed, 'rows', 1) for _ in range(calls)], 1)
+    records.append({'benchmark' : 'setup', 'shape' : shape, 'mode' : 'kept_provider', 'calls' : calls,
+                    'seconds' : seconds, 'seconds_per_call' : seconds / calls})
+
+    def new_provider():
+        with provider(server, credentials) as ecfeed:
+            consume(ecfeed, 'rows', 1)
+    seconds, _ = best_time(lambda: [new_provider() for _ in range(calls)], 1)
+    records.append({'benchmark' : 'setup', 'shape' : shape, 'mode' : 'new_provider', 'calls' : calls,
+                    'seconds' : seconds, 'seconds_per_call' : seconds / calls})
+    return records
+
+def bench_method_info(server, credentials, shape, calls):
+    first = 0
+    repeated = 0
+    for _ in range(calls):
+        with provider(server, credentials) as ecfeed:
+            first += best_time(lambda: ecfeed.method_info(METHOD), 1)[0]
+            repeated += best_time(lambda: ecfeed.method_info(METHOD), 1)[0]
+    return [{'benchmark' : 'method_info', 'shape' : shape, 'mode' : 'first', 'calls' : calls, 'seconds_per_call' : first / calls},
+            {'benchmark' : 'method_info', 'shape' : shape, 'mode' : 'repeated', 'calls' : calls, 'seconds_per_call' : repeated / calls}]
+
+def bench_cli(server, credentials, shape, rows, directory):
+    output = os.path.join(directory, 'cli_export.csv')
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ecfeed_cli.py'),
+               '--genserver', server.genserver, '--keystore', credentials['keystore'], '--model', MODEL,
+               '--method', METHOD, '--random', '--length', str(rows), '--output', output]
+    with tempfile.TemporaryFile() as errors:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stderr=errors)
+        peak = None
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+            peak = usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+        else:
+            process.wait()
+        seconds = time.perf_counter() - start
+        if process.returncode != 0:
+            errors.seek(0)
+            raise RuntimeError('Command line export failed: ' + errors.read().decode('utf-8', 'replace'))
+    size = os.path.getsize(output)
+    os.remove(output)
+    return [{'benchmark' : 'cli', 'shape' : shape, 'mode' : 'export', 'rows' : rows, 'bytes' : size, 'seconds' : seconds,
+             'rows_per_second' : rows / seconds, 'bytes_per_second' : size / seconds, 'peak_rss_bytes' : peak}]
+
+def imported_modules(arguments, env):
+    """Returns names of all modules imported by the Python interpreter called with arguments"""
+
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + arguments, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, env=env)
+    fields = [line.split('|') for line in result.stderr.decode('utf-8', 'replace').splitlines() if line.startswith('import time:')]
+    return [field[2].strip() for field in fields if len(field) == 3 and field[1].strip().isdigit()]
+
+def startup_environment():
+    """Returns the environment and the arguments of the help of the command line tool for startup measurements"""
+
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    directory = os.path.dirname(os.path.abspath(__file__))
+    env['PYTHONPATH'] = os.pathsep.join([directory] + ([env['PYTHONPATH']] if env.get('PYTHONPATH') else []))
+    return env, [os.path.join(directory, 'ecfeed_cli.py'), '--help']
+
+def lazy_modules_loaded():
+    """Returns the modules of LAZY_MODULES loaded by the import of the module and by the help of the command line tool
+
+    Modules already loaded by a bare interpreter (e.g. by site packages) are 
+    not counted.
+    """
+
+    env, cli_help = startup_environment()
+    lazy = [name for name in LAZY_MODULES if name not in imported_modules(['-c', 'pass'], env)]
+    return {'import' : [name for name in lazy if name in imported_modules(['-c', 'import ecfeed'], env)],
+            'help' : [name for name in lazy if name in imported_modules(cli_help, env)]}
+
+def bench_startup(repeat):
+    """Measures the import of the module and the start of the command line tool in new interpreters
+
+    Modules are compiled to bytecode by a first, unmeasured call, as they are 
+    when installed.
+    """
+
+    env, cli_help = startup_environment()
+    measured_import = 'import time; start = time.perf_counter(); import ecfeed; print(time.perf_counter() - start)'
+
+    def wall_time(arguments):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + arguments, stdout=subprocess.DEVNULL, env=env, check=True)
+        return time.perf_counter() - start
+
+    wall_time(cli_help)
+    import_seconds = min(float(subprocess.run([sys.executable, '-c', measured_import], stdout=subprocess.PIPE, env=env,
+                                              check=True).stdout) for _ in range(repeat))
+    help_seconds = max(0, min(wall_time(cli_help) for _ in range(repeat)) - min(wall_time(['-c', 'pass']) for _ in range(repeat)))
+    loaded = lazy_modules_loaded()
+    return [{'benchmark' : 'startup', 'shape' : '-', 'mode' : 'import', 'startup_seconds' : import_seconds,
+             'budget_seconds' : IMPORT_BUDGET_SECONDS, 'lazy_modules_loaded' : loaded['import']},
+            {'benchmark' : 'startup', 'shape' : '-', 'mode' : 'help', 'startup_seconds' : help_seconds,
+             'budget_seconds' : HELP_BUDGET_SECONDS, 'lazy_modules_loaded' : loaded['help']}]
+
+def bench_memory(server, credentials, shape, rows):
+    records = []
+    with provider(server, credentials) as ecfeed:
+        for mode in MODES:
+            tracemalloc.start()
+            try:
+                consume(ecfeed, mode, rows)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            records.append({'benchmark' : 'memory', 'shape' : shape, 'mode' : mode, 'rows' : rows, 'peak_bytes' : peak})
+    return records
+
+def run(rows=100000, latency=0, shapes=None, repeat=3, calls=20, encodings=(), cli=True, memory=True, startup=True):
+    """Runs the benchmarks against a local mock server
+
+    Parameters
+    ----------
+    rows : int
+        Number of test cases generated by each measured call
+
+    latency : float
+        Number of seconds the mock server waits before each response
+
+    shapes : list
+        Names of SHAPES of the generated test cases (default is all of them)
+
+    repeat : int
+        Number of repetitions of throughput measurements, the best one is reported
+
+    calls : int
+        Number of calls in measurements of setup and method_info
+
+    encodings : list
+        Content encodings the mock server uses to compress responses
+
+    cli : bool
+        If set to False, the command line tool is not measured
+
+    memory : bool
+        If set to False, the memory use is not measured
+
+    startup : bool
+        If set to False, the import and start of the command line tool are not measured
+
+    Returns
+    -------
+    A dictionary with the environment, parameters and a list of 'results'
+    """
+
+    shapes = list(SHAPES) if shapes == None else shapes
+    results = bench_startup(max(repeat, 3)) if startup else []
+    with tempfile.TemporaryDirectory() as directory:
+        credentials = ecfeed_mock.create_credentials(directory)
+        for shape in shapes:
+            method, value_size = SHAPES[shape]
+            with mock_process(credentials, method=method, latency=latency, encodings=list(encodings),
+                              value_size=value_size) as server:
+                results += bench_generate(server, credentials, shape, rows, repeat)
+                results += bench_setup(server, credentials, shape, calls)
+                results += bench_method_info(server, credentials, shape, calls)
+                if cli:
+                    results += bench_cli(server, credentials, shape, rows, directory)
+                if memory:
+                    results += bench_memory(server, credentials, shape, rows)
+
+    return {
+        'environment' : {'python' : platform.python_version(), 'implementation' : platform.python_implementation(),
+                         'platform' : platform.platform(), 'ecfeed' : os.path.abspath(ecfeed.__file__)},
+        'parameters' : {'rows' : rows, 'latency' : latency, 'shapes' : shapes, 'repeat' : repeat, 'calls' : calls,
+                        'encodings' : list(encodings)},
+        'results' : results,
+    }
+
+METRICS = ['rows_per_second', 'bytes_per_second', 'seconds_per_call', 'peak_bytes', 'peak_rss_bytes', 'startup_seconds']
+
+def compare(baseline, current):
+    """Pairs the measurements of two runs
+
+    Returns
+    -------
+    A list of tuples (benchmark, shape, mode, metric, baseline value, current value)
+    """
+
+    def measurements(report):
+        return {(record['benchmark'], record['shape'], record['mode'], metric) : record[metric]
+                for record in report['results'] for metric in METRICS if record.get(metric) != None}
+
+    old = measurements(baseline)
+    return [key + (old[key], value) for key, value in measurements(current).items() if key in old]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='ecfeed_bench', description='benchmarks of the ecfeed module against a local mock of the generator service')
+    parser.add_argument('--rows', type=int, default=100000, help='number of test cases generated by each measured call (default is 100000)')
+    parser.add_argument('--latency', type=float, default=0, help='number of seconds the mock server waits before each response (default is 0)')
+    parser.add_argument('--shape', dest='shapes', action='append', choices=list(SHAPES), help='shape of the generated test cases, may be repeated (default is all shapes)')
+    parser.add_argument('--repeat', type=int, default=3, help='number of repetitions of throughput measurements (default is 3)')
+    parser.add_argument('--calls', type=int, default=20, help='number of calls in setup and method_info measurements (default is 20)')
+    parser.add_argument('--encoding', dest='encodings', action='append', default=[], choices=['gzip', 'zstd'], help='compression used by the mock server, may be repeated (default is none)')
+    parser.add_argument('--no-cli', dest='cli', action='store_false', help='skip the measurement of the command line tool')
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help='skip the measurement of memory use')
+    parser.add_argument('--no-startup', dest='startup', action='store_false', help='skip the measurement of the import and the start of the command line tool')
+    parser.add_argument('--output', '-o', default=DEFAULT_OUTPUT, help='file of the results (default is ' + DEFAULT_OUTPUT + ')')
+    parser.add_argument('--compare', help='file of results of an earlier run to compare with')
+    args = parser.parse_args(argv)
+
+    report = run(rows=args.rows, latency=args.latency, shapes=args.shapes, repeat=args.repeat, calls=args.calls,
+                 encodings=args.encodings, cli=args.cli, memory=args.memory, startup=args.startup)
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+
+    for record in report['results']:
+        values = ', '.join(metric + '=' + format(record[metric], '.6g') for metric in METRICS if record.get(metric) != None)
+        print('%-12s %-12s %-14s %s' % (record['benchmark'], record['shape'], record['mode'], values))
+
+    if args.compare != None:
+        with open(args.compare) as baseline:
+            pairs = compare(json.load(baseline), report)
+        print()
+        for benchmark, shape, mode, metric, old, new in pairs:
+            print('%-12s %-12s %-14s %-18s %12.6g -> %12.6g (%+.1f%%)' % (benchmark, shape, mode, metric, old, new,
+                  (new - old) / old * 100 if old else 0))
+    return report
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,19 @@
+import json
+import ecfeed_bench
+
+def test_benchmarks_write_comparable_results(tmp_path):
+    output = str(tmp_path / 'results.json')
+    report = ecfeed_bench.main(['--rows', '300', '--repeat', '1', '--calls', '2', '--shape', 'long_values', '--no-startup',
+                                '--output', output])
+    with open(output) as results:
+        assert json.load(results) == report
+
+    records = {(record['benchmark'], record['mode']) : record for record in report['results']}
+    assert set(benchmark for benchmark, mode in records) == {'generate', 'setup', 'method_info', 'cli', 'memory'}
+    assert all(records[('generate', mode)]['rows'] == 300 for mode in ecfeed_bench.MODES)
+    assert records[('cli', 'export')]['bytes'] > 300 * 3 * 200
+    assert all(records[('memory', mode)]['peak_bytes'] > 0 for mode in ecfeed_bench.MODES)
+
+    pairs = ecfeed_bench.compare(report, report)
+    assert len(pairs) == sum(1 for record in report['results'] for metric in ecfeed_bench.METRICS if record.get(metric) != None)
+    assert all(old == new for benchmark, shape, mode, metric, old, new in pairs)
@@ -0,0 +1,392 @@
+'''Binary files of generated test suites
+
+Used by TestProvider.save_suite. A suite file starts with a header holding
+the signature of the method and, for each argument, the dictionary of its
+choices (names and values as sent by the generator service). The test cases
+follow as columns of fixed width choice indices: 1, 2 or 4 bytes per value,
+depending on the number of choices of the argument. Suites are loaded by
+mapping the file into memory, so opening a suite of millions of test cases
+takes no time, values are converted to argument types only when they are
+accessed and slices of a suite share the mapped file.
+
+File layout (little endian):
+    magic b'ECFSUITE', format version (uint32), header length (uint32),
+    header (JSON), columns of choice indices aligned to 8 bytes
+'''
+
+from os import path
+from array import array
+import json
+import mmap
+import struct
+import sys
+import time
+
+from ecfeed import EcFeedError, TemplateType, AtomicFile, parse_method_definition, value_converter, json_decoder
+
+MAGIC = b'ECFSUITE'
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+PREFIX = struct.Struct('<8sII')
+INDEX_TYPES = {1 : 'B', 2 : 'H', 4 : 'I' if array('I').itemsize == 4 else 'L'}
+CONVERT_CHUNK_SIZE = 65536
+
+_UNCONVERTED = object()
+
+def _padding(offset):
+    return -offset % ALIGNMENT
+
+class SuiteWriter:
+    '''Writes raw lines of a response of the generator service to a suite file
+
+    The choice indices are kept in memory (4 bytes per value) until the
+    writer is closed. The file is written to a temporary file in the same
+    directory, which replaces the destination only when the writer is closed
+    without an exception.
+    ...
+    Attributes
+    ----------
+    destination : str
+        Path of the suite file
+
+    signature : str
+        Signature of the method, e.g. 'QuickStart.test(int arg1, String arg2)'
+
+    rows : int
+        Number of written test cases
+    '''
+
+    def __init__(self, destination):
+        self.destination = destination
+        self.signature = None
+        self.rows = 0
+        self.__loads = json_decoder()
+        self.__choices = None
+        self.__indices = None
+        self.__codes = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type == None:
+            self.close()
+
+    def write(self, line):
+        """Adds a raw line of the response, e.g. yielded by a generator called with raw_output=True"""
+
+        parsed_line = self.__loads(line)
+        test_case = parsed_line.get('testCase')
+        if test_case != None:
+            if self.__codes == None:
+                raise EcFeedError('Test case received before method information: "' + line + '"')
+            for choices, indices, codes, arg in zip(self.__choices, self.__indices, self.__codes, test_case):
+                key = (arg.get('name'), arg['value'])
+                code = indices.get(key)
+                if code == None:
+                    code = indices[key] = len(choices)
+                    choices.append(key)
+                codes.append(code)
+            self.rows += 1
+        elif 'info' in parsed_line and self.signature == None:
+            info = parsed_line['info']
+            if isinstance(info, str):
+                info = json.loads(info.replace('\'', '"'))
+            self.signature = info['method']
+            args = parse_method_definition(self.signature)['args']
+            self.__choices = [[] for arg in args]
+            self.__indices = [{} for arg in args]
+            self.__codes = [array(INDEX_TYPES[4]) for arg in args]
+
+    def close(self):
+        """Writes the suite file"""
+
+        if self.signature == None:
+            raise EcFeedError('The response does not contain method information')
+        args = parse_method_definition(self.signature)['args']
+        columns = []
+        for (typename, name), choices, codes in zip(args, self.__choices, self.__codes):
+            width = 1 if len(choices) <= 1 << 8 else 2 if len(choices) <= 1 << 16 else 4
+            data = array(INDEX_TYPES[width], codes) if width != 4 else codes
+            if sys.byteorder == 'big':
+                data.byteswap()
+            columns.append(({'name' : name, 'type' : typename, 'width' : width, 'choices' : [list(choice) for choice in choices]}, data))
+
+        header = {'method' : self.signature, 'rows' : self.rows, 'columns' : [column for column, data in columns]}
+        offset = 0
+        for column, data in columns:
+            column['offset'] = offset
+            offset += len(data) * data.itemsize
+            offset += _padding(offset)
+        encoded = json.dumps(header).encode('utf-8')
+        start = PREFIX.size + len(encoded)
+        start += _padding(start)
+
+        with AtomicFile(self.destination) as output:
+            output.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(encoded)))
+            output.write(encoded)
+            output.write(b'\0' * (start - PREFIX.size - len(encoded)))
+            for column, data in columns:
+                data.tofile(output)
+                output.write(b'\0' * _padding(len(data) * data.itemsize))
+
+class BinaryColumn:
+    '''Choice indices of an argument in a mapped suite file
+
+    ...
+    Attributes
+    ----------
+    name : str
+        Name of the argument
+
+    typename : str
+        Type of the argument
+
+    choices : list
+        Pairs [choice name, value] of the choices of the argument, with
+        values as sent by the generator service
+
+    codes : memoryview
+        Index in 'choices' of the choice of each test case
+    '''
+
+    def __init__(self, name, typename, choices, codes, values=None):
+        self.name = name
+        self.typename = typename
+        self.choices = choices
+        self.codes = codes
+        self.__values = values if values != None else [_UNCONVERTED] * len(choices)
+        self.__convert = value_converter(typename)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return self.value(self.codes[index])
+
+    def value(self, code):
+        """Returns the value of a choice converted to the argument type"""
+
+        value = self.__values[code]
+        if value is _UNCONVERTED:
+            value = self.__values[code] = self.__convert(self.choices[code][1])
+        return value
+
+    def values(self, start=0, stop=None):
+        """Returns the values of the test cases between start and stop converted to the argument type"""
+
+        values = [self.value(code) for code in range(len(self.choices))]
+        return [values[code] for code in self.codes[start:stop]]
+
+    def texts(self, start=0, stop=None):
+        """Returns the values of the test cases between start and stop as sent by the generator service"""
+
+        texts = [choice[1] for choice in self.choices]
+        return [texts[code] for code in self.codes[start:stop]]
+
+    def sliced(self, index):
+        """Returns the column of a slice of the test cases, sharing the mapped file"""
+
+        return BinaryColumn(self.name, self.typename, self.choices, self.codes[index], self.__values)
+
+    def to_numpy(self):
+        """Returns the choice indices as a numpy array sharing memory with the mapped file"""
+
+        import numpy
+        return numpy.asarray(self.codes)
+
+class BinarySuite:
+    '''Test suite read from a mapped suite file, see load_suite
+
+    Indexing and iteration return test cases with values converted to
+    argument types. Slices and shards are suites sharing the mapped file.
+    ...
+    Attributes
+    ----------
+    signature : str
+        Signature of the method, e.g. 'QuickStart.test(int arg1, String arg2)'
+
+    args_info : dict
+        Information about the method, see TestProvider.method_info
+
+    columns : list
+        BinaryColumn for each argument of the method
+    '''
+
+    def __init__(self, signature, columns, mapped=None):
+        self.signature = signature
+        self.args_info = parse_method_definition(signature)
+        self.columns = columns
+        self.__mapped = mapped
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, index):
+        """Returns the test case with the given index, or a suite of the test cases of a slice"""
+
+        if isinstance(index, slice):
+            return BinarySuite(self.signature, [column.sliced(index) for column in self.columns], self.__mapped)
+        return [column[index] for column in self.columns]
+
+    def __iter__(self):
+        for start in range(0, len(self), CONVERT_CHUNK_SIZE):
+            for row in zip(*[column.values(start, start + CONVERT_CHUNK_SIZE) for column in self.columns]):
+                yield list(row)
+
+    def shard(self, index, count):
+        """Returns part 'index' of 'count' disjoint, contiguous parts of the suite"""
+
+        if not 0 <= index < count:
+            raise EcFeedError('Shard index must be between 0 and ' + str(count - 1))
+        length = len(self)
+        return self[length * index // count:length * (index + 1) // count]
+
+    def names(self):
+        return [column.name for column in self.columns]
+
+    def types(self):
+        return [column.typename for column in self.columns]
+
+    def column(self, name):
+        """Returns the column of the argument with the given name"""
+
+        for column in self.columns:
+            if column.name == name:
+                return column
+        raise KeyError(name)
+
+    def texts(self, start=0, stop=None):
+        """Returns the test cases between start and stop as lists of values sent by the generator service"""
+
+        return [list(row) for row in zip(*[column.texts(start, stop) for column in self.columns])]
+
+    def to_numpy(self):
+        """Returns a dictionary of numpy arrays of choice indices, sharing memory with the mapped file"""
+
+        return {column.name : column.to_numpy() for column in self.columns}
+
+    def close(self):
+        """Releases the mapped file
+
+        The file stays mapped while slices of the suite or arrays returned
+        by to_numpy are still in use.
+        """
+
+        for column in self.columns:
+            column.codes.release()
+        self.columns = []
+        if self.__mapped != None:
+            try:
+                self.__mapped.close()
+            except BufferError:
+                pass
+            self.__mapped = None
+
+def save_suite(lines, destination):
+    """Writes raw lines of a response of the generator service to a suite file
+
+    Parameters
+    ----------
+    lines : iterable
+        Raw lines of the response, e.g. yielded by a generator called with raw_output=True
+
+    destination : str
+        Path of the suite file
+
+    Returns
+    -------
+    The number of written test cases
+    """
+
+    with SuiteWriter(destination) as writer:
+        for line in lines:
+            writer.write(line)
+    return writer.rows
+
+def load_suite(source):
+    """Maps a suite file written by save_suite into memory
+
+    Parameters
+    ----------
+    source : str
+        Path of the suite file
+
+    Returns
+    -------
+    BinarySuite
+    """
+
+    with open(path.expanduser(source), 'rb') as suite_file:
+        mapped = mmap.mmap(suite_file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, header_length = PREFIX.unpack_from(mapped, 0)
+    if magic != MAGIC:
+        mapped.close()
+        raise EcFeedError(source + ' is not a suite file')
+    if version > FORMAT_VERSION:
+        mapped.close()
+        raise EcFeedError('Unsupported version of the suite file ' + source + ': ' + str(version))
+    header = json.loads(mapped[PREFIX.size:PREFIX.size + header_length].decode('utf-8'))
+    start = PREFIX.size + header_length
+    start += _padding(start)
+
+    view = memoryview(mapped)
+    columns = []
+    for column in header['columns']:
+        offset = start + column['offset']
+        data = view[offset:offset + header['rows'] * column['width']]
+        if sys.byteorder == 'big':
+            codes = array(INDEX_TYPES[column['width']], data)
+            codes.byteswap()
+            codes = memoryview(codes)
+        else:
+            codes = data.cast(INDEX_TYPES[column['width']])
+        columns.append(BinaryColumn(column['name'], column['type'], column['choices'], codes))
+    view.release()
+    return BinarySuite(header['method'], columns, mapped)
+
+def convert_suite(source, destination, template=TemplateType.CSV):
+    """Writes the test cases of a suite file exported with a built-in template
+
+    Parameters
+    ----------
+    source : str or BinarySuite
+        Path of the suite file, or a loaded suite
+
+    destination : str or file
+        Path of the output file, or a file object opened in binary mode
+
+    template : TemplateType
+        One of CSV, XML, Gherkin and JSON (default is CSV), see ecfeed_render
+
+    Returns
+    -------
+    A dictionary with the number of written 'bytes', the duration in
+    'seconds' and 'bytes_per_second'
+    """
+
+    from ecfeed_render import TemplateRenderer
+
+    start = time.perf_counter()
+    suite = load_suite(source) if isinstance(source, str) else source
+    output = open(destination, 'wb') if isinstance(destination, str) else destination
+    written = 0
+    try:
+        renderer = TemplateRenderer(template, suite.signature)
+        written += output.write(renderer.header().encode('utf-8'))
+        for chunk in range(0, len(suite), CONVERT_CHUNK_SIZE):
+            written += output.write(renderer.rows(suite.texts(chunk, chunk + CONVERT_CHUNK_SIZE)).encode('utf-8'))
+        written += output.write(renderer.footer().encode('utf-8'))
+    finally:
+        if output is not destination:
+            output.close()
+        if suite is not source:
+            suite.close()
+    seconds = time.perf_counter() - start
+    return {'bytes' : written, 'seconds' : seconds, 'bytes_per_second' : written / seconds if seconds > 0 else 0}
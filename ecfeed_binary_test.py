@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+import pytest
+import ecfeed_mock
+import ecfeed_cli
+from ecfeed import TestProvider, EcFeedError, TemplateType
+from ecfeed_binary import load_suite, convert_suite, save_suite
+from ecfeed_render import MultiplexWriter, render
+
+MODEL = '0000-0000-0000-0000-0000'
+SIGNATURE = 'QuickStart.test(int arg1, int arg2, String arg3)'
+
+def provider(server, mock_credentials, **kwargs):
+    return TestProvider(genserver=server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, **kwargs)
+
+@pytest.fixture
+def suite_server(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=3000) as server:
+        yield server
+
+def test_saved_suite_is_loaded_lazily(suite_server, mock_credentials, tmp_path):
+    destination = str(tmp_path / 'suite.ecfs')
+    with provider(suite_server, mock_credentials) as ecfeed:
+        rows = list(ecfeed.generate_cartesian(method='TestClass.method'))
+        assert ecfeed.save_suite(destination, ecfeed.generate_cartesian, method='TestClass.method') == 3000
+        assert ecfeed.method_arg_names(method_name='TestClass.method') == ['arg1', 'arg2', 'arg3']
+    assert len(suite_server.requests) == 2
+
+    with load_suite(destination) as suite:
+        assert suite.signature == suite_server.method
+        assert suite.names() == ['arg1', 'arg2', 'arg3'] and suite.types() == ['int', 'String', 'double']
+        assert [column.codes.itemsize for column in suite.columns] == [2, 1, 2]
+        assert len(suite) == 3000
+        assert suite[1234] == rows[1234] and suite[-1] == rows[-1]
+        assert list(suite) == rows
+        assert list(suite[10:2000:7]) == rows[10:2000:7]
+        assert sum([list(suite.shard(i, 7)) for i in range(7)], []) == rows
+        assert suite.column('arg2').choices[0] == ['choice1', 'value1']
+
+def test_suite_converts_to_templates(suite_server, mock_credentials, tmp_path):
+    destination = str(tmp_path / 'suite.ecfs')
+    with provider(suite_server, mock_credentials) as ecfeed:
+        exported = list(ecfeed.export_cartesian(method='TestClass.method'))
+        ecfeed.save_suite(destination, ecfeed.export_cartesian, method='TestClass.method', template=TemplateType.XML)
+    output = str(tmp_path / 'suite.csv')
+    result = convert_suite(destination, output)
+    with open(output, encoding='utf-8') as lines:
+        assert lines.read().splitlines() == exported
+    assert result['bytes'] == os.path.getsize(output)
+
+    with load_suite(destination) as suite:
+        convert_suite(suite, str(tmp_path / 'suite.json'), TemplateType.JSON)
+        assert len(suite) == 3000
+    with open(str(tmp_path / 'suite.json'), encoding='utf-8') as data:
+        test_cases = json.load(data)['testCases']
+    assert test_cases[5] == dict(zip(['index', 'arg1', 'arg2', 'arg3'], [5] + exported[6].split(',')))
+
+def test_templates_rendered_by_client():
+    rows = [['4', '3', 'a<b'], ['1', '3', 'x"y']]
+    assert list(render(TemplateType.Gherkin, SIGNATURE, rows)) == [
+        'Scenario: executing test',
+        '\tGiven the value of arg1 is <arg1>',
+        '\tAnd the value of arg2 is <arg2>',
+        '\tAnd the value of arg3 is <arg3>',
+        '\tWhen test is executed',
+        '',
+        'Examples:',
+        '| <arg1> | <arg2> | <arg3> | ',
+        '|      4 |      3 |    a<b | ',
+        '|      1 |      3 |    x"y | ']
+    assert list(render(TemplateType.XML, SIGNATURE, rows)) == [
+        '<TestCases>',
+        '\t<TestCase testIndex="0" arg1="4" arg2="3" arg3="a&lt;b"/>',
+        '\t<TestCase testIndex="1" arg1="1" arg2="3" arg3="x&quot;y"/>',
+        '</TestCases>']
+    assert json.loads('\n'.join(render(TemplateType.JSON, SIGNATURE, rows)))['testCases'][1]['arg3'] == 'x"y'
+    assert json.loads('\n'.join(render(TemplateType.JSON, SIGNATURE, []))) == {'testCases' : []}
+    with pytest.raises(EcFeedError):
+        render(TemplateType.RAW, SIGNATURE, rows)
+
+def test_cli_writes_binary_suite(suite_server, mock_credentials, tmp_path, monkeypatch):
+    output = str(tmp_path / 'suite.ecfs')
+    monkeypatch.setattr(sys, 'argv', ['ecfeed', '--genserver', suite_server.genserver, '--keystore', mock_credentials['keystore'], '--model', MODEL,
+                                      '--method', 'TestClass.method', '--random', '--length', '100', '--output', output, '--template', 'BINARY'])
+    ecfeed_cli.main()
+    with load_suite(output) as suite:
+        assert len(suite) == 100
+    assert 'template' not in suite_server.requests[0]
+
+def test_invalid_files_are_rejected(tmp_path):
+    invalid = str(tmp_path / 'invalid.ecfs')
+    with open(invalid, 'wb') as data:
+        data.write(b'not a suite file at all')
+    with pytest.raises(EcFeedError):
+        load_suite(invalid)
+    with pytest.raises(EcFeedError):
+        save_suite(['{"testCase": [{"name": "choice0", "value": "1"}]}'], str(tmp_path / 'suite.ecfs'))
+    assert os.listdir(str(tmp_path)) == ['invalid.ecfs']
+
+def test_suite_and_rendered_files_have_mode_of_plain_files(tmp_path):
+    lines = [json.dumps({'info' : str({'method' : SIGNATURE})}),
+             json.dumps({'testCase' : [{'name' : 'choice', 'value' : value} for value in ['1', '2', 'a']]})]
+    umask = os.umask(0o022)
+    try:
+        open(str(tmp_path / 'plain'), 'wb').close()
+        save_suite(lines, str(tmp_path / 'suite.ecfs'))
+        with MultiplexWriter({TemplateType.CSV : str(tmp_path / 'suite.csv')}, atomic=True) as writer:
+            for line in lines:
+                writer.write(line)
+    finally:
+        os.umask(umask)
+    mode = os.stat(str(tmp_path / 'plain')).st_mode
+    assert os.stat(str(tmp_path / 'suite.ecfs')).st_mode == os.stat(str(tmp_path / 'suite.csv')).st_mode == mode
+    assert len(load_suite(str(tmp_path / 'suite.ecfs'))) == 1
@@ -0,0 +1,229 @@
+'''On-disk cache of responses from ecFeed generator services
+
+Used by TestProvider when it is constructed with the 'cache' argument.
+'''
+
+from os import path, makedirs, listdir, remove, replace, stat, utime
+from enum import Enum
+import io
+import json
+import threading
+import time
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+class CacheMode(Enum):
+    '''How a single generation uses the cache'''
+
+    USE = 0
+    BYPASS = 1
+    REFRESH = 2
+
+class ResultCache:
+    '''Responses of the generator service stored on disk
+
+    Each entry holds all lines of one response and is identified by the key
+    of the request (see GenerationRequest.key). Entries stored more than 
+    'ttl' seconds ago are not used, and are removed when a new entry is 
+    stored. When the total size of the entries exceeds 'max_size', the 
+    least recently used entries are removed.
+
+    Note that results of random generators differ between calls to the
+    generator service, so caching them fixes the generated data.
+    ...
+    Attributes
+    ----------
+    directory : str
+        Directory where the entries are stored
+
+    hits : int
+        Number of requests served from the cache
+
+    misses : int
+        Number of requests that were not found in the cache
+
+    evictions : int
+        Number of entries removed because of their age or the size limit
+    '''
+
+    def __init__(self, directory, ttl=None, max_size=DEFAULT_CACHE_SIZE):
+        '''
+        Parameters
+        ----------
+        directory : str
+            directory where the entries are stored. Created if it does not exist
+
+        ttl : float
+            number of seconds after storing an entry when it expires, 
+            whether it is used or not (default is None, which means that 
+            entries do not expire)
+
+        max_size : int
+            maximum total size of the entries in bytes (default is 256MB)
+        '''
+
+        self.directory = path.expanduser(directory)
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__lock = threading.Lock()
+        makedirs(self.directory, exist_ok=True)
+
+    def get(self, key, chunk_size=None):
+        """Returns the cached response, or None if the response is not cached
+
+        Parameters
+        ----------
+        key : str
+            Key of the request
+
+        chunk_size : int
+            If provided, the response is returned in chunks of bytes of at 
+            most this size instead of lines
+
+        Returns
+        -------
+        A generator of lines or chunks, or None
+        """
+
+        entry = self.__entry_path(key)
+        try:
+            entry_file = open(entry, 'rb')
+        except FileNotFoundError:
+            self.__count(hit=False)
+            return None
+
+        header = json.loads(entry_file.readline())
+        if self.ttl != None and time.time() - header['created'] > self.ttl:
+            entry_file.close()
+            self.__remove(entry)
+            self.__count(hit=False)
+            return None
+
+        try:
+            utime(entry)
+        except FileNotFoundError:
+            pass
+        self.__count(hit=True)
+        if chunk_size != None:
+            return self.__read_chunks(entry_file, chunk_size)
+        return self.__read_lines(entry_file)
+
+    def writer(self, key):
+        """Returns a context manager storing a response in the cache
+
+        Lines or chunks of the response are added with the 'write' method of
+        the returned object. The entry is stored only if the block exits 
+        without an exception.
+        """
+
+        return CacheWriter(self, key)
+
+    def clear(self):
+        """Removes all entries"""
+
+        for name in listdir(self.directory):
+            if name.endswith('.lines'):
+                self.__remove(path.join(self.directory, name))
+
+    def stats(self):
+        """Returns a dictionary with the hit, miss and eviction counters"""
+
+        with self.__lock:
+            return {'hits' : self.hits, 'misses' : self.misses, 'evictions' : self.evictions}
+
+    def _commit(self, key, temp_path):
+        replace(temp_path, self.__entry_path(key))
+        self.__evict()
+
+    def __entry_path(self, key):
+        return path.join(self.directory, key + '.lines')
+
+    def __read_lines(self, entry_file):
+        with io.TextIOWrapper(entry_file, encoding='utf-8') as lines:
+            for line in lines:
+                yield line[:-1] if line.endswith('\n') else line
+
+    def __read_chunks(self, entry_file, chunk_size):
+        with entry_file:
+            while True:
+                chunk = entry_file.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def __count(self, hit):
+        with self.__lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def __remove(self, entry):
+        try:
+            remove(entry)
+        except FileNotFoundError:
+            return
+        with self.__lock:
+            self.evictions += 1
+
+    def __created(self, entry):
+        with open(entry, 'rb') as entry_file:
+            return json.loads(entry_file.readline())['created']
+
+    def __evict(self):
+        entries = []
+        now = time.time()
+        for name in listdir(self.directory):
+            if not name.endswith('.lines'):
+                continue
+            entry = path.join(self.directory, name)
+            try:
+                entry_stat = stat(entry)
+                if self.ttl != None and now - self.__created(entry) > self.ttl:
+                    self.__remove(entry)
+                    continue
+            except FileNotFoundError:
+                continue
+            entries.append((entry_stat.st_mtime, entry_stat.st_size, entry))
+
+        # Modification times of entries are updated when they are used
+        entries.sort()
+        total_size = sum(size for mtime, size, entry in entries)
+        for mtime, size, entry in entries:
+            if total_size <= self.max_size:
+                break
+            self.__remove(entry)
+            total_size -= size
+
+class CacheWriter:
+    '''Stores a response in a ResultCache, see ResultCache.writer'''
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.__file = None
+
+    def __enter__(self):
+        import tempfile
+
+        self.__file = tempfile.NamedTemporaryFile('wb', dir=self.cache.directory, suffix='.tmp', delete=False)
+        self.__file.write((json.dumps({'created' : time.time()}) + '\n').encode('utf-8'))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__file.close()
+        if exc_type == None:
+            self.cache._commit(self.key, self.__file.name)
+        else:
+            remove(self.__file.name)
+
+    def write(self, data):
+        """Adds a line (str) or a chunk of the raw response (bytes)"""
+
+        if isinstance(data, bytes):
+            self.__file.write(data)
+        else:
+            self.__file.write((data + '\n').encode('utf-8'))
@@ -0,0 +1,68 @@
+import os
+import time
+from ecfeed import TestProvider, DataSource
+from ecfeed_cache import ResultCache, CacheMode
+
+MODEL = '0000-0000-0000-0000-0000'
+
+def provider(mock_server, mock_credentials, cache):
+    return TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, cache=cache)
+
+def test_repeated_generation_served_from_cache(mock_server, mock_credentials, tmp_path):
+    with provider(mock_server, mock_credentials, str(tmp_path)) as ecfeed:
+        first = list(ecfeed.generate_random(method='TestClass.method', length=20))
+        second = list(ecfeed.generate(method='TestClass.method', data_source=DataSource.RANDOM, 
+                                      properties={'length' : 20, 'duplicates' : 'false', 'adaptive' : 'true'}))
+        assert first == second
+        assert ecfeed.cache.stats() == {'hits' : 1, 'misses' : 1, 'evictions' : 0}
+    assert len(mock_server.requests) == 1
+
+def test_refresh_and_bypass(mock_server, mock_credentials, tmp_path):
+    with provider(mock_server, mock_credentials, ResultCache(str(tmp_path))) as ecfeed:
+        list(ecfeed.export_nwise(method='TestClass.method'))
+        list(ecfeed.export_nwise(method='TestClass.method', cache_mode=CacheMode.REFRESH))
+        list(ecfeed.export_nwise(method='TestClass.method', cache_mode=CacheMode.BYPASS))
+        list(ecfeed.export_nwise(method='TestClass.method'))
+        assert ecfeed.cache.hits == 1
+        assert ecfeed.cache.misses == 1
+    assert len(mock_server.requests) == 3
+
+def test_incomplete_response_is_not_cached(mock_server, mock_credentials, tmp_path):
+    with provider(mock_server, mock_credentials, str(tmp_path)) as ecfeed:
+        next(ecfeed.generate_random(method='TestClass.method', length=20))
+        assert len(list(ecfeed.generate_random(method='TestClass.method', length=20))) == 20
+        assert ecfeed.cache.misses == 2
+    assert [name for name in os.listdir(str(tmp_path)) if not name.endswith('.lines')] == []
+
+def test_expired_entries_are_not_used(mock_server, mock_credentials, tmp_path):
+    with provider(mock_server, mock_credentials, ResultCache(str(tmp_path), ttl=0.2)) as ecfeed:
+        list(ecfeed.generate_nwise(method='TestClass.method'))
+        time.sleep(0.3)
+        list(ecfeed.generate_nwise(method='TestClass.method'))
+        assert ecfeed.cache.misses == 2
+        assert ecfeed.cache.evictions == 1
+    assert len(mock_server.requests) == 2
+
+def test_used_entries_expire_when_stored_ttl_ago(mock_server, mock_credentials, tmp_path):
+    with provider(mock_server, mock_credentials, ResultCache(str(tmp_path), ttl=0.5)) as ecfeed:
+        list(ecfeed.generate_nwise(method='TestClass.method'))
+        time.sleep(0.3)
+        list(ecfeed.generate_nwise(method='TestClass.method'))
+        time.sleep(0.3)
+        list(ecfeed.generate_random(method='TestClass.method', length=5))
+        assert ecfeed.cache.stats() == {'hits' : 1, 'misses' : 2, 'evictions' : 1}
+    assert len(os.listdir(str(tmp_path))) == 1
+
+def test_least_recently_used_entries_are_evicted(mock_server, mock_credentials, tmp_path):
+    with provider(mock_server, mock_credentials, ResultCache(str(tmp_path), max_size=5000)) as ecfeed:
+        for length in [10, 11, 12]:
+            list(ecfeed.generate_random(method='TestClass.method', length=length))
+            time.sleep(0.01)
+        list(ecfeed.generate_random(method='TestClass.method', length=10))
+        time.sleep(0.01)
+        list(ecfeed.generate_random(method='TestClass.method', length=13))
+        assert ecfeed.cache.evictions == 1
+        list(ecfeed.generate_random(method='TestClass.method', length=10))
+        assert ecfeed.cache.hits == 2
+        list(ecfeed.generate_random(method='TestClass.method', length=11))
+        assert ecfeed.cache.hits == 2
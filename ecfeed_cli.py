@@ -1,37 +1,108 @@
 import argparse
 import ecfeed
 from ecfeed import TestProvider, DataSource, TemplateType
+from ecfeed_cache import CacheMode
 import sys
 import os
 import json
+import time
 
 def main():
+    if sys.argv[1:2] == ['coverage']:
+        return coverage(parse_coverage_arguments(sys.argv[2:]))
+
     args = parse_arguments()
 
-    ecfeed = TestProvider(genserver=args['genserver'], keystore_path=args['keystore'], password=args['password'], model=args['model'])    
-    if args['output'] != None:
-        sys.stdout = open(args['output'], 'w')
-    
+    ecfeed = TestProvider(genserver=args['genserver'].split(','), keystore_path=args['keystore'], password=args['password'], model=args['model'],
+                          connect_timeout=args['connect_timeout'], read_timeout=args['read_timeout'], cache=args['cache'], hedge=args['hedge'])
+    with ecfeed:
+        export = generate(ecfeed, args)
+        if args['stats']:
+            print_stats(ecfeed.stats(), export, sys.stderr, ecfeed.latencies() if len(ecfeed.router.endpoints) > 1 else None)
+
+def generate(ecfeed, args):
+    common = {'method': args['method'], 'template': args['template'], 'cache_mode': args['cache_mode']}
     if args['data_source'] == DataSource.NWISE:
-        for line in ecfeed.export_nwise(method=args['method'], n=args['n'], coverage=args['coverage'], template=args['template'], choices=args['choices'], constraints=args['constraints'], url=args['url']):
-            print(line)
+        generator = ecfeed.export_nwise
+        kwargs = dict(n=args['n'], coverage=args['coverage'], choices=args['choices'], constraints=args['constraints'], **common)
     elif args['data_source'] == 'pairwise':
-        for line in ecfeed.export_pairwise(method=args['method'], coverage=args['coverage'], template=args['template'], choices=args['choices'], constraints=args['constraints'], url=args['url']):
-            print(line)
+        generator = ecfeed.export_pairwise
+        kwargs = dict(coverage=args['coverage'], choices=args['choices'], constraints=args['constraints'], **common)
     elif args['data_source'] == DataSource.CARTESIAN:
-        for line in ecfeed.export_cartesian(method=args['method'], coverage=args['coverage'], template=args['template'], choices=args['choices'], constraints=args['constraints'], url=args['url']):
-            print(line)
+        generator = ecfeed.export_cartesian
+        kwargs = dict(coverage=args['coverage'], choices=args['choices'], constraints=args['constraints'], **common)
     elif args['data_source'] == DataSource.RANDOM:
-        for line in ecfeed.export_random(method=args['method'], length=args['length'], adaptive=args['adaptive'], duplicates=args['duplicates'], template=args['template'], choices=args['choices'], constraints=args['constraints'], url=args['url']):
-            print(line)
+        generator = ecfeed.export_random
+        kwargs = dict(length=args['length'], adaptive=args['adaptive'], duplicates=args['duplicates'], choices=args['choices'], constraints=args['constraints'], **common)
     elif args['data_source'] == DataSource.STATIC_DATA:
-        for line in ecfeed.export_static_suite(method=args['method'], length=args['length'], test_suites=args['suites'], template=args['template'], url=args['url']):
-            print(line)
+        generator = ecfeed.export_static_suite
+        kwargs = dict(length=args['length'], test_suites=args['suites'], **common)
     else:
         sys.stderr.write('Unknown data generator: ' + str(args['data_source']))
+        return
+
+    if args['url']:
+        output = open(args['output'], 'w') if args['output'] != None else sys.stdout
+        for line in generator(url=True, **kwargs):
+            print(line, file=output)
+        if output != sys.stdout:
+            output.close()
+        return
+
+    if args['binary']:
+        if args['output'] == None:
+            sys.stderr.write('Binary suites must be written to a file given by --output')
+            return
+        kwargs['template'] = TemplateType.RAW
+        start = time.perf_counter()
+        ecfeed.save_suite(args['output'], generator, **kwargs)
+        seconds = time.perf_counter() - start
+        written = os.path.getsize(args['output'])
+        return {'bytes' : written, 'seconds' : seconds, 'bytes_per_second' : written / seconds if seconds > 0 else 0}
+
+    if args['render'] != None:
+        kwargs['template'] = TemplateType.RAW
+        return ecfeed.export_many(args['render'], generator, atomic=args['atomic'], **kwargs)
+
+    destination = args['output'] if args['output'] != None else sys.stdout.buffer
+    export = ecfeed.export_to(destination, generator, atomic=args['atomic'], **kwargs)
+    if destination == sys.stdout.buffer:
+        destination.flush()
+    return export
+
+def coverage(args):
+    from ecfeed_coverage import analyze_files
+
+    analyzer = analyze_files(args['files'], choices=args['choices'], n=args['n'])
+    report = analyzer.report(args['uncovered'] if args['uncovered'] >= 0 else None)
+    if args['json']:
+        print(json.dumps(report, indent=2))
+    else:
+        print('n: %d, test cases: %d, tuples: %d, covered: %d (%.2f%%)' % (report['n'], report['rows'], report['tuples'], report['covered'], report['coverage']))
+        if report['unknown']:
+            print('values not among the choices: ' + ', '.join('%s %d' % item for item in report['unknown'].items()))
+        if report['uncovered']:
+            print('uncovered tuples (%d of %d):' % (len(report['uncovered']), report['tuples'] - report['covered']))
+            for values in report['uncovered']:
+                print('\t' + ', '.join(name + '=' + value for name, value in values.items()))
+    if args['fail_under'] != None and report['coverage'] < args['fail_under']:
+        return 1
+
+def print_stats(stats, export, file, latencies=None):
+    print('generations: %d, requests: %d, errors: %d, cache hits: %d' % (stats['generations'], stats['requests'], stats['errors'], stats['cache_hits']), file=file)
+    print('lines: %d, received bytes: %d, decompressed bytes: %d' % (stats['rows'], stats['wire_bytes'], stats['body_bytes']), file=file)
+    if export != None:
+        print('exported bytes: %d in %.3f s (%.1f MB/s)' % (export['bytes'], export['seconds'], export['bytes_per_second'] / 1e6), file=file)
+    print('seconds: ' + ', '.join('%s %.4f' % (phase, stats[phase + '_seconds']) for phase in ecfeed.PHASES), file=file)
+    if latencies != None:
+        print('hedged requests: %d, won by hedging: %d' % (stats['hedged'], stats['hedge_wins']), file=file)
+        for address, latency in latencies.items():
+            print('%s: responses %d, failures %d' % (address, latency['count'], latency['failures']) + 
+                  ''.join(', %s %.4f' % (name, latency[name]) for name in ['p50', 'p90', 'p99', 'max'] if latency['count'] > 0), file=file)
 
 def parse_arguments():
-    parser = argparse.ArgumentParser(prog='ecfeed', description='command line utility to access ecFeec remote test generation service')    
+    parser = argparse.ArgumentParser(prog='ecfeed', description='command line utility to access ecFeec remote test generation service',
+                                     epilog='Use "ecfeed coverage --help" for the analysis of the coverage of existing test suites')    
 
     required_args = parser.add_argument_group('Required arguments', 'These arguments must be always provided when invoking ecfeed command')
     required_args.add_argument('--model', dest='model', action='store', help='Id of the accessed model', required=True)
@@ -43,7 +114,10 @@ def parse_arguments():
     connection_args = parser.add_argument_group('Connection arguments', 'Arguments related to connection and authorization to ecFeed server. In most cases the default options will be fine.')
     connection_args.add_argument('--keystore', dest='keystore', action='store', help='Path of the keystore file. Default is ~/.ecfeed/security.p12', default=ecfeed.DEFAULT_KEYSTORE_PATH)
     connection_args.add_argument('--password', dest='password', action='store', help='Password to keystore. Default is "changeit"', default=ecfeed.DEFAULT_KEYSTORE_PASSWORD)
-    connection_args.add_argument('--genserver', dest='genserver', action='store', help='Address of the ecfeed service. Default is "gen.ecfeed.com"', default=ecfeed.DEFAULT_GENSERVER)
+    connection_args.add_argument('--genserver', dest='genserver', action='store', help='Address of the ecfeed service, or a comma separated list of addresses of equivalent services. Default is "gen.ecfeed.com"', default=ecfeed.DEFAULT_GENSERVER)
+    connection_args.add_argument('--hedge', dest='hedge', action='store', type=float, help='If used together with a list of addresses in --genserver, a request that did not receive a response within this percentile (e.g. 95) of the latencies of its service is sent also to another one')
+    connection_args.add_argument('--connect-timeout', dest='connect_timeout', action='store', type=float, help='Number of seconds to wait for a connection to the ecfeed service. Default is ' + str(ecfeed.DEFAULT_CONNECT_TIMEOUT), default=ecfeed.DEFAULT_CONNECT_TIMEOUT)
+    connection_args.add_argument('--read-timeout', dest='read_timeout', action='store', type=float, help='Number of seconds to wait for data from the ecfeed service. By default there is no limit', default=ecfeed.DEFAULT_READ_TIMEOUT)
 
     generator_group = required_args.add_mutually_exclusive_group(required=True)
     generator_group.add_argument('--pairwise', dest='data_source', action='store_const', const='pairwise', help='Use pairwise generator. Equal to --nwise -n 2')
@@ -66,11 +140,16 @@ def parse_arguments():
     static_group.add_argument('--suites', action='store', dest='suites', help='list of test suites that will be fetched from the ecFeed service. If skipped, all test suites will be fetched')
 
     other_arguments = parser.add_argument_group('Other optional arguments', 'These arguments are valid with all or only some data sources')
-    other_arguments.add_argument('--template', dest='template', action='store', help='format for generated data. If not used, the data will be generated in CSV format', choices=[v.name for v in TemplateType], default=TemplateType.CSV)
+    other_arguments.add_argument('--template', dest='template', action='store', help='format for generated data. If not used, the data will be generated in CSV format. BINARY writes a binary suite file (see ecfeed_binary), which requires --output', choices=[v.name for v in TemplateType] + ['BINARY'], default=TemplateType.CSV.name)
     other_arguments.add_argument('--choices', dest='choices', action='store', help="map of choices used for generation, for example \"{'arg1':['c1', 'c2'], 'arg2':['c3', 'abs:c4']}\". Skipped arguments will use all defined choices. This argument is ignored for static generator.")
     other_arguments.add_argument('--constraints', dest='constraints', action='store', help="list of constraints used for generation, for example \"['constraint1', 'constraint2']\". If skipped, all constraints will be used. Use 'NONE' to ignore all constraints. This argument is ignored for static generator.")
     other_arguments.add_argument('--coverage', action='store', dest='coverage', default=100, help='Requested coverage in percent. The generator will stop after the requested percent of n-tuples will be covered. Valid for pairwise, nwise and cartesian generators')
     other_arguments.add_argument('--output', '-o', dest='output', action='store', help='output file. If omitted, the standard output will be used')
+    other_arguments.add_argument('--render', dest='render', action='append', metavar='TEMPLATE=FILE', help='Write the generated data with the given template (CSV, XML, Gherkin or JSON) to the given file, rendered by the client. May be used several times to write the same test cases in several formats from one request, for example "--render CSV=suite.csv --render Gherkin=suite.feature"')
+    other_arguments.add_argument('--atomic', dest='atomic', action='store_true', help='If used together with --output, the data is written to a temporary file which replaces the output file when the generation is complete')
+    other_arguments.add_argument('--cache', dest='cache', action='store', help='directory of the cache of generated data. If used, data generated before for identical arguments is taken from the cache')
+    other_arguments.add_argument('--stats', dest='stats', action='store_true', help='If used, statistics of the generation (timing of its phases, numbers of bytes and lines) are printed to the standard error')
+    other_arguments.add_argument('--refresh-cache', dest='refresh_cache', action='store_true', help='If used together with --cache, the data is generated again and replaces the data in the cache')
 
     args = vars(parser.parse_args())
 
@@ -84,10 +163,35 @@ def parse_arguments():
     if 'suites' in args and args['suites'] != None:
         args['suites'] = json.loads(args['suites'].replace('\'', '"'))
 
+    if args['render'] != None:
+        renders = []
+        for render in args['render']:
+            template, separator, destination = render.partition('=')
+            if ecfeed.parse_template(template) not in [TemplateType.CSV, TemplateType.XML, TemplateType.Gherkin, TemplateType.JSON] or destination == '':
+                parser.error('argument --render: expected TEMPLATE=FILE with template CSV, XML, Gherkin or JSON, got "' + render + '"')
+            renders.append((ecfeed.parse_template(template), destination))
+        args['render'] = renders
+
+    args['binary'] = args['template'] == 'BINARY'
     args['template'] = ecfeed.parse_template(args['template'])
+    args['cache_mode'] = CacheMode.REFRESH if args['refresh_cache'] else CacheMode.USE
 
     return args
 
+def parse_coverage_arguments(argv):
+    parser = argparse.ArgumentParser(prog='ecfeed coverage', description='analysis of the n-wise coverage achieved by existing test suites')
+    parser.add_argument('files', nargs='+', metavar='FILE', help='CSV or JSON (by the extension .json) export or binary suite file. The test cases of all files are analyzed together')
+    parser.add_argument('-n', dest='n', action='store', type=int, default=2, help='size of the counted tuples. Default is 2')
+    parser.add_argument('--choices', dest='choices', action='store', help="map of the values of the choices of the arguments, for example \"{'arg1':[1, 2, 3], 'arg2':['a', 'b']}\". The choices of skipped arguments are the distinct values in the files")
+    parser.add_argument('--uncovered', dest='uncovered', action='store', type=int, default=20, help='maximum number of listed uncovered tuples, -1 lists all of them. Default is 20')
+    parser.add_argument('--json', dest='json', action='store_true', help='If used, the report is printed as JSON')
+    parser.add_argument('--fail-under', dest='fail_under', action='store', type=float, help='If the coverage in percent is below this value, the exit status is 1')
+
+    args = vars(parser.parse_args(argv))
+    if args['choices'] != None:
+        args['choices'] = json.loads(args['choices'].replace('\'', '"'))
+    return args
+
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
 
@@ -0,0 +1,226 @@
+'''Columnar storage of generated test cases
+
+Used by TestProvider.generate_columnar. Values of numeric arguments are kept
+in typed arrays and all other values are dictionary encoded, so a suite of
+millions of test cases takes a few bytes per value instead of a Python object
+per value.
+'''
+
+from array import array
+
+from ecfeed import EcFeedError, ResponseParser, INT_TYPES, FLOAT_TYPES, value_converter, json_decoder
+
+DEFAULT_CHUNK_SIZE = 65536
+
+class NumericColumn:
+    '''Values of a numeric argument stored in an array
+
+    ...
+    Attributes
+    ----------
+    name : str
+        Name of the argument
+
+    typename : str
+        Type of the argument
+
+    values : array.array
+        The values, 'q' (64 bit integer) for integer types and 'd' for
+        floating point types
+    '''
+
+    def __init__(self, name, typename, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.name = name
+        self.typename = typename
+        self.values = array('q' if typename in INT_TYPES else 'd')
+        self.__convert = value_converter(typename)
+        self.__chunk = []
+        self.__chunk_size = chunk_size
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    def append(self, text):
+        """Adds a value, given as text received from the generator service"""
+
+        self.__chunk.append(self.__convert(text))
+        if len(self.__chunk) >= self.__chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Moves buffered values to the array"""
+
+        self.values.extend(self.__chunk)
+        self.__chunk = []
+
+    def nbytes(self):
+        return self.values.itemsize * len(self.values)
+
+    def to_numpy(self):
+        """Returns the values as a numpy array sharing memory with the column"""
+
+        import numpy
+        return numpy.frombuffer(self.values, dtype=numpy.int64 if self.values.typecode == 'q' else numpy.float64)
+
+class CategoricalColumn:
+    '''Dictionary encoded values of an argument
+
+    Each distinct value is converted to the argument type only once.
+    ...
+    Attributes
+    ----------
+    name : str
+        Name of the argument
+
+    typename : str
+        Type of the argument
+
+    categories : list
+        Distinct values of the argument, converted to the argument type
+
+    codes : array.array
+        Index in 'categories' of the value of each test case
+    '''
+
+    def __init__(self, name, typename, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.name = name
+        self.typename = typename
+        self.categories = []
+        self.codes = array('i')
+        self.__convert = value_converter(typename)
+        self.__index = {}
+        self.__chunk = []
+        self.__chunk_size = chunk_size
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        return self.categories[self.codes[index]]
+
+    def append(self, text):
+        """Adds a value, given as text received from the generator service"""
+
+        code = self.__index.get(text)
+        if code == None:
+            code = len(self.categories)
+            self.categories.append(self.__convert(text))
+            self.__index[text] = code
+        self.__chunk.append(code)
+        if len(self.__chunk) >= self.__chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Moves buffered codes to the array"""
+
+        self.codes.extend(self.__chunk)
+        self.__chunk = []
+
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes)
+
+    def to_numpy(self):
+        """Returns the codes as a numpy array sharing memory with the column"""
+
+        import numpy
+        return numpy.frombuffer(self.codes, dtype=numpy.int32)
+
+class ColumnarSuite:
+    '''Generated test cases stored by columns
+
+    ...
+    Attributes
+    ----------
+    args_info : dict
+        Information about the method, see TestProvider.method_info
+
+    columns : list
+        NumericColumn or CategoricalColumn for each argument of the method
+    '''
+
+    def __init__(self, args_info, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.args_info = args_info
+        self.columns = []
+        for typename, name in args_info['args']:
+            if typename in INT_TYPES or typename in FLOAT_TYPES:
+                self.columns.append(NumericColumn(name, typename, chunk_size))
+            else:
+                self.columns.append(CategoricalColumn(name, typename, chunk_size))
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def __getitem__(self, index):
+        """Returns the test case with the given index, with values casted to argument types"""
+
+        return [column[index] for column in self.columns]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def names(self):
+        return [column.name for column in self.columns]
+
+    def types(self):
+        return [column.typename for column in self.columns]
+
+    def column(self, name):
+        """Returns the column of the argument with the given name"""
+
+        for column in self.columns:
+            if column.name == name:
+                return column
+        raise KeyError(name)
+
+    def nbytes(self):
+        """Returns the size of the stored values and codes in bytes"""
+
+        return sum(column.nbytes() for column in self.columns)
+
+    def to_numpy(self):
+        """Returns a dictionary of numpy arrays: values of numeric arguments and codes of others"""
+
+        return {column.name : column.to_numpy() for column in self.columns}
+
+def build_columnar(lines, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Builds a ColumnarSuite from raw lines of a response of the generator service
+
+    Parameters
+    ----------
+    lines : iterable
+        Raw lines of the response, e.g. yielded by a generator called with raw_output=True
+
+    chunk_size : int
+        Number of values buffered before they are moved to the arrays
+
+    Returns
+    -------
+    ColumnarSuite
+    """
+
+    parser = ResponseParser()
+    json_loads = json_decoder()
+    suite = None
+    for line in lines:
+        parsed_line = json_loads(line)
+        test_case = parsed_line.get('testCase')
+        if test_case != None:
+            if suite == None:
+                raise EcFeedError('Test case received before method information: "' + line + '"')
+            for column, arg in zip(columns, test_case):
+                column.append(arg['value'])
+        elif 'info' in parsed_line and suite == None:
+            parser.parse(line)
+            if parser.args_info:
+                suite = ColumnarSuite(parser.args_info, chunk_size)
+                columns = suite.columns
+
+    if suite == None:
+        raise EcFeedError('The response does not contain method information')
+    for column in suite.columns:
+        column.flush()
+    return suite
@@ -0,0 +1,33 @@
+import pytest
+import ecfeed_mock
+from ecfeed import TestProvider
+from ecfeed_columnar import NumericColumn, CategoricalColumn
+
+MODEL = '0000-0000-0000-0000-0000'
+
+@pytest.fixture
+def mock_server(mock_credentials):
+    method = 'com.example.TestClass.method(int arg1, String arg2, double arg3, boolean arg4)'
+    with ecfeed_mock.MockGenServer(mock_credentials, method=method) as server:
+        yield server
+
+def test_columns_hold_the_same_data_as_rows(mock_server, mock_credentials):
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as ecfeed:
+        suite = ecfeed.generate_columnar(ecfeed.generate_random, method='TestClass.method', length=1000, chunk_size=64)
+        rows = list(ecfeed.generate_random(method='TestClass.method', length=1000))
+    assert len(suite) == 1000
+    assert list(suite) == rows
+    assert suite.names() == ['arg1', 'arg2', 'arg3', 'arg4']
+    assert [type(column) for column in suite.columns] == [NumericColumn, CategoricalColumn, NumericColumn, CategoricalColumn]
+    assert suite.column('arg2').categories == ['value' + str(i) for i in range(1, 7)] + ['value0']
+    assert suite.column('arg4').categories == [False, True]
+    assert suite.nbytes() == 1000 * (8 + 4 + 8 + 4)
+
+def test_numpy_views(mock_server, mock_credentials):
+    numpy = pytest.importorskip('numpy')
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as ecfeed:
+        arrays = ecfeed.generate_columnar(ecfeed.generate_random, method='TestClass.method', length=100).to_numpy()
+    assert arrays['arg1'].dtype == numpy.int64
+    assert arrays['arg1'].sum() == sum(i * 31 for i in range(100))
+    assert arrays['arg3'].dtype == numpy.float64
+    assert arrays['arg2'].dtype == numpy.int32
@@ -0,0 +1,77 @@
+import asyncio
+import io
+import zlib
+import pytest
+import ecfeed_mock
+from ecfeed import TestProvider, BodyDecoder, EcFeedError
+from ecfeed_async import AsyncTestProvider
+
+MODEL = '0000-0000-0000-0000-0000'
+
+@pytest.fixture(params=['gzip', 'zstd'])
+def compressing_server(request, mock_credentials):
+    if request.param == 'zstd':
+        pytest.importorskip('zstandard')
+    with ecfeed_mock.MockGenServer(mock_credentials, encodings=[request.param]) as server:
+        yield server
+
+def provider(server, mock_credentials, **kwargs):
+    return TestProvider(genserver=server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, **kwargs)
+
+def test_compressed_stream_matches_plain(compressing_server, mock_server, mock_credentials):
+    with provider(mock_server, mock_credentials) as ecfeed:
+        rows = list(ecfeed.generate_random(method='TestClass.method', length=5000))
+        lines = list(ecfeed.export_random(method='TestClass.method', length=5000))
+        plain = ecfeed.stats()
+    with provider(compressing_server, mock_credentials) as ecfeed:
+        assert list(ecfeed.generate_random(method='TestClass.method', length=5000)) == rows
+        assert list(ecfeed.export_random(method='TestClass.method', length=5000)) == lines
+        exported = io.BytesIO()
+        ecfeed.export_to(exported, ecfeed.export_random, method='TestClass.method', length=5000, chunk_size=1000)
+        stats = ecfeed.stats()
+    assert exported.getvalue().decode('utf-8').splitlines() == lines
+    assert plain['wire_bytes'] == plain['body_bytes'] == mock_server.sent_bytes
+    assert stats['requests'] == 3
+    assert stats['wire_bytes'] == compressing_server.sent_bytes
+    assert stats['body_bytes'] == plain['body_bytes'] + exported.tell()
+    assert stats['wire_bytes'] * 3 < stats['body_bytes']
+    assert stats['decompression_seconds'] > 0
+
+def test_compression_can_be_disabled(compressing_server, mock_credentials):
+    with provider(compressing_server, mock_credentials, compression=False) as ecfeed:
+        list(ecfeed.export_nwise(method='TestClass.method'))
+        stats = ecfeed.stats()
+    assert stats['wire_bytes'] == stats['body_bytes'] == compressing_server.sent_bytes
+
+def test_async_compressed_stream(compressing_server, mock_credentials):
+    async def generate():
+        async with AsyncTestProvider(genserver=compressing_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as ecfeed:
+            rows = [row async for row in ecfeed.generate_random(method='TestClass.method', length=1000)]
+            return rows, ecfeed.stats()
+    rows, stats = asyncio.run(generate())
+    with provider(compressing_server, mock_credentials) as ecfeed:
+        assert rows == list(ecfeed.generate_random(method='TestClass.method', length=1000))
+    assert stats['wire_bytes'] < stats['body_bytes']
+
+def test_async_compressed_error_response(compressing_server, mock_credentials):
+    async def generate():
+        async with AsyncTestProvider(genserver=compressing_server.genserver, keystore_path=mock_credentials['keystore'], model='error') as ecfeed:
+            with pytest.raises(EcFeedError, match='Unknown model'):
+                [row async for row in ecfeed.generate_random(method='TestClass.method')]
+    asyncio.run(generate())
+
+def test_decoder_bounds_output_and_joins_gzip_members():
+    data = b''.join(b'line %d\n' % i for i in range(100000))
+    compressed = zlib.compress(data[:300000], wbits=31) + zlib.compress(data[300000:], wbits=31)
+    decoder = BodyDecoder('gzip')
+    chunks = []
+    for start in range(0, len(compressed), 4096):
+        chunk = decoder.decode(compressed[start:start + 4096], 10000)
+        while chunk:
+            chunks.append(chunk)
+            chunk = decoder.decode(b'', 10000) if decoder.pending() else b''
+    chunks.append(decoder.flush())
+    assert b''.join(chunks) == data
+    assert max(len(chunk) for chunk in chunks) <= 10000
+    assert decoder.wire_bytes == len(compressed)
+    assert decoder.body_bytes == len(data)
@@ -0,0 +1,335 @@
+'''Analysis of the n-wise coverage achieved by existing test suites
+
+Used by TestProvider.analyze_coverage and by the 'ecfeed coverage' command.
+A suite is read from a generator, from CSV or JSON exports or from binary
+suite files (see ecfeed_binary), and the tuples of choices it covers are
+counted against the choices of each argument, e.g.
+
+    choices={'arg1' : [1, 2, 3], 'arg2' : ['a', 'b'], 'arg3' : [True, False]}
+
+Choices missing from 'choices' are taken from the suite itself. Values are
+compared in the text form sent by the generator service, so 1 and '1' are
+the same choice.
+
+Requires numpy.
+'''
+
+import csv
+import functools
+import itertools
+import json
+import operator
+
+import numpy
+
+from ecfeed import EcFeedError, parse_method_definition, json_decoder
+from ecfeed_local import value_text
+
+CHUNK_SIZE = 65536
+DEFAULT_UNCOVERED_LIMIT = 20
+
+class CoverageAnalyzer:
+    '''The n-wise coverage of the test cases added to the analyzer
+
+    Test cases are encoded to columns of choice indices (4 bytes per value)
+    as they are added. Tuples are counted when the coverage is queried:
+    every n-tuple of choices (one choice of each of n different arguments)
+    has one bit in a bitset, and the tuples of one combination of arguments
+    are addressed by the mixed radix index of their choices, as in
+    ecfeed_local.NWiseEngine, so the tuples of a combination covered by a
+    chunk of test cases are marked with a single vectorized assignment. A
+    combination stops reading chunks as soon as all of its tuples are
+    covered.
+
+    Values of test cases that are not among the given choices of their
+    argument are counted in 'unknown' and the tuples containing them are
+    ignored.
+    ...
+    Attributes
+    ----------
+    names : list
+        Names of the arguments
+
+    n : int
+        Size of the counted tuples
+
+    choices : list
+        Texts of the choice values of each argument, in order of the arguments
+
+    rows : int
+        Number of added test cases
+
+    unknown : list
+        Number of values of each argument that are not among its choices
+    '''
+
+    def __init__(self, names, choices=None, n=2):
+        '''
+        Parameters
+        ----------
+        names : list
+            names of the arguments, in the order of the values of test cases
+
+        choices : dict
+            lists of choice values by argument names. The choices of the
+            arguments that are not included are the distinct values of the
+            analyzed test cases (default is None)
+
+        n : int
+            size of the counted tuples (default is 2)
+        '''
+
+        choices = choices if choices != None else {}
+        for name in choices:
+            if name not in names:
+                raise EcFeedError('Choices of an unknown argument: ' + str(name))
+        if n < 1 or n > len(names):
+            raise EcFeedError('n must be between 1 and the number of arguments (' + str(len(names)) + ')')
+
+        self.names = list(names)
+        self.n = n
+        self.choices = [[value_text(value) for value in choices[name]] if name in choices else [] for name in self.names]
+        self.rows = 0
+        self.unknown = [0] * len(self.names)
+        self.__inferred = [name not in choices for name in self.names]
+        self.__indices = [{text : code for code, text in enumerate(texts)} for texts in self.choices]
+        self.__caches = [{} for name in self.names]
+        self.__chunks = []
+        self.__result = None
+
+    def add_rows(self, rows):
+        """Adds test cases given as lists of values, e.g. yielded by TestProvider.generate_nwise"""
+
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, CHUNK_SIZE))
+            if not chunk:
+                return self
+            if set(map(len, chunk)) != {len(self.names)}:
+                raise EcFeedError('Test cases must have ' + str(len(self.names)) + ' values')
+            self.__add_codes(numpy.stack([self.__encode(position, values) for position, values in enumerate(zip(*chunk))]))
+
+    def add_suite(self, suite):
+        """Adds the test cases of a binary suite, see ecfeed_binary.load_suite"""
+
+        if suite.names() != self.names:
+            raise EcFeedError('The suite has arguments ' + str(suite.names()) + ', expected ' + str(self.names))
+        lookups = [self.__encode(position, [choice[1] for choice in column.choices]) for position, column in enumerate(suite.columns)]
+        columns = [column.to_numpy() for column in suite.columns]
+        for start in range(0, len(suite), CHUNK_SIZE):
+            self.__add_codes(numpy.stack([lookup[column[start:start + CHUNK_SIZE]] for lookup, column in zip(lookups, columns)]))
+        return self
+
+    def tuple_count(self):
+        """Returns the number of all n-tuples of choices"""
+
+        return self.__compute()['tuples']
+
+    def covered(self):
+        """Returns the number of n-tuples of choices covered by the added test cases"""
+
+        return self.__compute()['covered']
+
+    def coverage(self):
+        """Returns the percent of the n-tuples covered by the added test cases"""
+
+        result = self.__compute()
+        return 100 * result['covered'] / result['tuples'] if result['tuples'] > 0 else 100.0
+
+    def uncovered(self, limit=None):
+        """Yields the n-tuples not covered by the added test cases, as dictionaries of values by argument names
+
+        Parameters
+        ----------
+        limit : int
+            maximum number of yielded tuples (default is None, which means all)
+        """
+
+        result = self.__compute()
+        sizes = [len(texts) for texts in self.choices]
+        bits = result['bits']
+        for members, offset, size in zip(result['combinations'], result['offsets'], result['sizes']):
+            missing = numpy.flatnonzero(numpy.unpackbits(bits[offset // 8:(offset + size + 7) // 8])[:size] == 0)
+            for index in missing.tolist():
+                if limit != None and limit <= 0:
+                    return
+                codes = []
+                for member in reversed(members):
+                    index, code = divmod(index, sizes[member])
+                    codes.append(code)
+                yield {self.names[member] : self.choices[member][code] for member, code in zip(members, reversed(codes))}
+                if limit != None:
+                    limit -= 1
+
+    def report(self, limit=DEFAULT_UNCOVERED_LIMIT):
+        """Returns a dictionary with the summary of the coverage and at most 'limit' uncovered tuples, which may be serialized to JSON"""
+
+        result = self.__compute()
+        return {'n' : self.n, 'rows' : self.rows, 'arguments' : len(self.names), 'choices' : [len(texts) for texts in self.choices],
+                'tuples' : result['tuples'], 'covered' : result['covered'], 'coverage' : self.coverage(),
+                'unknown' : {name : count for name, count in zip(self.names, self.unknown) if count > 0},
+                'uncovered' : list(self.uncovered(limit))}
+
+    def __encode(self, position, values):
+        # Codes are cached by type, as equal values of different types (True 
+        # and 1, 1.0 and 1) have different texts. A column has usually one type
+        caches = self.__caches[position]
+        kinds = set(map(type, values))
+        if len(kinds) == 1:
+            cache = caches.setdefault(kinds.pop(), {})
+            try:
+                return numpy.fromiter(map(cache.__getitem__, values), dtype=numpy.int32, count=len(values))
+            except KeyError:
+                pass
+        index, texts = self.__indices[position], self.choices[position]
+        for kind, value in dict.fromkeys(zip(map(type, values), values)):
+            cache = caches.setdefault(kind, {})
+            if value in cache:
+                continue
+            text = value_text(value)
+            code = index.get(text)
+            if code == None:
+                if self.__inferred[position]:
+                    code = index[text] = len(texts)
+                    texts.append(text)
+                else:
+                    code = -1
+            cache[value] = code
+        return numpy.fromiter((caches[type(value)][value] for value in values), dtype=numpy.int32, count=len(values))
+
+    def __add_codes(self, codes):
+        unknown = codes < 0
+        if unknown.any():
+            for position, count in enumerate(unknown.sum(axis=1).tolist()):
+                self.unknown[position] += count
+        self.__chunks.append((codes, bool(unknown.any())))
+        self.rows += codes.shape[1]
+        self.__result = None
+
+    def __compute(self):
+        if self.__result != None:
+            return self.__result
+
+        sizes = [len(texts) for texts in self.choices]
+        combinations = list(itertools.combinations(range(len(sizes)), self.n))
+        offsets, combination_sizes, offset = [], [], 0
+        for members in combinations:
+            size = functools.reduce(operator.mul, [sizes[member] for member in members], 1)
+            offsets.append(offset)
+            combination_sizes.append(size)
+            offset += size + -size % 8
+        bits = numpy.zeros(offset // 8, dtype=numpy.uint8)
+
+        covered = 0
+        for members, offset, size in zip(combinations, offsets, combination_sizes):
+            strides = [functools.reduce(operator.mul, [sizes[member] for member in members[position + 1:]], 1) for position in range(len(members))]
+            dtype = numpy.int32 if size < 1 << 31 else numpy.int64
+            seen = numpy.zeros(size, dtype=bool)
+            found = 0
+            for codes, unknown in self.__chunks:
+                tuples = codes[members[0]].astype(dtype) * strides[0]
+                for member, stride in zip(members[1:], strides[1:]):
+                    tuples += codes[member].astype(dtype, copy=False) * stride
+                if unknown:
+                    tuples = tuples[(codes[list(members)] >= 0).all(axis=0)]
+                seen[tuples] = True
+                found = int(numpy.count_nonzero(seen))
+                if found == size:
+                    break
+            bits[offset // 8:(offset + size + 7) // 8] = numpy.packbits(seen)
+            covered += found
+
+        self.__result = {'tuples' : sum(combination_sizes), 'covered' : covered, 'bits' : bits, 'combinations' : combinations,
+                         'offsets' : offsets, 'sizes' : combination_sizes}
+        return self.__result
+
+def read_csv(source):
+    """Returns the names of the arguments and an iterator over the test cases of a CSV export"""
+
+    lines = open(source, newline='', encoding='utf-8')
+    reader = csv.reader(lines)
+    try:
+        names = next(reader)
+    except StopIteration:
+        lines.close()
+        raise EcFeedError(source + ' is empty')
+
+    def rows():
+        with lines:
+            yield from reader
+    return names, rows()
+
+def read_json(source):
+    """Returns the names of the arguments and a list of the test cases of a JSON export"""
+
+    with open(source, encoding='utf-8') as data:
+        try:
+            test_cases = json.load(data)['testCases']
+        except (ValueError, KeyError, TypeError):
+            raise EcFeedError(source + ' is not a JSON export of test cases')
+    if not test_cases:
+        raise EcFeedError(source + ' does not contain test cases')
+    names = [name for name in test_cases[0] if name != 'index']
+    return names, [[test_case[name] for name in names] for test_case in test_cases]
+
+def read_raw(lines):
+    """Returns the names of the arguments and an iterator over the test cases of a raw response of the generator service"""
+
+    lines = iter(lines)
+    loads = json_decoder()
+    for line in lines:
+        parsed_line = loads(line)
+        if 'info' in parsed_line:
+            info = parsed_line['info']
+            if isinstance(info, str):
+                info = json.loads(info.replace('\'', '"'))
+            names = [arg[-1] for arg in parse_method_definition(info['method'])['args']]
+            break
+        elif 'testCase' in parsed_line:
+            raise EcFeedError('Test case received before method information: "' + line + '"')
+    else:
+        raise EcFeedError('The response does not contain method information')
+
+    def rows():
+        for line in lines:
+            test_case = loads(line).get('testCase')
+            if test_case != None:
+                yield [arg['value'] for arg in test_case]
+    return names, rows()
+
+def analyze_files(sources, choices=None, n=2):
+    """Returns a CoverageAnalyzer of the test cases of exports or suite files
+
+    Parameters
+    ----------
+    sources : list
+        Paths of CSV or JSON exports (by the extension .json) or binary suite
+        files (see ecfeed_binary), all of the same method. The test cases of
+        all the files are analyzed together
+
+    choices : dict
+        Lists of choice values by argument names, see CoverageAnalyzer
+
+    n : int
+        Size of the counted tuples (default is 2)
+    """
+
+    from ecfeed_binary import MAGIC, load_suite
+
+    analyzer = None
+    for source in sources:
+        with open(source, 'rb') as data:
+            magic = data.read(len(MAGIC))
+        if magic == MAGIC:
+            with load_suite(source) as suite:
+                analyzer = analyzer if analyzer != None else CoverageAnalyzer(suite.names(), choices, n)
+                analyzer.add_suite(suite)
+            continue
+        names, rows = read_json(source) if source.lower().endswith('.json') else read_csv(source)
+        analyzer = analyzer if analyzer != None else CoverageAnalyzer(names, choices, n)
+        if names != analyzer.names:
+            raise EcFeedError(source + ' has arguments ' + str(names) + ', expected ' + str(analyzer.names))
+        analyzer.add_rows(rows)
+    if analyzer == None:
+        raise EcFeedError('No files to analyze')
+    return analyzer
@@ -0,0 +1,86 @@
+import itertools
+import json
+import random
+import sys
+import pytest
+import ecfeed_mock
+import ecfeed_cli
+from ecfeed import TestProvider, EcFeedError, TemplateType
+from ecfeed_coverage import CoverageAnalyzer, analyze_files
+
+MODEL = '0000-0000-0000-0000-0000'
+CHOICES = {'arg1' : [1, 2, 3], 'arg2' : ['a', 'b', 'c', 'd'], 'arg3' : [0.5, 1.5], 'arg4' : [True, False], 'arg5' : ['x', 'y', 'z']}
+
+def tuples(rows, n):
+    return {(combination, tuple(row[i] for i in combination)) for combination in itertools.combinations(range(len(CHOICES)), n) for row in rows}
+
+@pytest.mark.parametrize('n', [1, 2, 3, 5])
+def test_coverage_matches_counted_tuples(n):
+    generator = random.Random(n)
+    rows = [[generator.choice(values) for values in CHOICES.values()] for _ in range(15)]
+    analyzer = CoverageAnalyzer(list(CHOICES), CHOICES, n).add_rows(rows)
+    everything = tuples(list(itertools.product(*CHOICES.values())), n)
+    assert analyzer.tuple_count() == len(everything)
+    assert analyzer.covered() == len(tuples(rows, n))
+
+    names = list(CHOICES)
+    uncovered = list(analyzer.uncovered())
+    assert {(tuple(names.index(name) for name in values), tuple(values.values())) for values in uncovered} == \
+           {(combination, tuple(str(value).lower() if isinstance(value, bool) else str(value) for value in values))
+            for combination, values in everything - tuples(rows, n)}
+    assert list(analyzer.uncovered(limit=3)) == uncovered[:3]
+
+def test_generated_suites_are_analyzed_and_merged():
+    with TestProvider(genserver='localhost:1', keystore_path='missing.p12', local=True) as ecfeed:
+        analyzer = ecfeed.analyze_coverage(ecfeed.generate_nwise, method='TestClass.method', n=3, choices=CHOICES)
+        assert analyzer.n == 3 and analyzer.coverage() == 100
+        assert sorted(analyzer.choices[3]) == ['false', 'true']
+
+        rows = list(ecfeed.generate_pairwise(method='TestClass.method', choices=CHOICES))
+        values = dict(CHOICES, arg5=['x', 'y', 'z', 'w'])
+        analyzer = CoverageAnalyzer(list(CHOICES), values).add_rows(rows[:len(rows) // 2])
+        partial = analyzer.covered()
+        assert partial < analyzer.tuple_count()
+        analyzer.add_rows(rows[len(rows) // 2:])
+        assert analyzer.covered() == analyzer.tuple_count() - (3 + 4 + 2 + 2)
+        assert all(values['arg5'] == 'w' for values in analyzer.uncovered())
+
+        analyzer.add_rows([[1, 'e', 0.5, True, 'x']])
+        assert analyzer.unknown == [0, 1, 0, 0, 0] and analyzer.covered() == analyzer.tuple_count() - (3 + 4 + 2 + 2)
+        with pytest.raises(EcFeedError):
+            CoverageAnalyzer(list(CHOICES), {'arg6' : [1]})
+        with pytest.raises(EcFeedError):
+            CoverageAnalyzer(list(CHOICES), n=6)
+
+def test_exports_and_suites_are_analyzed_by_cli(mock_credentials, tmp_path, monkeypatch, capsys):
+    csv_path, json_path, suite_path = str(tmp_path / 'suite.csv'), str(tmp_path / 'suite.json'), str(tmp_path / 'suite.ecfs')
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=300) as server:
+        with TestProvider(genserver=server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as ecfeed:
+            ecfeed.export_many({TemplateType.CSV : csv_path, TemplateType.JSON : json_path}, ecfeed.generate_random, method='TestClass.method', length=300)
+            ecfeed.save_suite(suite_path, ecfeed.generate_random, method='TestClass.method', length=300)
+            generated = ecfeed.analyze_coverage(ecfeed.generate_random, method='TestClass.method', length=300)
+
+    reports = [analyze_files([file_path]).report(limit=None) for file_path in [csv_path, json_path, suite_path]]
+    assert reports[0] == reports[1] == reports[2] == generated.report(limit=None)
+    assert analyze_files([csv_path, suite_path]).rows == 600
+
+    monkeypatch.setattr(sys, 'argv', ['ecfeed', 'coverage', csv_path, suite_path, '--choices', "{'arg2' : ['value0', 'value1', 'other']}", '--fail-under', '100', '--uncovered', '2'])
+    assert ecfeed_cli.main() == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith('n: 2, test cases: 600, ')
+    assert lines[1].startswith('values not among the choices: arg2 ')
+    assert lines[2].startswith('uncovered tuples (2 of ') and len(lines) == 5
+
+    monkeypatch.setattr(sys, 'argv', ['ecfeed', 'coverage', json_path, '-n', '1', '--json'])
+    assert ecfeed_cli.main() == None
+    report = json.loads(capsys.readouterr().out)
+    assert report['n'] == 1 and report['coverage'] == 100 and report['uncovered'] == []
+
+def test_equal_values_of_different_types_are_distinct():
+    analyzer = CoverageAnalyzer(['arg1', 'arg2'], n=1).add_rows([[True, 1.0], [1, 1]])
+    analyzer.add_rows([[False, 1.0], [1, 1.0]])
+    assert analyzer.choices == [['true', '1', 'false'], ['1.0', '1']]
+    assert analyzer.covered() == analyzer.tuple_count() == 5
+
+    analyzer = CoverageAnalyzer(['arg1'], {'arg1' : [1, True]}, n=1).add_rows([[True], [True]])
+    assert analyzer.covered() == 1 and list(analyzer.uncovered()) == [{'arg1' : '1'}]
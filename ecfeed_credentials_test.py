@@ -0,0 +1,37 @@
+import os
+import pytest
+from ecfeed import TestProvider, KeystoreCredentials
+import ecfeed_mock
+
+@pytest.fixture
+def keystore(tmp_path):
+    return ecfeed_mock.create_credentials(str(tmp_path))['keystore']
+
+def test_keystore_decoded_once(keystore):
+    credentials = KeystoreCredentials(keystore, 'changeit')
+    files = credentials.files()
+    for i in range(10):
+        assert credentials.files() == files
+    assert credentials.load_count == 1
+    assert all(os.path.exists(f) for f in files)
+    credentials.close()
+
+def test_keystore_reloaded_when_modified(keystore):
+    credentials = KeystoreCredentials(keystore, 'changeit')
+    old_files = credentials.files()
+    stat = os.stat(keystore)
+    os.utime(keystore, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    new_files = credentials.files()
+    assert credentials.load_count == 2
+    assert new_files != old_files
+    assert not any(os.path.exists(f) for f in old_files)
+    credentials.close()
+
+def test_provider_close_removes_credentials(keystore):
+    with TestProvider(keystore_path=keystore, model='0000-0000-0000-0000-0000') as provider:
+        files = provider.credentials.files()
+        assert all(os.path.exists(f) for f in files)
+    assert not any(os.path.exists(f) for f in files)
+    assert provider.credentials.files() != files
+    assert provider.credentials.load_count == 2
+    provider.close()
@@ -0,0 +1,62 @@
+import io
+import os
+import pytest
+from ecfeed import TestProvider, EcFeedError
+
+MODEL = '0000-0000-0000-0000-0000'
+
+def provider(mock_server, mock_credentials, model=MODEL, cache=None):
+    return TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=model, cache=cache)
+
+def expected_export(mock_server, count):
+    return ''.join(line + '\n' for line in mock_server.export_lines(count)).encode('utf-8')
+
+def test_export_to_file_matches_lines(mock_server, mock_credentials, tmp_path):
+    destination = str(tmp_path / 'export.csv')
+    with provider(mock_server, mock_credentials) as ecfeed:
+        stats = ecfeed.export_to(destination, ecfeed.export_random, method='TestClass.method', length=1000, chunk_size=4096)
+        lines = list(ecfeed.export_random(method='TestClass.method', length=1000))
+    with open(destination, 'rb') as exported:
+        data = exported.read()
+    assert data == expected_export(mock_server, 1000)
+    assert data.decode('utf-8').splitlines() == lines
+    assert stats['bytes'] == len(data)
+    assert stats['bytes_per_second'] > 0
+
+def test_export_to_file_object_and_cache(mock_server, mock_credentials, tmp_path):
+    with provider(mock_server, mock_credentials, cache=str(tmp_path)) as ecfeed:
+        first = io.BytesIO()
+        second = io.BytesIO()
+        ecfeed.export_to(first, ecfeed.export_nwise, method='TestClass.method')
+        ecfeed.export_to(second, ecfeed.export_nwise, method='TestClass.method', chunk_size=7)
+        assert list(ecfeed.export_nwise(method='TestClass.method')) == first.getvalue().decode('utf-8').splitlines()
+        assert ecfeed.cache.hits == 2
+    assert first.getvalue() == second.getvalue() == expected_export(mock_server, 10)
+    assert len(mock_server.requests) == 1
+
+def test_atomic_export_keeps_old_file_on_error(mock_server, mock_credentials, tmp_path):
+    destination = str(tmp_path / 'export.csv')
+    with open(destination, 'w') as old:
+        old.write('old data\n')
+    with provider(mock_server, mock_credentials, model='error') as ecfeed:
+        with pytest.raises(EcFeedError):
+            ecfeed.export_to(destination, ecfeed.export_nwise, method='TestClass.method', atomic=True)
+    assert os.listdir(str(tmp_path)) == ['export.csv']
+    with open(destination) as old:
+        assert old.read() == 'old data\n'
+
+    with provider(mock_server, mock_credentials) as ecfeed:
+        ecfeed.export_to(destination, ecfeed.export_nwise, method='TestClass.method', atomic=True)
+    assert os.listdir(str(tmp_path)) == ['export.csv']
+    with open(destination, 'rb') as exported:
+        assert exported.read() == expected_export(mock_server, 10)
+
+def test_atomic_export_has_mode_of_plain_export(mock_server, mock_credentials, tmp_path):
+    umask = os.umask(0o022)
+    try:
+        with provider(mock_server, mock_credentials) as ecfeed:
+            ecfeed.export_to(str(tmp_path / 'plain.csv'), ecfeed.export_nwise, method='TestClass.method')
+            ecfeed.export_to(str(tmp_path / 'atomic.csv'), ecfeed.export_nwise, method='TestClass.method', atomic=True)
+    finally:
+        os.umask(umask)
+    assert os.stat(str(tmp_path / 'atomic.csv')).st_mode == os.stat(str(tmp_path / 'plain.csv')).st_mode
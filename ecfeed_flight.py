@@ -0,0 +1,234 @@
+'''Sharing of identical generation requests that are in flight at the same time
+
+Used by TestProvider when it is constructed with the 'single_flight' argument.
+'''
+
+import collections
+import threading
+import time
+
+DEFAULT_BUFFER_SIZE = 1024
+DEFAULT_MAX_WAIT = 1.0
+
+class SingleFlight:
+    '''Identical streams attached to a single upstream stream
+
+    Calls of 'subscribe' with the same key share one upstream iterator
+    while it has not produced its first item yet, i.e. while the request
+    waits for the response. Later calls start a new upstream iterator.
+
+    The upstream iterator is advanced by the subscriber that needs the next
+    item, and each item is added to the buffers of the other subscribers.
+    When a buffer is full, the reading subscriber waits for the slow one at
+    most 'max_wait' seconds and then detaches it. A detached subscriber
+    yields the items left in its buffer and then stops, with its 'detached'
+    attribute set, so that its owner can continue the stream on its own.
+    ...
+    Attributes
+    ----------
+    buffer_size : int
+        Maximum number of items buffered for a subscriber
+
+    max_wait : float
+        Number of seconds a stream waits for a subscriber with a full buffer,
+        None means waiting forever
+
+    flights : int
+        Number of started upstream iterators
+
+    joined : int
+        Number of subscribers attached to an upstream iterator started by
+        another subscriber, i.e. the number of saved upstream requests
+
+    detached : int
+        Number of subscribers detached because they fell behind
+    '''
+
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, max_wait=DEFAULT_MAX_WAIT):
+        '''
+        Parameters
+        ----------
+        buffer_size : int
+            maximum number of items buffered for a subscriber (default is 1024)
+
+        max_wait : float
+            number of seconds a stream waits for a subscriber with a full
+            buffer before it is detached (default is 1)
+        '''
+
+        self.buffer_size = buffer_size
+        self.max_wait = max_wait
+        self.flights = 0
+        self.joined = 0
+        self.detached = 0
+        self.__open = {}
+        self.__lock = threading.Lock()
+
+    def subscribe(self, key, upstream):
+        """Returns a Subscription to the stream of the given key
+
+        Parameters
+        ----------
+        key : hashable
+            Identity of the stream
+
+        upstream : function
+            Called without arguments to start the upstream iterator, if
+            there is no open stream with the key
+        """
+
+        with self.__lock:
+            flight = self.__open.get(key)
+            subscription = flight._join() if flight != None else None
+            if subscription != None:
+                self.joined += 1
+                return subscription
+            flight = _Flight(self, key, upstream)
+            self.__open[key] = flight
+            self.flights += 1
+            return flight._join(leader=True)
+
+    def stats(self):
+        """Returns a dictionary with the flight, join and detachment counters"""
+
+        with self.__lock:
+            return {'flights' : self.flights, 'joined' : self.joined, 'detached' : self.detached}
+
+    def _close(self, flight):
+        with self.__lock:
+            if self.__open.get(flight.key) is flight:
+                del self.__open[flight.key]
+
+    def _count_detached(self, count):
+        with self.__lock:
+            self.detached += count
+
+class Subscription:
+    '''Iterator over the items of a stream shared by SingleFlight
+
+    ...
+    Attributes
+    ----------
+    leader : bool
+        True if the subscription started the upstream iterator
+
+    detached : bool
+        True if the subscription was detached because it fell behind. The
+        iteration then stops before the end of the stream
+    '''
+
+    def __init__(self, flight, leader):
+        self.leader = leader
+        self.detached = False
+        self.buffer = collections.deque()
+        self.__flight = flight
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.__flight._next(self)
+
+    def close(self):
+        """Stops receiving items; the upstream iterator is closed with its last subscription"""
+
+        self.__flight._leave(self)
+
+class _Flight:
+    def __init__(self, owner, key, upstream):
+        self.owner = owner
+        self.key = key
+        self.upstream = upstream
+        self.iterator = None
+        self.subscribers = []
+        self.accepting = True
+        self.reading = False
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def _join(self, leader=False):
+        with self.condition:
+            if not self.accepting:
+                return None
+            subscription = Subscription(self, leader)
+            self.subscribers.append(subscription)
+            return subscription
+
+    def _next(self, subscription):
+        with self.condition:
+            while True:
+                if subscription.buffer:
+                    if len(subscription.buffer) == self.owner.buffer_size:
+                        self.condition.notify_all()
+                    return subscription.buffer.popleft()
+                if subscription.detached or subscription not in self.subscribers:
+                    raise StopIteration
+                if self.error != None:
+                    raise self.error
+                if self.done:
+                    raise StopIteration
+                if not self.reading:
+                    break
+                self.condition.wait()
+            self.reading = True
+
+        try:
+            if self.iterator == None:
+                self.iterator = iter(self.upstream())
+            item = next(self.iterator)
+        except BaseException as e:
+            with self.condition:
+                self.reading = False
+                self.done = True
+                self.accepting = False
+                if not isinstance(e, StopIteration):
+                    self.error = e
+                self.condition.notify_all()
+            self.owner._close(self)
+            raise
+
+        with self.condition:
+            first, self.accepting = self.accepting, False
+            detached = self.__wait_for_space(subscription)
+            for other in self.subscribers:
+                if other is not subscription:
+                    other.buffer.append(item)
+            self.reading = False
+            self.condition.notify_all()
+        if first:
+            self.owner._close(self)
+        if detached:
+            self.owner._count_detached(detached)
+        return item
+
+    def __wait_for_space(self, subscription):
+        size = self.owner.buffer_size
+        deadline = None if self.owner.max_wait == None else time.monotonic() + self.owner.max_wait
+        while True:
+            full = [other for other in self.subscribers if other is not subscription and len(other.buffer) >= size]
+            if not full:
+                return 0
+            remaining = None if deadline == None else deadline - time.monotonic()
+            if remaining != None and remaining <= 0:
+                for other in full:
+                    other.detached = True
+                    self.subscribers.remove(other)
+                return len(full)
+            self.condition.wait(remaining)
+
+    def _leave(self, subscription):
+        with self.condition:
+            if subscription in self.subscribers:
+                self.subscribers.remove(subscription)
+            subscription.buffer.clear()
+            if self.subscribers or self.done:
+                self.condition.notify_all()
+                return
+            self.done = True
+            self.accepting = False
+            iterator, self.iterator = self.iterator, None
+            self.condition.notify_all()
+        self.owner._close(self)
+        if iterator != None and hasattr(iterator, 'close'):
+            iterator.close()
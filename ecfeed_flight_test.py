@@ -0,0 +1,97 @@
+import threading
+import time
+import pytest
+import ecfeed_mock
+from ecfeed import TestProvider, EcFeedError
+from ecfeed_flight import SingleFlight
+
+MODEL = '0000-0000-0000-0000-0000'
+
+def provider(server, mock_credentials, **kwargs):
+    return TestProvider(genserver=server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, **kwargs)
+
+def run_threads(count, target):
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    def run(index):
+        barrier.wait()
+        results[index] = target(index)
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_identical_requests_share_one_stream(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=3000, latency=0.3) as server:
+        with provider(server, mock_credentials, single_flight=True) as ecfeed:
+            results = run_threads(4, lambda index: list(ecfeed.generate_random(method='TestClass.method', length=3000)))
+            exported = run_threads(2, lambda index: list(ecfeed.export_random(method='TestClass.method', length=3000)))
+            assert ecfeed.single_flight.stats() == {'flights' : 2, 'joined' : 4, 'detached' : 0}
+            stats = ecfeed.stats()
+            list(ecfeed.generate_random(method='TestClass.method', length=3000))
+            assert ecfeed.single_flight.flights == 3
+        assert len(server.requests) == 3
+    assert all(result == results[0] for result in results) and len(results[0]) == 3000
+    assert exported[0] == exported[1]
+    assert stats['requests'] == 2 and stats['generations'] == 6 and stats['shared'] == 4
+    assert stats['rows'] == 4 * 3000 + 2 * 3001
+
+def test_slow_subscriber_is_detached_and_resumed(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=500, latency=0.2) as server:
+        flight = SingleFlight(buffer_size=16, max_wait=0.05)
+        with provider(server, mock_credentials, single_flight=flight) as ecfeed:
+            events = []
+            ecfeed.add_hook(events.append)
+            def consume(index, generator=ecfeed.generate_cartesian):
+                rows = []
+                try:
+                    for row in generator(method='TestClass.method'):
+                        rows.append(row)
+                        if index == 1 and len(rows) == 100:
+                            time.sleep(0.3)
+                except EcFeedError as e:
+                    return e
+                return rows
+            results = run_threads(2, consume)
+            assert flight.stats() == {'flights' : 1, 'joined' : 1, 'detached' : 1}
+            assert results[0] == results[1] and len(results[0]) == 500
+            assert sorted(event.shared for event in events) == [False, True]
+            assert sum(event.responses for event in events) == 2
+
+            results = run_threads(2, lambda index: consume(index, ecfeed.generate_nwise))
+            assert len(results[0]) == 500
+            assert isinstance(results[1], EcFeedError)
+        assert len(server.requests) == 3
+
+def test_errors_and_early_close_reach_all_subscribers():
+    flight = SingleFlight()
+    def failing():
+        yield 1
+        raise EcFeedError('broken')
+    first, second = flight.subscribe('key', failing), flight.subscribe('key', failing)
+    assert (first.leader, second.leader) == (True, False)
+    assert next(first) == 1
+    third = flight.subscribe('key', failing)
+    assert third.leader
+    with pytest.raises(EcFeedError):
+        next(first)
+    assert next(second) == 1
+    with pytest.raises(EcFeedError):
+        next(second)
+
+    closed = []
+    def endless():
+        try:
+            while True:
+                yield 0
+        finally:
+            closed.append(True)
+    first, second = flight.subscribe('endless', endless), flight.subscribe('endless', endless)
+    assert next(first) == next(second) == 0
+    first.close()
+    assert closed == []
+    second.close()
+    assert closed == [True]
+    assert flight.stats() == {'flights' : 3, 'joined' : 2, 'detached' : 0}
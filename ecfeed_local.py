@@ -0,0 +1,571 @@
+'''Local generators of test cases
+
+Used by TestProvider created with local=True. The generators run in the
+process, without contacting the generator service, on values of the method
+arguments given in the 'choices' argument, e.g.
+
+    choices={'arg1' : [1, 2, 3], 'arg2' : ['a', 'b'], 'arg3' : [True, False]}
+
+Requires numpy.
+'''
+
+from enum import Enum
+import functools
+import itertools
+import operator
+import json
+import math
+import random
+
+import numpy
+
+from ecfeed import EcFeedError, DataSource, parse_method_definition
+
+def value_type(value):
+    """Returns the name of the argument type of a choice value"""
+
+    if isinstance(value, bool):
+        return 'boolean'
+    elif isinstance(value, int):
+        return 'int'
+    elif isinstance(value, float):
+        return 'double'
+    elif isinstance(value, Enum):
+        return type(value).__module__ + '.' + type(value).__name__
+    return 'String'
+
+def value_text(value):
+    """Returns a choice value as text, the way it is sent by the generator service"""
+
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    elif isinstance(value, Enum):
+        return value.name
+    return str(value)
+
+class NWiseEngine:
+    '''Greedy construction of an n-wise covering array
+
+    Every n-tuple of choices (one choice of each of n different arguments)
+    has one bit in a numpy array, set while the tuple is not covered. The
+    bits of the tuples of one combination of arguments are addressed by the
+    mixed radix index of their choices, so the tuples covered by a test case
+    are found with a single vectorized lookup.
+
+    Each test case starts from the first uncovered tuple. The remaining
+    arguments are assigned in random order, each one to the choice that
+    covers most of the uncovered tuples formed with already assigned
+    arguments (ties are broken randomly). Every test case covers at least
+    one new tuple and the test cases are yielded as soon as they are built.
+
+    The bit array takes one byte per tuple, i.e. about C(k, n) * v^n bytes
+    for k arguments with v choices each.
+    ...
+    Attributes
+    ----------
+    sizes : list
+        Number of choices of each argument
+
+    n : int
+        Size of the covered tuples
+
+    tuple_count : int
+        Number of all n-tuples
+
+    covered : int
+        Number of n-tuples covered by the test cases yielded so far
+    '''
+
+    def __init__(self, sizes, n=2, coverage=100, seed=None):
+        '''
+        Parameters
+        ----------
+        sizes : list
+            number of choices of each argument
+
+        n : int
+            size of the covered tuples (default is 2)
+
+        coverage : float
+            percent of the n-tuples that must be covered (default is 100)
+
+        seed : int
+            seed of the random choice of the order of arguments and of the
+            choices with equal scores (default is None, which means 0)
+        '''
+
+        if n < 1 or n > len(sizes):
+            raise EcFeedError('n must be between 1 and the number of arguments (' + str(len(sizes)) + ')')
+        if any(size < 1 for size in sizes):
+            raise EcFeedError('Every argument must have at least one choice')
+
+        self.sizes = list(sizes)
+        self.n = n
+        self.coverage = coverage
+        self.seed = seed
+        self.covered = 0
+
+        combinations = list(itertools.combinations(range(len(sizes)), n))
+        self.__members = numpy.array(combinations, dtype=numpy.int64)
+        self.__strides = numpy.empty_like(self.__members)
+        self.__offsets = numpy.empty(len(combinations), dtype=numpy.int64)
+        offset = 0
+        for index, combination in enumerate(combinations):
+            stride = 1
+            for position in reversed(range(n)):
+                self.__strides[index, position] = stride
+                stride *= sizes[combination[position]]
+            self.__offsets[index] = offset
+            offset += stride
+        self.tuple_count = offset
+        self.__combinations_of = [numpy.flatnonzero((self.__members == argument).any(axis=1)) for argument in range(len(sizes))]
+
+    def nbytes(self):
+        """Returns the size of the arrays describing the tuples in bytes"""
+
+        return self.tuple_count + self.__members.nbytes + self.__strides.nbytes + self.__offsets.nbytes
+
+    def __iter__(self):
+        """Yields test cases as lists of indices of choices"""
+
+        rng = numpy.random.default_rng(self.seed if self.seed != None else 0)
+        uncovered = numpy.ones(self.tuple_count, dtype=bool)
+        target = math.ceil(self.tuple_count * self.coverage / 100)
+        sizes = numpy.array(self.sizes, dtype=numpy.int64)
+        members, strides, offsets = self.__members, self.__strides, self.__offsets
+        cursor = 0
+        self.covered = 0
+
+        while self.covered < target:
+            cursor += int(uncovered[cursor:].argmax())
+            row = numpy.full(len(self.sizes), -1, dtype=numpy.int64)
+
+            combination = int(numpy.searchsorted(offsets, cursor, side='right')) - 1
+            seed_members = members[combination]
+            row[seed_members] = (cursor - offsets[combination]) // strides[combination] % sizes[seed_members]
+
+            for argument in rng.permutation(numpy.flatnonzero(row < 0)):
+                row[argument] = self.__best_choice(argument, row, uncovered, rng)
+
+            indices = offsets + (row[members] * strides).sum(axis=1)
+            self.covered += int(uncovered[indices].sum())
+            uncovered[indices] = False
+            yield row.tolist()
+
+    def __best_choice(self, argument, row, uncovered, rng):
+        combinations = self.__combinations_of[argument]
+        members = self.__members[combinations]
+        is_argument = members == argument
+        values = row[members]
+        eligible = ((values >= 0) | is_argument).all(axis=1)
+        if not eligible.any():
+            return int(rng.integers(self.sizes[argument]))
+
+        strides = self.__strides[combinations[eligible]]
+        is_argument = is_argument[eligible]
+        bases = self.__offsets[combinations[eligible]] + (numpy.where(is_argument, 0, values[eligible]) * strides).sum(axis=1)
+        argument_strides = (strides * is_argument).sum(axis=1)
+        indices = bases[:, None] + argument_strides[:, None] * numpy.arange(self.sizes[argument])
+        scores = uncovered[indices].sum(axis=0)
+        best = numpy.flatnonzero(scores == scores.max())
+        return int(best[rng.integers(len(best))]) if len(best) > 1 else int(best[0])
+
+FEISTEL_ROUNDS = 4
+FEISTEL_MULTIPLIER = 0x9E3779B97F4A7C15
+
+class IndexPermutation:
+    '''Pseudo-random permutation of range(size), computed for each index separately
+
+    A balanced Feistel network on the smallest even number of bits covering
+    size, with cycle walking for results outside of the range. The first m
+    values of the permutation are a sample of m indices without replacement,
+    available without materializing the rest.
+    '''
+
+    def __init__(self, size, seed=None):
+        self.size = size
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self.half_bits = bits // 2
+        self.mask = (1 << self.half_bits) - 1
+        self.product_mask = (1 << bits) - 1
+        self.multiplier = FEISTEL_MULTIPLIER & self.product_mask | 1
+        keys = random.Random(seed if seed != None else 0)
+        self.keys = [keys.getrandbits(self.half_bits) for round in range(FEISTEL_ROUNDS)]
+
+    def __call__(self, index):
+        half_bits, mask, product_mask, multiplier = self.half_bits, self.mask, self.product_mask, self.multiplier
+        while True:
+            left, right = index >> half_bits, index & mask
+            for key in self.keys:
+                left, right = right, left ^ (((right ^ key) * multiplier & product_mask) >> half_bits)
+            index = (left << half_bits) | right
+            if index < self.size:
+                return index
+
+    def array(self, indices):
+        """Permutes a numpy array of indices, requires size below 2^62"""
+
+        indices = indices.astype(numpy.uint64)
+        pending = numpy.arange(len(indices))
+        half_bits, mask = numpy.uint64(self.half_bits), numpy.uint64(self.mask)
+        product_mask, multiplier = numpy.uint64(self.product_mask), numpy.uint64(self.multiplier)
+        while len(pending):
+            values = indices[pending]
+            left, right = values >> half_bits, values & mask
+            for key in self.keys:
+                left, right = right, left ^ ((((right ^ numpy.uint64(key)) * multiplier) & product_mask) >> half_bits)
+            values = (left << half_bits) | right
+            indices[pending] = values
+            pending = pending[values >= numpy.uint64(self.size)]
+        return indices.astype(numpy.int64)
+
+class CartesianEngine:
+    '''Lazy cartesian product of choices, addressed by the index of a test case
+
+    Test case k is computed directly by decoding k as a mixed radix number
+    whose digits are indices of choices (the first argument is the most
+    significant digit), in the order of itertools.product. With coverage
+    below 100 percent, the test cases are a sample of the product without
+    replacement, in pseudo-random order determined by the seed.
+
+    The engine supports len(), indexing and slicing (slices are engines 
+    as well), and shard(i, n) splits it to n disjoint parts, so each of n 
+    workers can generate its own part without generating the rest.
+    ...
+    Attributes
+    ----------
+    sizes : list
+        Number of choices of each argument
+
+    product_size : int
+        Number of test cases in the full cartesian product
+    '''
+
+    def __init__(self, sizes, coverage=100, seed=None):
+        '''
+        Parameters
+        ----------
+        sizes : list
+            number of choices of each argument
+
+        coverage : float
+            percent of the product that is generated (default is 100)
+
+        seed : int
+            seed of the sample of the product if coverage is below 100 
+            (default is None, which means 0)
+        '''
+
+        if any(size < 1 for size in sizes):
+            raise EcFeedError('Every argument must have at least one choice')
+
+        self.sizes = list(sizes)
+        self.product_size = functools.reduce(operator.mul, self.sizes, 1)
+        self.coverage = coverage
+        self.seed = seed
+        if coverage >= 100:
+            self.__permutation = None
+            self.__positions = range(self.product_size)
+        else:
+            self.__permutation = IndexPermutation(self.product_size, seed)
+            self.__positions = range(math.ceil(self.product_size * coverage / 100))
+
+    def __len__(self):
+        return len(self.__positions)
+
+    def count(self):
+        """Returns the number of test cases, also if it is too large for len()"""
+
+        positions = self.__positions
+        return max(0, (positions.stop - positions.start + positions.step - (1 if positions.step > 0 else -1)) // positions.step)
+
+    def __getitem__(self, key):
+        """Returns the test case with the given position as a list of indices of choices,
+        or an engine generating the test cases at positions given by a slice"""
+
+        if isinstance(key, slice):
+            view = CartesianEngine.__new__(CartesianEngine)
+            view.__dict__.update(self.__dict__)
+            view.__positions = self.__positions[key]
+            return view
+        return self.decode(self.index(self.__positions[key]))
+
+    def __iter__(self):
+        if self.product_size >= 1 << 62:
+            for position in self.__positions:
+                yield self.decode(self.index(position))
+            return
+
+        sizes = numpy.array(self.sizes, dtype=numpy.int64)
+        divisors = numpy.concatenate([numpy.cumprod(sizes[:0:-1])[::-1], [1]]).astype(numpy.int64)
+        for start in range(0, self.count(), BATCH_SIZE):
+            positions = self.__positions[start:start + BATCH_SIZE]
+            indices = numpy.arange(positions.start, positions.stop, positions.step, dtype=numpy.int64)
+            if self.__permutation != None:
+                indices = self.__permutation.array(indices)
+            yield from (indices[:, None] // divisors % sizes).tolist()
+
+    def shard(self, index, count):
+        """Returns part 'index' of 'count' disjoint, contiguous parts of the engine"""
+
+        if not 0 <= index < count:
+            raise EcFeedError('Shard index must be between 0 and ' + str(count - 1))
+        length = self.count()
+        return self[length * index // count:length * (index + 1) // count]
+
+    def index(self, position):
+        """Returns the index in the full product of the test case at the given position"""
+
+        return self.__permutation(position) if self.__permutation != None else position
+
+    def decode(self, index):
+        """Returns the test case with the given index in the full product as a list of indices of choices"""
+
+        row = [0] * len(self.sizes)
+        for argument in reversed(range(len(self.sizes))):
+            index, row[argument] = divmod(index, self.sizes[argument])
+        return row
+
+class CartesianProduct:
+    '''Lazy cartesian product of values of arguments, see CartesianEngine
+
+    Indexing, iteration and shards return lists of values instead of 
+    indices of choices.
+    '''
+
+    def __init__(self, choices, coverage=100, seed=None, engine=None):
+        '''
+        Parameters
+        ----------
+        choices : dict or list
+            lists of values of the arguments, by argument name or in order
+
+        coverage, seed
+            see CartesianEngine
+        '''
+
+        self.values = [list(values) for values in (choices.values() if isinstance(choices, dict) else choices)]
+        self.engine = engine if engine != None else CartesianEngine([len(values) for values in self.values], coverage, seed)
+
+    def __len__(self):
+        return len(self.engine)
+
+    def count(self):
+        return self.engine.count()
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return CartesianProduct(self.values, engine=self.engine[key])
+        return [choices[index] for choices, index in zip(self.values, self.engine[key])]
+
+    def __iter__(self):
+        values = self.values
+        for row in self.engine:
+            yield [choices[index] for choices, index in zip(values, row)]
+
+    def shard(self, index, count):
+        return CartesianProduct(self.values, engine=self.engine.shard(index, count))
+
+DEFAULT_CANDIDATES = 10
+DEFAULT_HISTORY = 1000
+MAX_DUPLICATE_BATCHES = 100
+
+class RandomEngine:
+    '''Seeded random and adaptive random generator of test cases
+
+    Adaptive generation draws a batch of candidate test cases for each 
+    generated test case and takes the candidate with the largest Hamming 
+    distance to the nearest of the previously generated test cases. The 
+    distances of the whole batch are computed at once on a matrix of choice 
+    indices, one argument at a time. To keep the time of a test case constant, only the last 
+    'history' test cases are compared; suites not longer than 'history' are 
+    fully adaptive.
+
+    Without duplicates, generated test cases are kept in a set and the 
+    generation stops when all combinations of choices were generated. When 
+    random candidates keep repeating, the remaining combinations are 
+    enumerated and the candidates are drawn from them.
+    ...
+    Attributes
+    ----------
+    sizes : list
+        Number of choices of each argument
+
+    length : int
+        Number of test cases to generate
+    '''
+
+    def __init__(self, sizes, length=1, adaptive=True, duplicates=False, seed=None, 
+                 candidates=DEFAULT_CANDIDATES, history=DEFAULT_HISTORY):
+        '''
+        Parameters
+        ----------
+        sizes : list
+            number of choices of each argument
+
+        length : int
+            number of test cases to generate (default is 1)
+
+        adaptive : bool
+            if set to True, each test case is the farthest of a batch of 
+            candidates from the generated test cases (default is True)
+
+        duplicates : bool
+            if set to False, every test case is different (default is False)
+
+        seed : int
+            seed of the generator (default is None, which means 0)
+
+        candidates : int
+            number of candidates of each adaptive test case (default is 10)
+
+        history : int
+            number of last test cases compared with the candidates (default 
+            is 1000)
+        '''
+
+        if any(size < 1 for size in sizes):
+            raise EcFeedError('Every argument must have at least one choice')
+
+        self.sizes = list(sizes)
+        self.length = length
+        self.adaptive = adaptive
+        self.duplicates = duplicates
+        self.seed = seed
+        self.candidates = candidates if adaptive else 1
+        self.history = history
+
+    def __iter__(self):
+        """Yields test cases as lists of indices of choices"""
+
+        rng = numpy.random.default_rng(self.seed if self.seed != None else 0)
+        sizes = numpy.array(self.sizes, dtype=numpy.int64)
+        dtype = numpy.uint8 if max(self.sizes) <= 256 else numpy.int32
+        seen = set()
+        pool = None
+        length = self.length
+        if not self.duplicates:
+            length = min(length, functools.reduce(operator.mul, self.sizes, 1))
+        capacity = max(1, min(self.history, length))
+        history = numpy.empty((len(self.sizes), capacity), dtype=dtype)
+        distance_type = numpy.uint8 if len(self.sizes) < 256 else numpy.int32
+
+        for count in range(length):
+            if pool != None:
+                batch = numpy.array([pool[index] for index in rng.choice(len(pool), min(len(pool), self.candidates), replace=False)])
+            else:
+                batch = self.__random_batch(rng, sizes, dtype, seen)
+                if batch is None:
+                    pool = [row for row in CartesianEngine(self.sizes) if numpy.array(row, dtype=dtype).tobytes() not in seen]
+                    batch = numpy.array([pool[index] for index in rng.choice(len(pool), min(len(pool), self.candidates), replace=False)])
+                batch = batch.astype(dtype)
+
+            best = 0
+            if len(batch) > 1 and count > 0:
+                generated = min(count, capacity)
+                distances = numpy.zeros((len(batch), generated), dtype=distance_type)
+                for argument in range(len(self.sizes)):
+                    distances += batch[:, argument, None] != history[argument, None, :generated]
+                best = int(distances.min(axis=1).argmax())
+
+            row = numpy.asarray(batch[best], dtype=dtype)
+            history[:, count % capacity] = row
+            if not self.duplicates:
+                seen.add(row.tobytes())
+                if pool != None:
+                    pool.remove(row.tolist())
+            yield row.tolist()
+
+    def __random_batch(self, rng, sizes, dtype, seen):
+        for attempt in range(MAX_DUPLICATE_BATCHES):
+            batch = (rng.random((self.candidates, len(sizes))) * sizes).astype(dtype)
+            if self.duplicates:
+                return batch
+            unique = [row for row in batch if row.tobytes() not in seen]
+            if unique:
+                return numpy.array(unique)
+        return None
+
+def __nwise_engine(sizes, properties, seed):
+    return NWiseEngine(sizes, n=int(properties.get('n', 2)), coverage=float(properties.get('coverage', 100)), seed=seed)
+
+def __cartesian_engine(sizes, properties, seed):
+    return CartesianEngine(sizes, coverage=float(properties.get('coverage', 100)), seed=seed)
+
+def __random_engine(sizes, properties, seed):
+    return RandomEngine(sizes, length=int(properties.get('length', 1)), seed=seed,
+                        adaptive=str(properties.get('adaptive', True)).lower() == 'true', 
+                        duplicates=str(properties.get('duplicates', False)).lower() == 'true')
+
+ENGINES = {
+    DataSource.NWISE : __nwise_engine,
+    DataSource.PAIRWISE : __nwise_engine,
+    DataSource.CARTESIAN : __cartesian_engine,
+    DataSource.RANDOM : __random_engine,
+}
+
+BATCH_SIZE = 65536
+
+class LocalGeneration:
+    '''A generation done by one of the local generators
+
+    Takes the same arguments as TestProvider.generate. The values of the
+    arguments of the method are taken from 'choices' and their types are
+    taken from the signature in 'method' or, if it has no signature,
+    deduced from the values.
+    ...
+    Attributes
+    ----------
+    args_info : dict
+        Information about the method, see TestProvider.method_info
+
+    values : list
+        List of choice values of each argument, in order of the arguments
+
+    engine
+        The generator of test cases, yielding indices of choices, e.g. NWiseEngine
+    '''
+
+    def __init__(self, method, data_source, properties=None, choices=None, constraints=None, seed=None, shard=None, **kwargs):
+        if not choices:
+            raise EcFeedError('Local generators require values of the arguments in the "choices" argument')
+        if constraints != None:
+            raise EcFeedError('Constraints are not supported by local generators')
+        if data_source not in ENGINES:
+            raise EcFeedError('No local generator for data source ' + str(data_source))
+
+        if '(' in method:
+            self.signature = method
+            self.args_info = parse_method_definition(method)
+            try:
+                self.values = [list(choices[name]) for typename, name in self.args_info['args']]
+            except KeyError as e:
+                raise EcFeedError(f'missing choices of argument {e}')
+        else:
+            self.values = [list(values) for values in choices.values()]
+            args = [value_type(values[0]) + ' ' + name if values else name for name, values in zip(choices, self.values)]
+            self.signature = method + '(' + ', '.join(args) + ')'
+            self.args_info = parse_method_definition(self.signature)
+
+        self.engine = ENGINES[data_source]([len(values) for values in self.values], properties if properties != None else {}, seed)
+        if shard != None:
+            if not hasattr(self.engine, 'shard'):
+                raise EcFeedError('Data source ' + str(data_source) + ' does not support shards')
+            self.engine = self.engine.shard(*shard)
+
+    def rows(self):
+        """Yields test cases as lists of choice values"""
+
+        values = self.values
+        for row in self.engine:
+            yield [choices[index] for choices, index in zip(values, row)]
+
+    def lines(self):
+        """Yields lines of a response of the generator service with the generated test cases"""
+
+        yield json.dumps({'info' : str({'method' : self.signature})})
+        texts = [[value_text(value) for value in values] for values in self.values]
+        for row in self.engine:
+            yield json.dumps({'testCase' : [{'name' : 'choice' + str(index), 'value' : choices[index]}
+                                            for choices, index in zip(texts, row)]})
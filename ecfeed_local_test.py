@@ -0,0 +1,119 @@
+import itertools
+import pytest
+from ecfeed import TestProvider, DataSource, EcFeedError, TemplateType
+from ecfeed_local import NWiseEngine, CartesianEngine, CartesianProduct, RandomEngine
+
+CHOICES = {'arg1' : [1, 2, 3], 'arg2' : ['a', 'b', 'c', 'd'], 'arg3' : [0.5, 1.5], 'arg4' : [True, False], 'arg5' : ['x', 'y', 'z']}
+
+def provider():
+    return TestProvider(genserver='localhost:1', keystore_path='missing.p12', local=True)
+
+def uncovered_tuples(sizes, n, rows):
+    missing = 0
+    for combination in itertools.combinations(range(len(sizes)), n):
+        covered = {tuple(row[i] for i in combination) for row in rows}
+        missing += sum(1 for t in itertools.product(*[range(sizes[i]) for i in combination]) if t not in covered)
+    return missing
+
+@pytest.mark.parametrize('sizes, n', [([3] * 4, 2), ([4, 3, 2, 5, 6, 2], 2), ([2, 3, 4, 3, 2, 3], 3), ([3] * 5, 4)])
+def test_nwise_engine_covers_all_tuples(sizes, n):
+    engine = NWiseEngine(sizes, n=n)
+    rows = list(engine)
+    assert uncovered_tuples(sizes, n, rows) == 0
+    assert engine.covered == engine.tuple_count
+    assert len(rows) < len(list(itertools.product(*[range(size) for size in sizes])))
+
+def test_nwise_engine_partial_coverage_and_seed():
+    full = NWiseEngine([5] * 8, n=2)
+    partial = NWiseEngine([5] * 8, n=2, coverage=50)
+    partial_rows = list(partial)
+    assert partial.covered >= partial.tuple_count / 2
+    assert len(partial_rows) < len(list(full))
+    assert list(NWiseEngine([5] * 8, n=2, seed=7)) == list(NWiseEngine([5] * 8, n=2, seed=7))
+    with pytest.raises(EcFeedError):
+        NWiseEngine([5] * 3, n=4)
+
+def test_local_provider_generates_without_service():
+    with provider() as ecfeed:
+        rows = list(ecfeed.generate_pairwise(method='TestClass.method', choices=CHOICES))
+        assert all(len(row) == 5 and row[0] in CHOICES['arg1'] and row[3] in CHOICES['arg4'] for row in rows)
+        indices = [[values.index(value) for values, value in zip(CHOICES.values(), row)] for row in rows]
+        assert uncovered_tuples([len(values) for values in CHOICES.values()], 2, indices) == 0
+
+        names, types, data = ecfeed.method_data(ecfeed.generate_nwise, method='TestClass.method', n=3, choices=CHOICES)
+        assert names == list(CHOICES)
+        assert types == ['int', 'String', 'double', 'boolean', 'String']
+        assert len(list(data)) > len(rows)
+
+def test_local_provider_raw_output_and_signature():
+    choices = {'arg2' : ['a', 'b'], 'arg1' : [1, 2]}
+    with provider() as ecfeed:
+        rows = list(ecfeed.generate_nwise(method='TestClass.method(long arg1, String arg2)', choices=choices))
+        assert sorted(rows) == [[1, 'a'], [1, 'b'], [2, 'a'], [2, 'b']]
+        suite = ecfeed.generate_columnar(ecfeed.generate_pairwise, method='TestClass.method', choices=choices)
+        assert suite.types() == ['String', 'int']
+        assert sorted(suite) == [['a', 1], ['a', 2], ['b', 1], ['b', 2]]
+        with pytest.raises(EcFeedError):
+            list(ecfeed.export_nwise(method='TestClass.method', choices=choices, template=TemplateType.CSV))
+        with pytest.raises(EcFeedError):
+            list(ecfeed.generate_nwise(method='TestClass.method', choices=choices, constraints=['constraint1']))
+
+def test_cartesian_engine_random_access_and_shards():
+    sizes = [3, 4, 2, 5]
+    product = [list(row) for row in itertools.product(*[range(size) for size in sizes])]
+    engine = CartesianEngine(sizes)
+    assert len(engine) == 120
+    assert list(engine) == product
+    assert engine[57] == product[57] and engine[-1] == product[-1]
+    assert list(engine[10:50:3]) == product[10:50:3]
+    assert sum([list(engine.shard(i, 7)) for i in range(7)], []) == product
+
+    huge = CartesianEngine([10] * 30)
+    assert huge.count() == 10 ** 30
+    assert huge[-1] == [9] * 30
+    assert huge.shard(1, 4)[0] == [2, 5] + [0] * 28
+
+def test_cartesian_sampling_without_replacement():
+    engine = CartesianEngine([3, 4, 2, 5], coverage=30, seed=3)
+    rows = list(engine)
+    assert len(rows) == 36
+    assert len(set(map(tuple, rows))) == 36
+    assert [engine[i] for i in range(36)] == rows
+    assert sum([list(engine.shard(i, 4)) for i in range(4)], []) == rows
+    assert rows != list(CartesianEngine([3, 4, 2, 5], coverage=30, seed=4))
+
+def test_local_cartesian_generation():
+    choices = {'arg1' : [1, 2, 3], 'arg2' : ['a', 'b']}
+    with provider() as ecfeed:
+        rows = list(ecfeed.generate_cartesian(method='TestClass.method', choices=choices))
+        assert rows == [[1, 'a'], [1, 'b'], [2, 'a'], [2, 'b'], [3, 'a'], [3, 'b']]
+        shards = [list(ecfeed.generate_cartesian(method='TestClass.method', choices=choices, shard=(i, 4))) for i in range(4)]
+        assert sum(shards, []) == rows
+        assert len(list(ecfeed.generate_cartesian(method='TestClass.method', choices=choices, coverage=50))) == 3
+        with pytest.raises(EcFeedError):
+            list(ecfeed.generate_nwise(method='TestClass.method', choices=choices, shard=(0, 2)))
+    assert CartesianProduct(choices)[1:3].shard(1, 2)[0] == [2, 'a']
+
+def nearest_distances(rows):
+    return [min(sum(a != b for a, b in zip(row, other)) for other in rows[:index]) for index, row in enumerate(rows) if index > 0]
+
+def test_random_engine_is_deterministic_and_adaptive():
+    sizes = [4] * 8
+    adaptive = list(RandomEngine(sizes, length=60, seed=5))
+    assert adaptive == list(RandomEngine(sizes, length=60, seed=5))
+    assert adaptive != list(RandomEngine(sizes, length=60, seed=6))
+    plain = list(RandomEngine(sizes, length=60, seed=5, adaptive=False))
+    assert sum(nearest_distances(adaptive)) > sum(nearest_distances(plain))
+
+def test_random_engine_duplicates():
+    rows = list(RandomEngine([2, 3, 2], length=20))
+    assert len(rows) == 12
+    assert len(set(map(tuple, rows))) == 12
+    assert len(list(RandomEngine([2, 3, 2], length=20, duplicates=True))) == 20
+
+def test_local_random_generation():
+    with provider() as ecfeed:
+        rows = list(ecfeed.generate_random(method='TestClass.method', choices=CHOICES, length=100, seed=1))
+        assert len(rows) == 100
+        assert len(set(map(tuple, rows))) == 100
+        assert rows == list(ecfeed.generate_random(method='TestClass.method', choices=CHOICES, length=100, seed=1))
@@ -0,0 +1,32 @@
+import time
+from ecfeed import TestProvider, DataSource, TemplateType, EcFeedError
+
+MODEL = '0000-0000-0000-0000-0000'
+
+def jobs(count):
+    return [{'method' : 'TestClass.method' + str(i), 'data_source' : DataSource.RANDOM, 'properties' : {'length' : str(i)}}
+            for i in range(count)]
+
+def test_jobs_run_concurrently(mock_server, mock_credentials):
+    mock_server.latency = 0.5
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as provider:
+        start = time.time()
+        results = list(provider.generate_many(jobs(20), max_workers=10))
+        assert time.time() - start < 3
+    assert [result.index for result in results] == list(range(20))
+    assert [len(result.data) for result in results] == list(range(20))
+    assert mock_server.max_active == 10
+    assert mock_server.connections <= 10
+    assert provider.credentials.load_count == 1
+
+def test_failed_job_does_not_abort_batch(mock_server, mock_credentials):
+    batch = jobs(5)
+    batch[2]['model'] = 'error'
+    batch[3] = {'method' : 'TestClass.method'}
+    batch[4]['template'] = TemplateType.CSV
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as provider:
+        results = sorted(provider.generate_many(batch, ordered=False), key=lambda result: result.index)
+    assert [result.error == None for result in results] == [True, True, False, False, True]
+    assert isinstance(results[2].error, EcFeedError)
+    assert isinstance(results[3].error, EcFeedError)
+    assert results[4].data == ['arg1,arg2,arg3', '0,value1,0.5', '31,value2,1.5', '62,value3,2.5', '93,value4,3.5']
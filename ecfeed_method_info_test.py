@@ -0,0 +1,39 @@
+from ecfeed import TestProvider
+
+MODEL = '0000-0000-0000-0000-0000'
+
+def test_method_info_is_queried_once(mock_server, mock_credentials):
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as ecfeed:
+        for i in range(5):
+            assert ecfeed.method_arg_names(method_name='TestClass.method') == ['arg1', 'arg2', 'arg3']
+            assert ecfeed.method_arg_types(method_name='TestClass.method') == ['int', 'String', 'double']
+        ecfeed.method_info('TestClass.method', model='1111-1111-1111-1111-1111')
+    assert len(mock_server.requests) == 2
+
+def test_method_info_remembered_from_generation(mock_server, mock_credentials):
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as ecfeed:
+        list(ecfeed.generate_nwise(method='TestClass.method'))
+        assert ecfeed.method_arg_names(method_name='TestClass.method') == ['arg1', 'arg2', 'arg3']
+    assert len(mock_server.requests) == 1
+
+def test_method_data_uses_single_request(mock_server, mock_credentials):
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as ecfeed:
+        names, types, data = ecfeed.method_data(ecfeed.generate_random, method='TestClass.method', length=5)
+        assert names == ['arg1', 'arg2', 'arg3']
+        assert types == ['int', 'String', 'double']
+        assert list(data) == list(ecfeed.generate_random(method='TestClass.method', length=5))
+        names, types, data = ecfeed.method_data(ecfeed.generate_random, method='TestClass.method', length=0)
+        assert names == ['arg1', 'arg2', 'arg3']
+        assert list(data) == []
+    assert len(mock_server.requests) == 3
+
+def test_method_info_returns_copies(mock_server, mock_credentials):
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as ecfeed:
+        info = ecfeed.method_info('TestClass.method')
+        info['args'].append(['int', 'extra'])
+        info['method_name'] = 'changed'
+        assert ecfeed.method_arg_names(method_name='TestClass.method') == ['arg1', 'arg2', 'arg3']
+        assert ecfeed.method_info('TestClass.method')['method_name'] != 'changed'
+        ecfeed.method_info('TestClass.method')['args'].clear()
+        assert ecfeed.method_arg_types(method_name='TestClass.method') == ['int', 'String', 'double']
+    assert len(mock_server.requests) == 1
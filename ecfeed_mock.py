@@ -0,0 +1,491 @@
+'''Local stand-in for the ecFeed generator service
+
+Used by tests and benchmarks of the ecfeed module. Requires the cryptography
+package, which is installed together with pyopenssl.
+'''
+
+from os import path
+import datetime
+import gzip
+import ipaddress
+import json
+import random
+import socket
+import ssl
+import zlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.serialization import pkcs12
+
+def __name(common_name):
+    return x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, common_name)])
+
+def __certificate(subject, public_key, issuer, signing_key, ca=False, server=False):
+    now = datetime.datetime.utcnow()
+    builder = x509.CertificateBuilder() \
+        .subject_name(__name(subject)) \
+        .issuer_name(__name(issuer)) \
+        .public_key(public_key) \
+        .serial_number(x509.random_serial_number()) \
+        .not_valid_before(now - datetime.timedelta(days=1)) \
+        .not_valid_after(now + datetime.timedelta(days=30)) \
+        .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+    if server:
+        builder = builder.add_extension(x509.SubjectAlternativeName([x509.DNSName('localhost'), 
+                                        x509.IPAddress(ipaddress.ip_address('127.0.0.1'))]), critical=False)
+    return builder.sign(signing_key, hashes.SHA256())
+
+def create_credentials(directory, password='changeit'):
+    """Creates a keystore and matching server credentials
+
+    Parameters
+    ----------
+    directory : str
+        Directory where the files are created
+
+    password : str
+        Password of the created keystore
+
+    Returns
+    -------
+    A dictionary with paths to the created files:
+        keystore: PKCS#12 keystore with client certificate, client key and CA certificate
+        ca: PEM encoded certificate of the CA that signed both the client and the server
+        server_cert: PEM encoded certificate of the server, issued for 'localhost' and '127.0.0.1'
+        server_key: PEM encoded private key of the server
+    """
+
+    ca_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ca_cert = __certificate('ecfeed-mock-ca', ca_key.public_key(), 'ecfeed-mock-ca', ca_key, ca=True)
+    server_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    server_cert = __certificate('localhost', server_key.public_key(), 'ecfeed-mock-ca', ca_key, server=True)
+    client_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    client_cert = __certificate('ecfeed-mock-client', client_key.public_key(), 'ecfeed-mock-ca', ca_key)
+
+    files = {
+        'keystore': path.join(directory, 'security.p12'),
+        'ca': path.join(directory, 'ca.pem'),
+        'server_cert': path.join(directory, 'server.pem'),
+        'server_key': path.join(directory, 'server.key'),
+    }
+    with open(files['keystore'], 'wb') as keystore_file:
+        keystore_file.write(pkcs12.serialize_key_and_certificates(b'client', client_key, client_cert, [ca_cert],
+                            serialization.BestAvailableEncryption(password.encode('utf8'))))
+    with open(files['ca'], 'wb') as ca_file:
+        ca_file.write(ca_cert.public_bytes(serialization.Encoding.PEM))
+    with open(files['server_cert'], 'wb') as cert_file:
+        cert_file.write(server_cert.public_bytes(serialization.Encoding.PEM))
+    with open(files['server_key'], 'wb') as key_file:
+        key_file.write(server_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+                       serialization.NoEncryption()))
+    return files
+
+RESPONSE_CHUNK_SIZE = 16384
+
+DEFAULT_METHOD = 'com.example.TestClass.method(int arg1, String arg2, double arg3)'
+
+class MockGenServer:
+    '''HTTPS server imitating the testCaseService endpoint of the generator service
+
+    The server requires a client certificate signed by the CA from the 
+    credentials created by create_credentials. Generated test cases are 
+    deterministic: the value of each argument depends only on the index 
+    of the test case and the position of the argument.
+    ...
+    Attributes
+    ----------
+    genserver : str
+        Address of the server, to be used as 'genserver' of a TestProvider
+
+    connections : int
+        Number of accepted connections
+
+    requests : list
+        Parsed 'request' parameters of all received requests
+
+    methods : list
+        HTTP methods of all received requests
+
+    max_active : int
+        Maximum number of requests handled at the same time
+
+    sent_bytes : int
+        Number of sent bytes of response bodies, after compression
+    '''
+
+    def __init__(self, credentials, method=DEFAULT_METHOD, rows=10, latency=0, encodings=(), drops=(), stalls=(), value_size=0, random_rows=None):
+        '''
+        Parameters
+        ----------
+        credentials : dict
+            Files created by create_credentials
+
+        method : str
+            Signature of the method sent in the 'info' line
+
+        rows : int
+            Number of generated test cases, unless the request defines 'length'
+
+        latency : float
+            Number of seconds to wait before sending the response
+
+        encodings : list
+            Content encodings ('gzip', 'zstd') the server may use to compress
+            responses, in order of preference. A response is compressed with
+            the first of them accepted by the client
+
+        drops : list
+            Numbers of lines after which consecutive responses are broken by
+            closing the connection in the middle of the next line. Responses
+            after the last drop are complete
+
+        stalls : list
+            Numbers of lines after which consecutive responses stop sending 
+            data, keeping the connection open until the server is stopped
+
+        value_size : int
+            Minimal length of generated values of non-primitive types (e.g.
+            String). Shorter values are padded
+
+        random_rows : int
+            If provided, the test cases of responses of the random generator 
+            are drawn (with repetitions, seeded by the request) from this 
+            number of test cases, instead of being the first test cases
+        '''
+
+        self.method = method
+        self.rows = rows
+        self.latency = latency
+        self.encodings = list(encodings)
+        self.drops = list(drops)
+        self.stalls = list(stalls)
+        self.value_size = value_size
+        self.random_rows = random_rows
+        self.sent_bytes = 0
+        self.connections = 0
+        self.requests = []
+        self.methods = []
+        self.active = 0
+        self.max_active = 0
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(credentials['server_cert'], credentials['server_key'])
+        context.load_verify_locations(credentials['ca'])
+        context.verify_mode = ssl.CERT_REQUIRED
+
+        mock = self
+        class Handler(_MockHandler):
+            server_mock = mock
+
+        self.__server = _MockHTTPServer(('127.0.0.1', 0), Handler, mock)
+        self.__server.socket = context.wrap_socket(self.__server.socket, server_side=True, do_handshake_on_connect=False)
+        self.genserver = '127.0.0.1:' + str(self.__server.server_address[1])
+        self.__thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+
+    def arg_types(self):
+        args = self.method[self.method.find('(')+1:-1]
+        return [arg.strip().split(' ')[0] for arg in args.split(',')]
+
+    def arg_names(self):
+        args = self.method[self.method.find('(')+1:-1]
+        return [arg.strip().split(' ')[1] for arg in args.split(',')]
+
+    def value(self, index, position, typename):
+        """Returns the text of a generated value"""
+
+        if typename in ['byte', 'short', 'int', 'long']:
+            return str(index * 31 + position)
+        elif typename in ['float', 'double']:
+            return str(index + position / 4)
+        elif typename == 'boolean':
+            return 'true' if (index + position) % 2 == 0 else 'false'
+        elif typename == 'char':
+            return chr(ord('a') + (index + position) % 26)
+        return ('value' + str((index + position) % 7)).ljust(self.value_size, 'x')
+
+    def info_line(self):
+        return json.dumps({'info': str({'method': self.method})})
+
+    def test_line(self, index):
+        values = [self.value(index, position, typename) for position, typename in enumerate(self.arg_types())]
+        return json.dumps({'testCase': [{'name': 'choice' + str(i), 'value': value} for i, value in enumerate(values)]})
+
+    def export_lines(self, count):
+        yield ','.join(self.arg_names())
+        for index in range(count):
+            yield ','.join(self.value(index, position, typename) for position, typename in enumerate(self.arg_types()))
+
+    def response_lines(self, request):
+        """Returns lines of the response to the parsed request"""
+
+        user_data = json.loads(request['userData'].replace('\'', '"'))
+        count = int(user_data.get('properties', {}).get('length', self.rows))
+        if 'template' in request:
+            yield from self.export_lines(count)
+            return
+        indices = range(count)
+        if self.random_rows != None and user_data.get('dataSource') == 'genRandom':
+            generator = random.Random(request['userData'])
+            indices = [generator.randrange(self.random_rows) for _ in indices]
+        yield self.info_line()
+        for index in indices:
+            yield self.test_line(index)
+
+    def _register(self, request, method='GET'):
+        with self.__lock:
+            self.requests.append(request)
+            self.methods.append(method)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _finished(self):
+        with self.__lock:
+            self.active -= 1
+
+    def _next_drop(self):
+        with self.__lock:
+            return self.drops.pop(0) if self.drops else None
+
+    def _next_stall(self):
+        with self.__lock:
+            return self.stalls.pop(0) if self.stalls else None
+
+    def _wait_stopped(self):
+        self.__stopped.wait()
+
+    def _sent(self, count):
+        with self.__lock:
+            self.sent_bytes += count
+
+    def _connected(self):
+        with self.__lock:
+            self.connections += 1
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Concurrent clients must not overflow the listen backlog, or their
+    # connections are retried a second later
+    request_queue_size = 64
+
+    def __init__(self, address, handler, mock):
+        super().__init__(address, handler)
+        self.mock = mock
+
+    def process_request(self, request, client_address):
+        self.mock._connected()
+        super().process_request(request, client_address)
+
+    def handle_error(self, request, client_address):
+        pass
+
+class _MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    server_mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        mock = self.server_mock
+        query = parse_qs(urlparse(self.path).query)
+        request = json.loads(query['request'][0])
+        mock._register(request)
+        try:
+            self.respond(mock, request)
+        finally:
+            mock._finished()
+
+    def do_POST(self):
+        mock = self.server_mock
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        request = json.loads(body.decode('utf-8'))
+        mock._register(request, 'POST')
+        try:
+            self.respond(mock, request)
+        finally:
+            mock._finished()
+
+    def respond(self, mock, request):
+        if mock.latency:
+            time.sleep(mock.latency)
+        accepted = [encoding.strip().split(';')[0] for encoding in self.headers.get('Accept-Encoding', '').split(',')]
+        encoding = next((encoding for encoding in mock.encodings if encoding in accepted), None)
+        if request.get('model') == 'error':
+            self.send_error_response(400, 'Unknown model', encoding)
+            return
+        compressor = self.compressor(encoding)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        if encoding != None:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        drop = mock._next_drop()
+        stall = mock._next_stall()
+        pending = bytearray()
+        for index, line in enumerate(mock.response_lines(request)):
+            data = (line + '\n').encode('utf-8')
+            if index == drop:
+                self.write_chunk(compressor.compress(bytes(pending)) if compressor != None else bytes(pending))
+                self.drop_connection(data)
+                return
+            if index == stall:
+                self.write_chunk(compressor.compress(bytes(pending)) if compressor != None else bytes(pending))
+                mock._wait_stopped()
+                self.close_connection = True
+                return
+            pending += data
+            if len(pending) >= RESPONSE_CHUNK_SIZE:
+                self.write_chunk(compressor.compress(bytes(pending)) if compressor != None else bytes(pending))
+                pending.clear()
+        self.write_chunk(compressor.compress(bytes(pending)) if compressor != None else bytes(pending))
+        if compressor != None:
+            self.write_chunk(compressor.flush())
+        self.write_chunk(b'', last=True)
+
+    def compressor(self, encoding):
+        if encoding == 'gzip':
+            return zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == 'zstd':
+            import zstandard
+            return zstandard.ZstdCompressor().compressobj()
+        return None
+
+    def drop_connection(self, data):
+        self.wfile.write(('%x\r\n' % len(data)).encode('ascii') + data[:len(data) // 2])
+        self.close_connection = True
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def send_error_response(self, status, message, encoding=None):
+        body = json.dumps({'error': message}).encode('utf-8')
+        compressor = self.compressor(encoding)
+        if compressor != None:
+            body = compressor.compress(body) + compressor.flush()
+        self.send_response(status)
+        if encoding != None:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def write_chunk(self, data, last=False):
+        if not data and not last:
+            return
+        self.server_mock._sent(len(data))
+        self.wfile.write(('%x\r\n' % len(data)).encode('ascii') + data + b'\r\n')
+
+class MockProxy:
+    '''HTTP proxy tunneling CONNECT requests, to test clients behind a proxy
+
+    ...
+    Attributes
+    ----------
+    url : str
+        Url of the proxy, e.g. to be set as the https_proxy environment 
+        variable
+
+    tunnels : list
+        Addresses (host:port) requested by all CONNECT requests
+    '''
+
+    def __init__(self):
+        self.tunnels = []
+
+        mock = self
+        class Handler(_ProxyHandler):
+            proxy_mock = mock
+
+        self.__server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.__server.daemon_threads = True
+        self.__server.handle_error = lambda request, client_address: None
+        self.url = 'http://127.0.0.1:' + str(self.__server.server_address[1])
+        self.__thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__thread.join()
+
+def _relay(source, target):
+    try:
+        while True:
+            data = source.recv(65536)
+            if not data:
+                break
+            target.sendall(data)
+    except OSError:
+        pass
+    finally:
+        try:
+            target.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+class _ProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    proxy_mock = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_CONNECT(self):
+        self.proxy_mock.tunnels.append(self.path)
+        host, port = self.path.rsplit(':', 1)
+        self.close_connection = True
+        try:
+            upstream = socket.create_connection((host, int(port)))
+        except OSError:
+            self.send_error(502)
+            return
+        self.send_response(200, 'Connection established')
+        self.end_headers()
+        self.wfile.flush()
+        with upstream:
+            backward = threading.Thread(target=_relay, args=(upstream, self.connection), daemon=True)
+            backward.start()
+            _relay(self.connection, upstream)
+            backward.join()
@@ -0,0 +1,32 @@
+import json
+from enum import Enum
+import pytest
+from ecfeed import ResponseParser, TemplateType, EcFeedError
+
+class Color(Enum):
+    RED = 0
+    GREEN = 1
+
+def info_line(signature):
+    return json.dumps({'info': str({'method': signature})})
+
+def case_line(*values):
+    return json.dumps({'testCase': [{'name': 'choice', 'value': value} for value in values]})
+
+def test_values_are_casted_to_argument_types():
+    parser = ResponseParser()
+    assert parser.parse(info_line('com.example.TestClass.method(byte a, short b, int c, long d, float e, double f, '
+                                  'boolean g, char h, String i, ecfeed_parser_test.Color j)')) == None
+    assert parser.args_info['args'][0] == ['byte', 'a']
+    assert parser.parse(case_line('1', '2', '3', '4', '0.5', '1.5', 'TRUE', 'x', 'text', 'GREEN')) == \
+        [1, 2, 3, 4, 0.5, 1.5, True, 'x', 'text', Color.GREEN]
+    assert parser.parse(case_line('-1', '0', '0', '0', '0', '0', 'false', 'y', '', 'RED')) == \
+        [-1, 0, 0, 0, 0.0, 0.0, False, 'y', '', Color.RED]
+
+def test_lines_are_not_parsed_with_template():
+    for parser in [ResponseParser(template=TemplateType.CSV), ResponseParser(raw_output=True)]:
+        assert parser.parse(info_line('TestClass.method(int a)')) == info_line('TestClass.method(int a)')
+
+def test_test_case_without_method_information():
+    with pytest.raises(EcFeedError):
+        ResponseParser().parse(case_line('1'))
@@ -0,0 +1,104 @@
+import threading
+import time
+import pytest
+import ecfeed_mock
+from ecfeed import TestProvider, EcFeedError, prefetched, retried_errors
+
+MODEL = '0000-0000-0000-0000-0000'
+
+def provider(server, mock_credentials, **kwargs):
+    return TestProvider(genserver=server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, **kwargs)
+
+def prefetch_threads():
+    return [thread for thread in threading.enumerate() if thread.name == 'ecfeed-prefetch']
+
+def slow_items(count, delay, log=None):
+    for index in range(count):
+        time.sleep(delay)
+        if log != None:
+            log.append(index)
+        yield index
+
+def test_reading_overlaps_consumption():
+    start = time.perf_counter()
+    for item in slow_items(20, 0.01):
+        time.sleep(0.01)
+    sequential = time.perf_counter() - start
+
+    read = []
+    start = time.perf_counter()
+    items = []
+    for item in prefetched(slow_items(20, 0.01, read), 3):
+        items.append(item)
+        time.sleep(0.01)
+        assert len(read) <= item + 1 + 3 + 1
+    assert items == list(range(20))
+    assert time.perf_counter() - start < sequential * 0.8
+
+def test_prefetched_generation(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=2000) as server:
+        with provider(server, mock_credentials) as ecfeed:
+            rows = list(ecfeed.generate_cartesian(method='TestClass.method'))
+            lines = list(ecfeed.export_cartesian(method='TestClass.method'))
+            assert list(ecfeed.generate_cartesian(method='TestClass.method', prefetch=16)) == rows
+            assert list(ecfeed.export_cartesian(method='TestClass.method', prefetch=16)) == lines
+        with provider(server, mock_credentials, prefetch=8) as ecfeed:
+            events = []
+            ecfeed.add_hook(events.append)
+            assert list(ecfeed.generate_cartesian(method='TestClass.method')) == rows
+            chunks = list(ecfeed.export_cartesian(method='TestClass.method', chunk_size=1000))
+            assert b''.join(chunks).decode('utf-8').splitlines() == lines
+            assert [event.rows for event in events] == [2000, 2001]
+            assert ecfeed.stats()['parse_seconds'] > 0
+    assert prefetch_threads() == []
+
+def test_errors_are_raised_after_prefetched_rows(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=2000, drops=[500]) as server:
+        with provider(server, mock_credentials, prefetch=100) as ecfeed:
+            rows = []
+            with pytest.raises(retried_errors()):
+                for row in ecfeed.generate_cartesian(method='TestClass.method'):
+                    rows.append(row)
+            assert 0 < len(rows) < 2000
+            with pytest.raises(EcFeedError):
+                list(ecfeed.generate_nwise(method='TestClass.method', model='error'))
+            assert ecfeed.stats()['errors'] == 2
+    assert prefetch_threads() == []
+
+def test_abandoned_generator_stops_reader(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=20000) as server:
+        with provider(server, mock_credentials, prefetch=4) as ecfeed:
+            events = []
+            ecfeed.add_hook(events.append)
+            generator = ecfeed.generate_cartesian(method='TestClass.method')
+            assert len([next(generator) for _ in range(10)]) == 10
+            generator.close()
+            assert prefetch_threads() == []
+            assert events[0].rows == 10 and events[0].error == None
+            assert len(list(ecfeed.generate_cartesian(method='TestClass.method'))) == 20000
+
+    closed = []
+    def endless():
+        try:
+            while True:
+                yield 0
+        finally:
+            closed.append(True)
+    items = prefetched(endless(), 2)
+    next(items)
+    items.close()
+    assert closed == [True] and prefetch_threads() == []
+
+def test_closing_aborts_stalled_response(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=20000, stalls=[8, 8]) as server:
+        with provider(server, mock_credentials, prefetch=4, retries=3) as ecfeed:
+            for export in [ecfeed.generate_cartesian, ecfeed.export_random]:
+                generator = export(method='TestClass.method', length=20000)
+                assert len([next(generator) for _ in range(5)]) == 5
+                time.sleep(0.2)
+                closing = threading.Thread(target=generator.close)
+                closing.start()
+                closing.join(5)
+                assert not closing.is_alive()
+                assert prefetch_threads() == []
+            assert len(server.requests) == 2
@@ -0,0 +1,313 @@
+'''pytest plugin parametrizing tests with data from the ecFeed generator service
+
+Instead of calling generators inside pytest.mark.parametrize, mark the test:
+
+    @pytest.mark.ecfeed_cases('random', method='QuickStart.test', length=5)
+    def test_method(arg1, arg2, arg3):
+        ...
+
+The first argument of the marker names the generator ('nwise', 'pairwise',
+'cartesian', 'random' or 'static_suite'), the others are passed to it. The
+test is parametrized with the generated test cases, by the names of the
+method arguments. A test taking a single argument 'ecfeed_case' gets whole
+test cases as tuples instead.
+
+The generator service is configured by the options --ecfeed-model,
+--ecfeed-genserver, --ecfeed-keystore and --ecfeed-password, or by ini
+options with the same names and underscores (e.g. ecfeed_model).
+
+Responses are kept in a directory shared by all processes of the session:
+the first process that needs a response fetches it, and the others read it
+from the directory, so the number of requests does not grow with the number
+of workers of pytest-xdist. The directory is created when the first marked
+test is parametrized. With --ecfeed-prefetch (or the ini option
+ecfeed_prefetch), the controller collects the requests of all marked tests
+before the workers start, fetches them concurrently and only then starts
+the workers.
+
+pytest loads the plugin in every session, so the ecfeed module and the 
+other dependencies of fetching are imported only when a marked test is 
+found or a prefetch is requested.
+'''
+
+from os import path, makedirs
+import argparse
+import json
+import shutil
+import sys
+import time
+
+import pytest
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+GENERATORS = ['nwise', 'pairwise', 'cartesian', 'random', 'static_suite']
+CASE_ARGUMENT = 'ecfeed_case'
+
+# Options and the constants of the ecfeed module with their defaults
+PROVIDER_OPTIONS = [
+    ('model', None, 'id of the model used by ecfeed_cases markers'),
+    ('genserver', 'DEFAULT_GENSERVER', 'address of the ecFeed generator service (default is that of TestProvider)'),
+    ('keystore', 'DEFAULT_KEYSTORE_PATH', 'path of the keystore file (default is that of TestProvider)'),
+    ('password', 'DEFAULT_KEYSTORE_PASSWORD', 'password to the keystore'),
+]
+
+PREFETCH_REPORT_LINES = 10
+
+def pytest_addoption(parser):
+    group = parser.getgroup('ecfeed', 'ecFeed test cases')
+    for name, default, help in PROVIDER_OPTIONS:
+        group.addoption('--ecfeed-' + name, dest='ecfeed_' + name, help=help)
+        parser.addini('ecfeed_' + name, help=help, default=None)
+    group.addoption('--ecfeed-prefetch', dest='ecfeed_prefetch', action='store_true',
+                    help='fetch the test cases of all marked tests concurrently before the tests are collected')
+    parser.addini('ecfeed_prefetch', type='bool', default=False,
+                  help='fetch the test cases of all marked tests concurrently before the tests are collected')
+    group.addoption('--ecfeed-store', dest='ecfeed_store',
+                    help='directory where the fetched test cases are kept. By default a temporary directory is '
+                         'used and removed after the session; an existing directory is reused by later sessions')
+    group.addoption('--ecfeed-record', dest='ecfeed_record', help=argparse.SUPPRESS)
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'ecfeed_cases(generator, **kwargs): parametrize the test with test cases '
+                                       'generated by the ecFeed generator service')
+    config.pluginmanager.register(CasesPlugin(config), 'ecfeed_cases')
+
+def _lock(lock_file):
+    if fcntl != None:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        return
+    delay = 0.01
+    while True:
+        try:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            time.sleep(delay)
+            delay = min(delay * 2, 1)
+
+class CaseStore:
+    '''Responses of the generator service shared by the processes of a test session
+
+    Each response is kept in a file named after the key of its request.
+    The process that fetches a response holds a lock of the key, so other
+    processes that need the same response wait and then read the file
+    instead of fetching it again.
+    ...
+    Attributes
+    ----------
+    directory : str
+        Directory of the files
+
+    fetched : int
+        Number of responses fetched by this process
+    '''
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.fetched = 0
+
+    def __contains__(self, key):
+        return path.exists(self.__data_path(key))
+
+    def get(self, key, fetch):
+        """Returns the lines of the response with the given key
+
+        If the response is not in the store, it is fetched by calling fetch,
+        which returns a list of lines, and stored.
+        """
+
+        lines = self.__read(key)
+        if lines != None:
+            return lines
+        with open(path.join(self.directory, key + '.lock'), 'a+b') as lock_file:
+            _lock(lock_file)
+            lines = self.__read(key)
+            if lines != None:
+                return lines
+            lines = fetch()
+            from ecfeed import AtomicFile
+            with AtomicFile(self.__data_path(key)) as output:
+                output.write(''.join(line + '\n' for line in lines).encode('utf-8'))
+            self.fetched += 1
+            return lines
+
+    def __read(self, key):
+        try:
+            with open(self.__data_path(key), encoding='utf-8') as data:
+                return data.read().splitlines()
+        except FileNotFoundError:
+            return None
+
+    def __data_path(self, key):
+        return path.join(self.directory, key + '.lines')
+
+class CasesPlugin:
+    '''Parametrizes tests marked with ecfeed_cases, see the module documentation
+
+    ...
+    Attributes
+    ----------
+    recorded : list
+        Requests of marked tests, collected when the session only records them
+    '''
+
+    def __init__(self, config):
+        self.config = config
+        self.recorded = []
+        self.__provider = None
+        self.__store = None
+        self.__directory = None
+        self.__owned_directory = None
+
+    def directory(self):
+        """Returns the path of the directory of the store, which may not exist yet"""
+
+        if self.__directory == None:
+            workerinput = getattr(self.config, 'workerinput', None)
+            if workerinput != None and 'ecfeed_store' in workerinput:
+                self.__directory = workerinput['ecfeed_store']
+            elif self.config.getoption('ecfeed_store') != None:
+                self.__directory = self.config.getoption('ecfeed_store')
+            else:
+                import tempfile
+                import uuid
+                self.__directory = self.__owned_directory = path.join(tempfile.gettempdir(), 'ecfeed-pytest-' + uuid.uuid4().hex)
+        return self.__directory
+
+    def store(self):
+        """Returns the responses shared by the processes of the session, creating their directory"""
+
+        if self.__store == None:
+            makedirs(self.directory(), mode=0o700, exist_ok=True)
+            self.__store = CaseStore(self.directory())
+        return self.__store
+
+    def option(self, name):
+        value = self.config.getoption('ecfeed_' + name)
+        if value == None:
+            value = self.config.getini('ecfeed_' + name)
+        if value == None:
+            default = next(default for option, default, help in PROVIDER_OPTIONS if option == name)
+            if default != None:
+                import ecfeed
+                value = getattr(ecfeed, default)
+        return value
+
+    def provider(self):
+        if self.__provider == None:
+            from ecfeed import TestProvider
+            self.__provider = TestProvider(genserver=self.option('genserver'), keystore_path=self.option('keystore'),
+                                           password=self.option('password'), model=self.option('model'))
+        return self.__provider
+
+    def request(self, marker):
+        """Returns the generator name, its arguments and the key of the request of a marker"""
+
+        import hashlib
+        from ecfeed import EcFeedError
+
+        if len(marker.args) != 1 or marker.args[0] not in GENERATORS:
+            raise EcFeedError('ecfeed_cases requires one of generators ' + str(GENERATORS) + ' as the first argument')
+        generator, kwargs = marker.args[0], dict(marker.kwargs)
+        identity = [self.option('genserver'), self.option('model'), generator, kwargs]
+        key = hashlib.sha256(json.dumps(identity, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+        return generator, kwargs, key
+
+    def fetch(self, generator, kwargs):
+        return list(getattr(self.provider(), 'generate_' + generator)(raw_output=True, **kwargs))
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node):
+        node.workerinput['ecfeed_store'] = self.directory()
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_sessionstart(self, session):
+        if hasattr(self.config, 'workerinput') or self.config.getoption('ecfeed_record') != None:
+            return
+        if self.config.getoption('ecfeed_prefetch') or self.config.getini('ecfeed_prefetch'):
+            self.prefetch()
+
+    def prefetch(self):
+        """Fetches the test cases of all marked tests concurrently
+
+        The marked tests are found by a collection in a separate process,
+        which records their requests without contacting the generator service.
+        Requests that fail are reported and fetched again by the tests that 
+        need them.
+        """
+
+        import subprocess
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+        from ecfeed import DEFAULT_POOL_SIZE
+
+        with tempfile.TemporaryDirectory(prefix='ecfeed-record-') as directory:
+            record = path.join(directory, 'requests.json')
+            arguments = [sys.executable, '-m', 'pytest'] + list(self.config.invocation_params.args) + \
+                        ['--collect-only', '-q', '-p', 'no:cacheprovider', '--ecfeed-record', record]
+            if self.config.pluginmanager.hasplugin('xdist'):
+                arguments += ['-n', '0']
+            collection = subprocess.run(arguments, cwd=str(self.config.invocation_params.dir), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if not path.exists(record):
+                output = collection.stderr.decode('utf-8', 'replace').splitlines()[-PREFETCH_REPORT_LINES:]
+                self.report('\n'.join(['collection of marked tests failed with exit code ' + str(collection.returncode)] + output))
+                return
+            with open(record) as recorded:
+                requests = {key : (generator, kwargs) for generator, kwargs, key in json.load(recorded)}
+
+        if not requests:
+            return
+        store = self.store()
+        missing = [(key, request) for key, request in requests.items() if key not in store]
+        with ThreadPoolExecutor(max_workers=DEFAULT_POOL_SIZE) as executor:
+            futures = [(generator, kwargs, executor.submit(store.get, key, lambda generator=generator, kwargs=kwargs: self.fetch(generator, kwargs)))
+                       for key, (generator, kwargs) in missing]
+        for generator, kwargs, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                self.report('prefetching ' + generator + ' ' + str(kwargs) + ' failed: ' + str(e))
+
+    def report(self, message):
+        reporter = self.config.pluginmanager.get_plugin('terminalreporter')
+        if reporter != None:
+            reporter.write_line('ecfeed_cases: ' + message, yellow=True)
+
+    def pytest_generate_tests(self, metafunc):
+        marker = metafunc.definition.get_closest_marker('ecfeed_cases')
+        if marker == None:
+            return
+        generator, kwargs, key = self.request(marker)
+        if self.config.getoption('ecfeed_record') != None:
+            try:
+                json.dumps(kwargs)
+                self.recorded.append([generator, kwargs, key])
+            except TypeError:
+                pass
+            return
+
+        from ecfeed import ResponseParser
+        parser = ResponseParser()
+        rows = [row for row in map(parser.parse, self.store().get(key, lambda: self.fetch(generator, kwargs))) if row != None]
+        if CASE_ARGUMENT in metafunc.fixturenames:
+            metafunc.parametrize(CASE_ARGUMENT, [tuple(row) for row in rows])
+        else:
+            names = [arg[1] for arg in parser.args_info.get('args', [])]
+            metafunc.parametrize(names, [row[0] for row in rows] if len(names) == 1 else rows)
+
+    def pytest_sessionfinish(self, session):
+        record = self.config.getoption('ecfeed_record')
+        if record != None:
+            with open(record, 'w') as output:
+                json.dump(self.recorded, output)
+
+    def pytest_unconfigure(self, config):
+        if self.__provider != None:
+            self.__provider.close()
+        if self.__owned_directory != None:
+            shutil.rmtree(self.__owned_directory, ignore_errors=True)
@@ -0,0 +1,103 @@
+import os
+import pytest
+import ecfeed_mock
+
+pytest_plugins = ['pytester']
+
+MODEL = '0000-0000-0000-0000-0000'
+
+MARKED_TESTS = '''
+import pytest
+
+@pytest.mark.ecfeed_cases('random', method='TestClass.method', length=5)
+def test_arguments(arg1, arg2, arg3):
+    assert isinstance(arg1, int) and isinstance(arg2, str) and isinstance(arg3, float)
+
+@pytest.mark.ecfeed_cases('nwise', method='TestClass.method', n=2)
+def test_whole_cases(ecfeed_case):
+    assert len(ecfeed_case) == 3
+
+class TestClass:
+    @pytest.mark.ecfeed_cases('random', method='TestClass.method', length=5)
+    def test_same_request(self, arg1, arg2, arg3):
+        pass
+'''
+
+def options(mock_server, mock_credentials):
+    return ['-p', 'ecfeed_pytest', '--ecfeed-genserver', mock_server.genserver, '--ecfeed-keystore', mock_credentials['keystore'],
+            '--ecfeed-model', MODEL]
+
+@pytest.fixture
+def plugin_path(monkeypatch):
+    monkeypatch.setenv('PYTHONPATH', os.path.dirname(os.path.abspath(__file__)))
+
+def test_marked_tests_are_parametrized(pytester, mock_server, mock_credentials, plugin_path):
+    pytester.makepyfile(test_marked=MARKED_TESTS)
+    result = pytester.runpytest_subprocess(*options(mock_server, mock_credentials))
+    result.assert_outcomes(passed=20)
+    assert len(mock_server.requests) == 2
+
+def test_workers_share_prefetched_cases(pytester, mock_credentials, plugin_path):
+    pytest.importorskip('xdist')
+    pytester.makepyfile(test_first=MARKED_TESTS, test_second=MARKED_TESTS.replace('length=5', 'length=7'))
+    store = str(pytester.path / 'store')
+    with ecfeed_mock.MockGenServer(mock_credentials, latency=0.5) as mock_server:
+        result = pytester.runpytest_subprocess('-n', '3', '--ecfeed-prefetch', '--ecfeed-store', store, *options(mock_server, mock_credentials))
+        result.assert_outcomes(passed=20 + 24)
+        assert len(mock_server.requests) == 3
+        assert mock_server.max_active == 3
+
+        result = pytester.runpytest_subprocess('-n', '2', '--ecfeed-prefetch', '--ecfeed-store', store, *options(mock_server, mock_credentials))
+        result.assert_outcomes(passed=20 + 24)
+        assert len(mock_server.requests) == 3
+
+        result = pytester.runpytest_subprocess('-n', '2', *options(mock_server, mock_credentials))
+        result.assert_outcomes(passed=20 + 24)
+        assert len(mock_server.requests) == 6
+
+def test_unmarked_sessions_do_not_use_the_store(pytester, mock_server, mock_credentials, plugin_path, monkeypatch, tmp_path):
+    pytest.importorskip('xdist')
+    monkeypatch.setenv('TMPDIR', str(tmp_path))
+    pytester.makepyfile(test_plain='''
+import os
+import tempfile
+
+def test_plain():
+    assert [name for name in os.listdir(tempfile.gettempdir()) if name.startswith('ecfeed-')] == []
+''')
+    result = pytester.runpytest_subprocess('-n', '2', *options(mock_server, mock_credentials))
+    result.assert_outcomes(passed=1)
+    assert mock_server.requests == []
+
+def test_failed_prefetch_is_reported(pytester, mock_server, mock_credentials, plugin_path):
+    pytester.makepyfile(test_marked=MARKED_TESTS)
+    arguments = options(mock_server, mock_credentials)
+    result = pytester.runpytest_subprocess('--ecfeed-prefetch', *arguments[:-1], 'error')
+    result.stdout.fnmatch_lines(["*ecfeed_cases: prefetching random {'method': 'TestClass.method', 'length': 5} failed: Unknown model*"])
+
+def test_plugin_imports_dependencies_only_for_marked_tests(pytester, plugin_path):
+    pytester.makepyfile(test_plain='''
+import sys
+
+def test_plain():
+    print('loaded:', [name for name in ['ecfeed', 'hashlib', 'subprocess', 'tempfile', 'uuid', 'concurrent.futures'] if name in sys.modules])
+''')
+    loaded = []
+    for plugin in [[], ['-p', 'ecfeed_pytest']]:
+        result = pytester.runpytest_subprocess('-s', '-p', 'no:cacheprovider', *plugin)
+        result.assert_outcomes(passed=1)
+        loaded.append([line for line in result.stdout.lines if 'loaded:' in line])
+    assert loaded[1] == loaded[0]
+    assert "'ecfeed'" not in loaded[1][0]
+
+def test_failed_collection_is_reported_with_its_errors(pytester, mock_server, mock_credentials, plugin_path):
+    pytester.makepyfile(test_marked=MARKED_TESTS)
+    pytester.makeconftest('''
+import sys
+
+if '--collect-only' in sys.argv:
+    raise RuntimeError('collection is broken')
+''')
+    result = pytester.runpytest_subprocess('--ecfeed-prefetch', *options(mock_server, mock_credentials))
+    result.stdout.fnmatch_lines(['*ecfeed_cases: collection of marked tests failed with exit code*', '*RuntimeError: collection is broken*'])
+    result.assert_outcomes(passed=20)
@@ -0,0 +1,274 @@
+'''Rendering of test cases with the built-in export templates on the client
+
+The generator service exports test cases with templates (see TemplateType),
+which takes a separate request for each template. This module renders the
+same templates from the raw response of a single request (requestData), or
+from the values of test cases, e.g. read from a binary suite (see
+ecfeed_binary). MultiplexWriter writes one response to several files with
+different templates at once.
+'''
+
+from os import path
+import csv
+import io
+import json
+from json.encoder import encode_basestring_ascii
+
+from ecfeed import EcFeedError, TemplateType, AtomicFile, parse_method_definition, json_decoder
+
+DEFAULT_BATCH_SIZE = 4096
+
+def method_name(signature):
+    """Returns the name of the method from its signature, e.g. 'test' for 'QuickStart.test(int arg1)'"""
+
+    return signature[:signature.find('(')].rsplit('.', 1)[-1]
+
+def arg_names(signature):
+    """Returns the names of the arguments of the method from its signature"""
+
+    return [arg[-1] for arg in parse_method_definition(signature)['args']]
+
+def _escape_xml(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;')
+
+class TemplateRenderer:
+    '''Renders test cases with a built-in template, batch by batch
+
+    The text of a whole export is header() followed by rows() of each batch
+    of test cases and footer(). Test cases are given as lists of values in
+    the text form sent by the generator service, e.g. ['1', 'true', 'abc'].
+    CSV values containing commas, quotes or line breaks are quoted, with 
+    quotes doubled, as read by the csv module.
+    ...
+    Attributes
+    ----------
+    template : TemplateType
+        One of CSV, XML, Gherkin and JSON
+
+    signature : str
+        Signature of the method, e.g. 'QuickStart.test(int arg1, String arg2)'
+
+    count : int
+        Number of rendered test cases
+    '''
+
+    def __init__(self, template, signature):
+        if template not in RENDERED_TEMPLATES:
+            raise EcFeedError('Template ' + str(template) + ' cannot be rendered by the client')
+        self.template = template
+        self.signature = signature
+        self.count = 0
+        self.__names = arg_names(signature)
+
+    def header(self):
+        names = self.__names
+        if self.template == TemplateType.CSV:
+            return ','.join(names) + '\n'
+        elif self.template == TemplateType.XML:
+            return '<TestCases>\n'
+        elif self.template == TemplateType.Gherkin:
+            method = method_name(self.signature)
+            return 'Scenario: executing ' + method + '\n' + \
+                   ''.join(('\tGiven' if index == 0 else '\tAnd') + ' the value of ' + name + ' is <' + name + '>\n' for index, name in enumerate(names)) + \
+                   '\tWhen ' + method + ' is executed\n\nExamples:\n' + \
+                   '| ' + ' | '.join('<' + name + '>' for name in names) + ' | \n'
+        return '{\n\t"testCases" : [\n'
+
+    def rows(self, rows):
+        """Returns the text of a batch of test cases"""
+
+        start = self.count
+        if self.template == TemplateType.CSV:
+            text = io.StringIO()
+            csv.writer(text, lineterminator='\n').writerows(rows)
+            text = text.getvalue()
+        elif self.template == TemplateType.XML:
+            attributes = [' ' + name + '="' for name in self.__names]
+            text = ''.join(['\t<TestCase testIndex="' + str(index) + '"' +
+                            ''.join([attribute + _escape_xml(value) + '"' for attribute, value in zip(attributes, row)]) + '/>\n'
+                            for index, row in enumerate(rows, start)])
+        elif self.template == TemplateType.Gherkin:
+            widths = [len(name) + 2 for name in self.__names]
+            text = ''.join(['| ' + ' | '.join([value.rjust(width) for value, width in zip(row, widths)]) + ' | \n' for row in rows])
+        else:
+            keys = [', ' + json.dumps(name) + ' : ' for name in self.__names]
+            text = ''.join([(',\n' if index > 0 else '') + '\t\t{"index" : ' + str(index) +
+                            ''.join([key + encode_basestring_ascii(value) for key, value in zip(keys, row)]) + '}'
+                            for index, row in enumerate(rows, start)])
+        self.count += len(rows)
+        return text
+
+    def footer(self):
+        if self.template == TemplateType.XML:
+            return '</TestCases>\n'
+        elif self.template == TemplateType.JSON:
+            return ('\n' if self.count > 0 else '') + '\t]\n}\n'
+        return ''
+
+RENDERED_TEMPLATES = [TemplateType.CSV, TemplateType.XML, TemplateType.Gherkin, TemplateType.JSON]
+
+def render(template, signature, rows):
+    """Yields lines of test cases exported with a built-in template
+
+    Parameters
+    ----------
+    template : TemplateType
+        One of CSV, XML, Gherkin and JSON
+
+    signature : str
+        Signature of the method, e.g. 'QuickStart.test(int arg1, String arg2)'
+
+    rows : iterable
+        Test cases as lists of values in the text form sent by the generator
+        service, e.g. ['1', 'true', 'abc']
+    """
+
+    renderer = TemplateRenderer(template, signature)
+    return __lines(renderer, rows)
+
+def __lines(renderer, rows):
+    pending = renderer.header()
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= DEFAULT_BATCH_SIZE:
+            lines = (pending + renderer.rows(batch)).split('\n')
+            pending = lines.pop()
+            yield from lines
+            batch = []
+    lines = (pending + renderer.rows(batch) + renderer.footer()).split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    yield from lines
+
+class MultiplexWriter:
+    '''Writes the raw response of the generator service to several files with different templates
+
+    Each test case is decoded once and rendered with the template of each
+    destination. The files are written in batches of test cases.
+    ...
+    Attributes
+    ----------
+    destinations : list
+        Pairs (template, destination), where the destination is a path or a
+        file object opened in binary mode
+
+    signature : str
+        Signature of the method, received in the response
+
+    rows : int
+        Number of written test cases
+
+    written : list
+        Number of bytes written to each destination
+    '''
+
+    def __init__(self, destinations, batch_size=DEFAULT_BATCH_SIZE, atomic=False):
+        '''
+        Parameters
+        ----------
+        destinations : dict or list
+            Destinations by templates, or a list of pairs (template, destination)
+
+        batch_size : int
+            Number of test cases rendered at once (default is 4096)
+
+        atomic : bool
+            If set to True, each path is first written as a temporary file
+            in the same directory, which replaces the destination only when
+            the writer is closed without an exception (default is False)
+        '''
+
+        self.destinations = list(destinations.items()) if isinstance(destinations, dict) else list(destinations)
+        for template, destination in self.destinations:
+            if template not in RENDERED_TEMPLATES:
+                raise EcFeedError('Template ' + str(template) + ' cannot be rendered by the client')
+        self.signature = None
+        self.rows = 0
+        self.written = [0] * len(self.destinations)
+        self.batch_size = batch_size
+        self.atomic = atomic
+        self.__loads = json_decoder()
+        self.__renderers = None
+        self.__outputs = None
+        self.__batch = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(exc_type == None)
+
+    def write(self, line):
+        """Adds a raw line of the response, e.g. yielded by a generator called with raw_output=True"""
+
+        parsed_line = self.__loads(line)
+        test_case = parsed_line.get('testCase')
+        if test_case != None:
+            if self.__renderers == None:
+                raise EcFeedError('Test case received before method information: "' + line + '"')
+            self.__batch.append([arg['value'] for arg in test_case])
+            if len(self.__batch) >= self.batch_size:
+                self.flush()
+        elif 'info' in parsed_line and self.signature == None:
+            info = parsed_line['info']
+            if isinstance(info, str):
+                info = json.loads(info.replace('\'', '"'))
+            self.signature = info['method']
+            self.__renderers = [TemplateRenderer(template, self.signature) for template, destination in self.destinations]
+            self.__open()
+            self.__write([renderer.header() for renderer in self.__renderers])
+
+    def flush(self):
+        """Renders and writes the buffered test cases"""
+
+        if self.__batch:
+            self.__write([renderer.rows(self.__batch) for renderer in self.__renderers])
+            self.rows += len(self.__batch)
+            self.__batch = []
+
+    def close(self, complete=True):
+        """Writes the buffered test cases and the endings of the templates, and closes the files
+
+        If 'complete' is False, e.g. after an error, or if writing the rest 
+        of the files fails, temporary files of an atomic writer are removed 
+        instead of replacing the destinations.
+        """
+
+        if self.__outputs == None:
+            if complete:
+                raise EcFeedError('The response does not contain method information')
+            return
+        atomic_outputs = [output for output in self.__outputs if isinstance(output, AtomicFile)]
+        try:
+            if complete:
+                self.flush()
+                self.__write([renderer.footer() for renderer in self.__renderers])
+            for (template, destination), output in zip(self.destinations, self.__outputs):
+                if output is not destination:
+                    output.close()
+        except BaseException:
+            complete = False
+            raise
+        finally:
+            self.__outputs = None
+            for output in atomic_outputs:
+                if complete:
+                    output.commit()
+                else:
+                    output.discard()
+
+    def __open(self):
+        self.__outputs = []
+        for template, destination in self.destinations:
+            if not isinstance(destination, str):
+                self.__outputs.append(destination)
+            elif self.atomic:
+                self.__outputs.append(AtomicFile(destination))
+            else:
+                self.__outputs.append(open(path.expanduser(destination), 'wb'))
+
+    def __write(self, texts):
+        for index, (output, text) in enumerate(zip(self.__outputs, texts)):
+            if text:
+                self.written[index] += output.write(text.encode('utf-8'))
@@ -0,0 +1,15 @@
+Scenario: executing test
+	Given the value of arg1 is <arg1>
+	And the value of arg2 is <arg2>
+	And the value of arg3 is <arg3>
+	When test is executed
+
+Examples:
+| <arg1> | <arg2> | <arg3> | 
+|      4 |      3 |      3 | 
+|      1 |      3 |      4 | 
+|      3 |      4 |      2 | 
+|      3 |      3 |      1 | 
+|      3 |      1 |      1 | 
+|      2 |      1 |      1 | 
+|      1 |      2 |      3 | 
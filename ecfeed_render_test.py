@@ -0,0 +1,112 @@
+import csv
+import io
+import json
+import os
+import sys
+import pytest
+import ecfeed_mock
+import ecfeed_cli
+from ecfeed import TestProvider, EcFeedError, TemplateType
+from ecfeed_render import MultiplexWriter, TemplateRenderer, render
+
+MODEL = '0000-0000-0000-0000-0000'
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ecfeed_render_fixtures')
+
+# Exports of the generator service (requestExport) and the test cases they hold
+CAPTURED = [
+    ('quickstart_nwise.feature', TemplateType.Gherkin, 'QuickStart.test(int arg1, int arg2, int arg3)',
+     [['4', '3', '3'], ['1', '3', '4'], ['3', '4', '2'], ['3', '3', '1'], ['3', '1', '1'], ['2', '1', '1'], ['1', '2', '3']]),
+]
+
+def provider(server, mock_credentials, **kwargs):
+    return TestProvider(genserver=server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, **kwargs)
+
+def read(file_path):
+    with open(file_path, encoding='utf-8') as lines:
+        return lines.read().splitlines()
+
+def test_one_request_is_written_in_all_templates(mock_credentials, tmp_path):
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=5000) as server:
+        with provider(server, mock_credentials) as ecfeed:
+            exported = list(ecfeed.export_random(method='TestClass.method', length=5000))
+            rows = [[str(value) for value in row] for row in ecfeed.generate_random(method='TestClass.method', length=5000)]
+            paths = {template : str(tmp_path / ('suite.' + template.name.lower())) for template in [TemplateType.CSV, TemplateType.XML, TemplateType.Gherkin, TemplateType.JSON]}
+            result = ecfeed.export_many(paths, ecfeed.export_random, method='TestClass.method', length=5000, template=TemplateType.CSV)
+        assert len(server.requests) == 3 and 'template' not in server.requests[2]
+
+    assert result['rows'] == 5000
+    assert result['written'] == [os.path.getsize(file_path) for file_path in paths.values()]
+    assert result['bytes'] == sum(result['written'])
+    assert read(paths[TemplateType.CSV]) == exported
+    for template in [TemplateType.XML, TemplateType.Gherkin, TemplateType.JSON]:
+        assert read(paths[template]) == list(render(template, server.method, rows))
+    with open(paths[TemplateType.JSON], encoding='utf-8') as data:
+        assert len(json.load(data)['testCases']) == 5000
+
+@pytest.mark.parametrize('name, template, signature, rows', CAPTURED)
+def test_rendering_matches_captured_exports(name, template, signature, rows):
+    renderer = TemplateRenderer(template, signature)
+    with open(os.path.join(FIXTURES, name), 'rb') as captured:
+        assert (renderer.header() + renderer.rows(rows) + renderer.footer()).encode('utf-8') == captured.read()
+
+def test_csv_values_are_quoted():
+    rows = [['1', 'a,b'], ['2', 'say "hi"'], ['3', 'two\nlines'], ['4', '']]
+    lines = list(render(TemplateType.CSV, 'QuickStart.test(int arg1, String arg2)', rows))
+    assert lines[1:3] == ['1,"a,b"', '2,"say ""hi"""']
+    assert list(csv.reader(io.StringIO('\n'.join(lines)))) == [['arg1', 'arg2']] + rows
+
+def test_renderer_batches_match_whole_render():
+    signature = 'QuickStart.test(int arg1, String arg2)'
+    rows = [[str(index), 'a<"' + str(index)] for index in range(10)]
+    for template in [TemplateType.CSV, TemplateType.XML, TemplateType.Gherkin, TemplateType.JSON]:
+        renderer = TemplateRenderer(template, signature)
+        text = renderer.header() + renderer.rows(rows[:3]) + renderer.rows([]) + renderer.rows(rows[3:]) + renderer.footer()
+        assert text.splitlines() == list(render(template, signature, rows))
+        assert renderer.count == 10
+
+    lines = [json.dumps({'info' : str({'method' : signature})})] + \
+            [json.dumps({'testCase' : [{'name' : 'choice', 'value' : value} for value in row]}) for row in rows]
+    destination = io.BytesIO()
+    with MultiplexWriter([(TemplateType.CSV, destination)], batch_size=4) as writer:
+        for line in lines:
+            writer.write(line)
+    assert not destination.closed
+    assert destination.getvalue().decode('utf-8').splitlines() == list(render(TemplateType.CSV, signature, rows))
+    with pytest.raises(EcFeedError):
+        MultiplexWriter({TemplateType.RAW : destination})
+
+def test_interrupted_atomic_export_keeps_files(mock_credentials, tmp_path, monkeypatch):
+    csv_path, feature_path = str(tmp_path / 'suite.csv'), str(tmp_path / 'suite.feature')
+    with open(csv_path, 'w') as old:
+        old.write('old')
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=100) as server:
+        with provider(server, mock_credentials) as ecfeed:
+            def broken(**kwargs):
+                yield from list(ecfeed.generate_random(**kwargs))[:50]
+                raise EcFeedError('connection lost')
+            with pytest.raises(EcFeedError):
+                ecfeed.export_many({TemplateType.CSV : csv_path, TemplateType.Gherkin : feature_path}, broken, atomic=True, method='TestClass.method', length=100)
+            assert sorted(os.listdir(str(tmp_path))) == ['suite.csv']
+            assert read(csv_path) == ['old']
+
+        monkeypatch.setattr(sys, 'argv', ['ecfeed', '--genserver', server.genserver, '--keystore', mock_credentials['keystore'], '--model', MODEL,
+                                          '--method', 'TestClass.method', '--random', '--length', '100', '--atomic',
+                                          '--render', 'CSV=' + csv_path, '--render', 'Gherkin=' + feature_path])
+        ecfeed_cli.main()
+        assert len(server.requests) == 2 and 'template' not in server.requests[1]
+    assert len(read(csv_path)) == 101
+    assert read(feature_path)[-1].startswith('| ')
+
+def test_atomic_destinations_are_kept_when_closing_fails(tmp_path):
+    xml_path, csv_path = str(tmp_path / 'suite.xml'), str(tmp_path / 'suite.csv')
+    for file_path in [xml_path, csv_path]:
+        with open(file_path, 'w') as old:
+            old.write('old')
+    writer = MultiplexWriter([(TemplateType.XML, xml_path), (TemplateType.CSV, csv_path)], atomic=True)
+    writer.write(json.dumps({'info' : str({'method' : 'QuickStart.test(int arg1)'})}))
+    writer.write(json.dumps({'testCase' : [{'name' : 'choice', 'value' : 1}]}))
+    with pytest.raises(Exception):
+        writer.close()
+    assert sorted(os.listdir(str(tmp_path))) == ['suite.csv', 'suite.xml']
+    assert read(xml_path) == read(csv_path) == ['old']
@@ -0,0 +1,54 @@
+import asyncio
+import json
+from ecfeed import TestProvider, DataSource, TemplateType
+from ecfeed_async import AsyncTestProvider
+
+MODEL = '0000-0000-0000-0000-0000'
+CHOICES = {'arg' + str(i) : ['choice' + str(j) for j in range(20)] for i in range(20)}
+
+def provider(mock_server, mock_credentials, **kwargs):
+    return TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, **kwargs)
+
+def test_large_requests_are_posted(mock_server, mock_credentials):
+    with provider(mock_server, mock_credentials, post_threshold=2000) as ecfeed:
+        small = list(ecfeed.generate_random(method='TestClass.method', length=5))
+        posted = list(ecfeed.generate_random(method='TestClass.method', length=5, choices=CHOICES))
+        exported = list(ecfeed.export_random(method='TestClass.method', length=5, choices=CHOICES, template=TemplateType.XML))
+    with provider(mock_server, mock_credentials) as ecfeed:
+        sent = list(ecfeed.generate_random(method='TestClass.method', length=5, choices=CHOICES))
+    assert small == posted == sent
+    assert len(exported) == 6
+    assert mock_server.methods == ['GET', 'POST', 'POST', 'GET']
+    assert mock_server.requests[1] == mock_server.requests[3]
+    assert json.loads(mock_server.requests[1]['userData'].replace('\'', '"'))['choices'] == CHOICES
+
+def test_encoded_requests_are_reused(mock_server, mock_credentials):
+    with provider(mock_server, mock_credentials, post_threshold=2000) as ecfeed:
+        arguments = dict(method='TestClass.method', data_source=DataSource.NWISE, properties={'n' : '2'}, choices=CHOICES)
+        request, parser = ecfeed._prepare_generation(dict(arguments))
+        assert ecfeed._prepare_generation(dict(arguments))[0] is request
+        assert ecfeed._prepare_generation(dict(arguments, properties={'n' : '3'}))[0] is not request
+        assert request.body() is request.body()
+        assert ecfeed.uses_post(request)
+
+        choices = {name : list(values) for name, values in CHOICES.items()}
+        request = ecfeed._prepare_generation(dict(arguments, properties={'n' : '4'}, choices=choices))[0]
+        choices['arg0'].append('added')
+        changed = ecfeed._prepare_generation(dict(arguments, properties={'n' : '4'}, choices=choices))[0]
+        assert request.user_data['choices'] == CHOICES and 'added' not in request.encoded()
+        assert changed is not request and changed.user_data['choices']['arg0'][-1] == 'added'
+
+        url = list(ecfeed.generate_nwise(method='TestClass.method', choices=CHOICES, url=True))
+        assert url[0].startswith('https://' + mock_server.genserver + '/testCaseService?requestType=requestData')
+        user_data = json.loads(url[0].split('&request=', 1)[1])['userData']
+        assert json.loads(user_data.replace('\'', '"'))['choices'] == CHOICES
+    assert mock_server.requests == []
+
+def test_async_large_requests_are_posted(mock_server, mock_credentials):
+    async def generate():
+        async with AsyncTestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, post_threshold=2000) as ecfeed:
+            return [row async for row in ecfeed.generate_random(method='TestClass.method', length=5, choices=CHOICES)]
+    rows = asyncio.run(generate())
+    with provider(mock_server, mock_credentials) as ecfeed:
+        assert rows == list(ecfeed.generate_random(method='TestClass.method', length=5))
+    assert mock_server.methods == ['POST', 'GET']
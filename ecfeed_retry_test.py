@@ -0,0 +1,58 @@
+import io
+import random
+import pytest
+import ecfeed_mock
+from ecfeed import TestProvider, EcFeedError, retried_errors
+
+MODEL = '0000-0000-0000-0000-0000'
+DROPS = random.Random(15).sample(range(1, 700), 3)
+
+@pytest.fixture
+def dropping_server(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials, rows=2000, drops=DROPS) as server:
+        yield server
+
+def provider(server, mock_credentials, **kwargs):
+    return TestProvider(genserver=server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, retry_backoff=0.01, **kwargs)
+
+def test_broken_streams_are_resumed(dropping_server, mock_credentials):
+    with provider(dropping_server, mock_credentials, retries=3) as ecfeed:
+        resumed = list(ecfeed.generate_cartesian(method='TestClass.method'))
+        assert len(dropping_server.requests) == 4
+        assert resumed == list(ecfeed.generate_cartesian(method='TestClass.method'))
+    assert len(resumed) == 2000
+
+def test_broken_exports_are_resumed(dropping_server, mock_credentials):
+    with provider(dropping_server, mock_credentials, retries=3, compression=False) as ecfeed:
+        exported = io.BytesIO()
+        ecfeed.export_to(exported, ecfeed.export_static_suite, method='TestClass.method', chunk_size=100)
+        assert exported.getvalue() == ''.join(line + '\n' for line in dropping_server.export_lines(2000)).encode('utf-8')
+
+def test_random_generation_requests_missing_test_cases(dropping_server, mock_credentials):
+    with provider(dropping_server, mock_credentials, retries=3) as ecfeed:
+        rows = list(ecfeed.generate_random(method='TestClass.method', length=2000, adaptive=False, duplicates=True))
+    assert len(rows) == 2000
+    lengths = [2000]
+    for drop in DROPS:
+        lengths.append(lengths[-1] - (drop - 1))
+    assert [int(request['userData'].split("'length':'")[1].split("'")[0]) for request in dropping_server.requests] == lengths
+
+def test_resumed_random_generation_skips_yielded_test_cases(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials, drops=[300, 300, 300], random_rows=1500) as server:
+        with provider(server, mock_credentials, retries=3) as ecfeed:
+            with pytest.raises(retried_errors()):
+                list(ecfeed.generate_random(method='TestClass.method', length=1000))
+            assert len(server.requests) == 1
+            rows = list(ecfeed.generate_random(method='TestClass.method', length=1000, adaptive=False))
+        assert len(server.requests) > 4
+    assert len(rows) == len({tuple(row) for row in rows}) == 1000
+
+def test_errors_without_resumption(dropping_server, mock_credentials):
+    with provider(dropping_server, mock_credentials, retries=2) as ecfeed:
+        with pytest.raises(retried_errors()):
+            list(ecfeed.generate_nwise(method='TestClass.method'))
+    assert len(dropping_server.requests) == 1
+
+    with provider(dropping_server, mock_credentials, retries=0) as ecfeed:
+        with pytest.raises(retried_errors()):
+            list(ecfeed.generate_cartesian(method='TestClass.method'))
@@ -0,0 +1,194 @@
+'''Routing of requests between several addresses of the generator service
+
+Used by TestProvider when it is constructed with a list of addresses in the
+'genserver' argument.
+'''
+
+import threading
+
+HISTOGRAM_BOUNDS = [0.001 * 2 ** (index / 4) for index in range(81)]
+MIN_HEDGE_SAMPLES = 10
+LATENCY_SMOOTHING = 0.2
+FAILURE_PENALTY = 2.0
+
+class LatencyHistogram:
+    '''Distribution of the latencies of an endpoint
+
+    Latencies are counted in buckets with exponentially growing bounds,
+    from 1ms to about 1000s, four buckets per doubling. Percentiles are
+    therefore accurate to about 20%.
+    ...
+    Attributes
+    ----------
+    bounds : list
+        Upper bounds of the buckets in seconds. Longer latencies are counted
+        in an additional last bucket
+
+    counts : list
+        Number of latencies in each bucket
+
+    count : int
+        Number of recorded latencies
+
+    total : float
+        Sum of the recorded latencies in seconds
+
+    max : float
+        The longest recorded latency in seconds
+    '''
+
+    def __init__(self, bounds=HISTOGRAM_BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.__lock = threading.Lock()
+
+    def record(self, seconds):
+        """Adds a latency in seconds"""
+
+        low, high = 0, len(self.bounds)
+        while low < high:
+            middle = (low + high) // 2
+            if self.bounds[middle] < seconds:
+                low = middle + 1
+            else:
+                high = middle
+        with self.__lock:
+            self.counts[low] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, percent):
+        """Returns the upper bound of the bucket containing the given percentile, or None if nothing was recorded"""
+
+        with self.__lock:
+            if self.count == 0:
+                return None
+            rank = percent / 100 * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count > 0:
+                    return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+            return self.max
+
+    def mean(self):
+        """Returns the mean latency in seconds, or None if nothing was recorded"""
+
+        with self.__lock:
+            return self.total / self.count if self.count > 0 else None
+
+    def as_dict(self):
+        """Returns the summary and the non-empty buckets as a dictionary that may be serialized to JSON"""
+
+        summary = {'count' : self.count, 'mean' : self.mean(), 'max' : self.max}
+        summary.update({'p' + str(percent) : self.percentile(percent) for percent in [50, 90, 99]})
+        with self.__lock:
+            summary['buckets'] = [[self.bounds[index] if index < len(self.bounds) else None, count]
+                                  for index, count in enumerate(self.counts) if count > 0]
+        return summary
+
+class Endpoint:
+    '''Address of the generator service with its observed latencies
+
+    ...
+    Attributes
+    ----------
+    address : str
+        Address of the generator service, e.g. 'gen.ecfeed.com'
+
+    histogram : LatencyHistogram
+        Latencies of the responses, from sending the request to receiving
+        the response headers
+
+    estimate : float
+        Exponentially smoothed latency in seconds, increased after failures.
+        None until the first response
+
+    active : int
+        Number of requests waiting for the response headers
+
+    failures : int
+        Number of requests that failed to get a response
+    '''
+
+    def __init__(self, address):
+        self.address = address
+        self.histogram = LatencyHistogram()
+        self.estimate = None
+        self.active = 0
+        self.failures = 0
+
+class EndpointRouter:
+    '''Chooses endpoints for requests by their observed latencies
+
+    Endpoints without a response yet are chosen first, in the order of the
+    addresses. Then the endpoint with the shortest smoothed latency, scaled
+    by the number of its requests waiting for a response, is chosen, so an
+    overloaded endpoint gets fewer requests. After a failure, the smoothed
+    latency of the endpoint is set to twice the longest one.
+    ...
+    Attributes
+    ----------
+    endpoints : list
+        Endpoints in the order of the addresses
+
+    hedge : float
+        Percentile of the latencies of an endpoint after which a duplicate
+        request is sent to another endpoint, or None
+    '''
+
+    def __init__(self, addresses, hedge=None):
+        self.endpoints = [Endpoint(address) for address in addresses]
+        self.hedge = hedge
+        self.__lock = threading.Lock()
+
+    def choose(self, exclude=None):
+        """Returns the endpoint for the next request, other than 'exclude', and counts the request as active"""
+
+        with self.__lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint is not exclude]
+            if not candidates:
+                return None
+            unmeasured = [endpoint for endpoint in candidates if endpoint.estimate == None]
+            if unmeasured:
+                chosen = min(unmeasured, key=lambda endpoint: endpoint.active)
+            else:
+                chosen = min(candidates, key=lambda endpoint: endpoint.estimate * (1 + endpoint.active))
+            chosen.active += 1
+            return chosen
+
+    def hedge_delay(self, endpoint):
+        """Returns the number of seconds after which a request to the endpoint is hedged, or None"""
+
+        if self.hedge == None or len(self.endpoints) < 2 or endpoint.histogram.count < MIN_HEDGE_SAMPLES:
+            return None
+        return endpoint.histogram.percentile(self.hedge)
+
+    def record(self, endpoint, seconds):
+        """Records the latency of a response of the endpoint and ends its request"""
+
+        endpoint.histogram.record(seconds)
+        with self.__lock:
+            endpoint.active -= 1
+            if endpoint.estimate == None:
+                endpoint.estimate = seconds
+            else:
+                endpoint.estimate += LATENCY_SMOOTHING * (seconds - endpoint.estimate)
+
+    def fail(self, endpoint, seconds):
+        """Records a failed request of the endpoint"""
+
+        with self.__lock:
+            endpoint.active -= 1
+            endpoint.failures += 1
+            worst = max([other.estimate for other in self.endpoints if other.estimate != None] + [seconds])
+            endpoint.estimate = worst * FAILURE_PENALTY
+
+    def latencies(self):
+        """Returns a dictionary of LatencyHistogram.as_dict summaries by the endpoint addresses"""
+
+        return {endpoint.address : dict(endpoint.histogram.as_dict(), failures=endpoint.failures) for endpoint in self.endpoints}
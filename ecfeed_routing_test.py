@@ -0,0 +1,84 @@
+import time
+import pytest
+import ecfeed_mock
+from ecfeed import TestProvider
+from ecfeed_routing import LatencyHistogram, EndpointRouter
+
+MODEL = '0000-0000-0000-0000-0000'
+
+@pytest.fixture
+def servers(mock_credentials):
+    with ecfeed_mock.MockGenServer(mock_credentials) as first, ecfeed_mock.MockGenServer(mock_credentials) as second:
+        yield first, second
+
+def provider(servers, mock_credentials, **kwargs):
+    return TestProvider(genserver=[server.genserver for server in servers], keystore_path=mock_credentials['keystore'], model=MODEL, **kwargs)
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(50) == None
+    for index in range(100):
+        histogram.record(0.010 if index < 90 else 1.0)
+    assert 0.010 <= histogram.percentile(50) < 0.012
+    assert 0.010 <= histogram.percentile(90) < 0.012
+    assert histogram.percentile(99) == 1.0
+    summary = histogram.as_dict()
+    assert summary['count'] == 100 and summary['max'] == 1.0
+    assert sum(count for bound, count in summary['buckets']) == 100
+
+def test_requests_are_routed_by_latency(servers, mock_credentials):
+    slow, fast = servers
+    slow.latency = 0.2
+    with provider(servers, mock_credentials) as ecfeed:
+        rows = [list(ecfeed.generate_nwise(method='TestClass.method')) for _ in range(10)]
+        latencies = ecfeed.latencies()
+    assert all(row == rows[0] for row in rows)
+    assert (len(slow.requests), len(fast.requests)) == (1, 9)
+    assert latencies[slow.genserver]['count'] == 1 and latencies[slow.genserver]['max'] >= 0.2
+    assert latencies[fast.genserver]['count'] == 9 and latencies[fast.genserver]['p99'] < 0.2
+
+def test_slow_request_is_hedged(servers, mock_credentials):
+    first, second = servers
+    second.latency = 0.5
+    with provider(servers, mock_credentials, hedge=95) as ecfeed:
+        for _ in range(12):
+            list(ecfeed.generate_nwise(method='TestClass.method'))
+        assert ecfeed.stats()['hedged'] == 0
+        first.latency, second.latency = 2, 0
+        start = time.perf_counter()
+        rows = list(ecfeed.generate_nwise(method='TestClass.method'))
+        assert time.perf_counter() - start < 1
+        stats = ecfeed.stats()
+        assert len(rows) == 10
+        assert stats['hedged'] == stats['hedge_wins'] == 1
+        assert stats['requests'] == 13
+    assert (len(first.requests), len(second.requests)) == (12, 2)
+
+def test_hedged_requests_do_not_wait_forever(servers, mock_credentials, monkeypatch):
+    monkeypatch.setattr('ecfeed.HEDGE_READ_TIMEOUT', 0.5)
+    first, second = servers
+    second.latency = 0.5
+    with provider(servers, mock_credentials, hedge=95, pool_size=1) as ecfeed:
+        for _ in range(12):
+            list(ecfeed.generate_nwise(method='TestClass.method'))
+        first.latency, second.latency = 3, 0
+        start = time.perf_counter()
+        assert len(list(ecfeed.generate_nwise(method='TestClass.method'))) == 10
+        assert time.perf_counter() - start < 0.5
+        assert ecfeed.stats()['hedge_wins'] == 1
+        time.sleep(0.7)
+        assert ecfeed.latencies()[first.genserver]['failures'] == 1
+        first.latency = 0
+        assert len(list(ecfeed.generate_nwise(method='TestClass.method'))) == 10
+
+def test_failed_endpoint_is_avoided():
+    router = EndpointRouter(['a', 'b', 'c'])
+    endpoints = [router.choose() for _ in range(3)]
+    assert [endpoint.address for endpoint in endpoints] == ['a', 'b', 'c']
+    router.record(endpoints[0], 0.01)
+    router.record(endpoints[1], 0.015)
+    router.fail(endpoints[2], 0.001)
+    assert router.choose().address == 'a'
+    assert router.choose().address == 'b'
+    assert router.choose(exclude=endpoints[0]).address == 'b'
+    assert router.latencies()['c']['failures'] == 1
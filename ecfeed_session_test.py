@@ -0,0 +1,30 @@
+import pytest
+from ecfeed import TestProvider, EcFeedError
+
+MODEL = '0000-0000-0000-0000-0000'
+
+def test_sequential_calls_reuse_connection(mock_server, mock_credentials):
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as provider:
+        for i in range(20):
+            assert len(list(provider.generate_random(method='TestClass.method', length=5))) == 5
+            assert provider.method_arg_names(method_name='TestClass.method' + str(i)) == ['arg1', 'arg2', 'arg3']
+    assert len(mock_server.requests) == 40
+    assert mock_server.connections == 1
+
+def test_abandoned_generator_does_not_leak_connections(mock_server, mock_credentials):
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, pool_size=2) as provider:
+        for i in range(10):
+            next(provider.generate_random(method='TestClass.method', length=100))
+    assert mock_server.connections <= 10
+
+def test_error_response(mock_server, mock_credentials):
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model='error') as provider:
+        with pytest.raises(EcFeedError):
+            list(provider.generate_random(method='TestClass.method'))
+        assert len(list(provider.generate_random(method='TestClass.method', model=MODEL))) == 1
+    assert mock_server.connections == 1
+
+def test_cartesian_sends_coverage(mock_server, mock_credentials):
+    with TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL) as provider:
+        list(provider.generate_cartesian(method='TestClass.method', coverage=50))
+    assert "'coverage':'50'" in mock_server.requests[0]['userData']
@@ -0,0 +1,24 @@
+import os
+import pytest
+import ecfeed_bench
+from ecfeed import TestProvider, find_keystore, DEFAULT_KEYSTORE_PATH
+
+def test_import_and_help_are_fast_and_load_no_lazy_modules():
+    # Best of 3 runs, with a wide margin over the budgets for slow or busy machines
+    records = ecfeed_bench.bench_startup(3)
+    for record in records:
+        assert record['lazy_modules_loaded'] == []
+        assert record['startup_seconds'] < 5 * record['budget_seconds'], record
+
+def test_keystore_is_found_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    provider = TestProvider(model='0000-0000-0000-0000-0000')
+    assert provider.keystore_path == str(tmp_path / '.ecfeed' / 'security.p12')
+
+    os.makedirs(str(tmp_path / 'ecfeed'))
+    open(str(tmp_path / 'ecfeed' / 'security.p12'), 'wb').close()
+    assert find_keystore(DEFAULT_KEYSTORE_PATH) == str(tmp_path / 'ecfeed' / 'security.p12')
+    assert find_keystore(str(tmp_path / 'other.p12')) == str(tmp_path / 'other.p12')
+    with pytest.raises(Exception):
+        provider.credentials.files()
+    assert provider.keystore_path == str(tmp_path / 'ecfeed' / 'security.p12')
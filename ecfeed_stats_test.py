@@ -0,0 +1,60 @@
+import io
+import sys
+import pytest
+import ecfeed_cli
+from ecfeed import TestProvider, EcFeedError, PHASES
+
+MODEL = '0000-0000-0000-0000-0000'
+
+def provider(mock_server, mock_credentials, **kwargs):
+    return TestProvider(genserver=mock_server.genserver, keystore_path=mock_credentials['keystore'], model=MODEL, **kwargs)
+
+def test_generation_events_are_passed_to_hooks(mock_server, mock_credentials, tmp_path):
+    events = []
+    with provider(mock_server, mock_credentials, cache=str(tmp_path), hooks=[events.append]) as ecfeed:
+        assert len(list(ecfeed.generate_random(method='TestClass.method', length=500))) == 500
+        list(ecfeed.generate_random(method='TestClass.method', length=500))
+        ecfeed.export_to(io.BytesIO(), ecfeed.export_nwise, method='TestClass.method', chunk_size=100)
+        generator = ecfeed.export_random(method='TestClass.method', length=50)
+        next(generator)
+        generator.close()
+        ecfeed.remove_hook(events.append)
+        list(ecfeed.generate_nwise(method='TestClass.method'))
+        stats = ecfeed.stats()
+
+    assert [event.rows for event in events] == [500, 500, 11, 1]
+    assert [event.cached for event in events] == [False, True, False, False]
+    fetched, cached, exported, closed = events
+    assert fetched.data_source == 'genRandom' and fetched.template == None
+    assert fetched.responses == 1 and fetched.wire_bytes == fetched.body_bytes > 0
+    assert all(fetched.seconds[phase] > 0 for phase in ['credentials', 'request', 'connect', 'ttfb', 'stream', 'parse', 'cast', 'total'])
+    assert fetched.seconds['total'] >= sum(seconds for phase, seconds in fetched.seconds.items() if phase != 'total')
+    assert cached.responses == 0 and cached.seconds['stream'] == 0
+    assert exported.seconds['connect'] == 0 and exported.seconds['parse'] == 0
+    assert closed.error == None and closed.as_dict()['template'] == 'CSV'
+
+    assert stats['generations'] == 5 and stats['cache_hits'] == 1 and stats['requests'] == 4
+    assert stats['rows'] == 500 * 2 + 11 + 1 + 10
+    assert stats['ttfb_seconds'] >= sum(event.seconds['ttfb'] for event in events)
+    assert set(phase + '_seconds' for phase in PHASES) <= set(stats)
+
+def test_failed_generation_event(mock_server, mock_credentials):
+    events = []
+    with provider(mock_server, mock_credentials) as ecfeed:
+        ecfeed.add_hook(events.append)
+        with pytest.raises(EcFeedError):
+            list(ecfeed.generate_nwise(method='TestClass.method', model='error'))
+        assert ecfeed.stats()['errors'] == 1
+    assert isinstance(events[0].error, EcFeedError)
+    assert events[0].rows == 0 and events[0].responses == 1
+
+def test_cli_prints_stats(mock_server, mock_credentials, tmp_path, monkeypatch, capsys):
+    output = str(tmp_path / 'export.csv')
+    monkeypatch.setattr(sys, 'argv', ['ecfeed', '--genserver', mock_server.genserver, '--keystore', mock_credentials['keystore'], '--model', MODEL,
+                                      '--method', 'TestClass.method', '--random', '--length', '100', '--output', output, '--stats'])
+    ecfeed_cli.main()
+    lines = capsys.readouterr().err.splitlines()
+    assert lines[0] == 'generations: 1, requests: 1, errors: 0, cache hits: 0'
+    assert lines[1].startswith('lines: 101, ')
+    assert lines[2].startswith('exported bytes: ')
+    assert lines[3].startswith('seconds: credentials ')
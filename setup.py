@@ -24,11 +24,20 @@ setuptools.setup(
     ],
     python_requires='>=3.6',
     keywords = 'testing pairwise test_generation',
-    py_modules=['ecfeed', 'ecfeed_cli'],
+    py_modules=['ecfeed', 'ecfeed_async', 'ecfeed_binary', 'ecfeed_cache', 'ecfeed_cli', 'ecfeed_columnar', 'ecfeed_coverage', 'ecfeed_flight', 'ecfeed_local', 'ecfeed_pytest', 'ecfeed_render', 'ecfeed_routing'],
     install_requires=['pyopenssl', 'requests'],
+    extras_require={
+        'async': ['httpx'],
+        'fast': ['orjson'],
+        'numpy': ['numpy'],
+        'zstd': ['zstandard'],
+    },
     entry_points={
         'console_scripts':[
             'ecfeed=ecfeed_cli:main'
+        ],
+        'pytest11':[
+            'ecfeed=ecfeed_pytest'
         ]
     },
 )